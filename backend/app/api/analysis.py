@@ -12,8 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db_session
 from app.db.neo4j_db import run_query
 from app.services.variance_calc import VarianceCalculator
-from app.services.graph_builder import GraphBuilder
-from app.services.rule_engine import RuleEngine
+from app.services.graph_builder import GraphBuilder, month_build_status
+from app.services.rule_engine import create_rule_engine
 from app.services.evidence import EvidenceBuilder
 from app.services.llm_engine import LLMEngine
 
@@ -31,6 +31,43 @@ async def calculate_variance(
     return {"yyyymm": yyyymm, "count": len(results), "message": "차이 계산 완료"}
 
 
+@router.post("/calculate-variance-range")
+async def calculate_variance_range(
+    start: str = Query(..., description="시작월 (YYYYMM)"),
+    end: str = Query(..., description="종료월 (YYYYMM)"),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Step 3: 기간 일괄 차이 재계산 (백필)"""
+    calculator = VarianceCalculator(session)
+    results = await calculator.calculate_range(start, end)
+    return {"start": start, "end": end, "count": len(results), "message": "기간 차이 계산 완료"}
+
+
+@router.post("/calculate-variance-incremental")
+async def calculate_variance_incremental(
+    yyyymm: str = Query(..., description="기준월"),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """
+    Step 3 증분: 변경된 스냅샷 행이 영향을 주는 차이만 재계산
+    + 차이 노드 갱신, 해당 노드의 규칙 관계 삭제 후 규칙 재실행
+    """
+    calculator = VarianceCalculator(session)
+    result = await calculator.calculate_incremental(yyyymm)
+
+    builder = GraphBuilder(session)
+    rules = await builder.apply_incremental(yyyymm, result["upserted"], result["removed"])
+
+    return {
+        "yyyymm": yyyymm,
+        "changed": result["changed"],
+        "upserted": len(result["upserted"]),
+        "removed": len(result["removed"]),
+        "rules": rules,
+        "message": "증분 차이 계산 완료",
+    }
+
+
 @router.post("/build-graph")
 async def build_graph(
     yyyymm: str = Query(..., description="기준월"),
@@ -49,14 +86,33 @@ async def build_graph(
     return {"yyyymm": yyyymm, "message": "그래프 구축 완료"}
 
 
+@router.post("/rebuild-month")
+async def rebuild_month(
+    yyyymm: str = Query(..., description="기준월"),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Step 4b~4d: 해당 월 규칙 관계/이벤트 삭제, 차이 노드 upsert 후 규칙 재실행"""
+    builder = GraphBuilder(session)
+    await builder.rebuild_month(yyyymm)
+    return {"yyyymm": yyyymm, "message": "월별 그래프 재구축 완료"}
+
+
+@router.get("/month-status")
+async def get_month_status(
+    yyyymm: str = Query(..., description="기준월"),
+):
+    """월별 그래프 재구축 상태 (IN_PROGRESS / COMPLETE / FAILED, 이력 없으면 null)"""
+    return {"yyyymm": yyyymm, "build": await month_build_status(yyyymm)}
+
+
 @router.post("/run-rules")
 async def run_rules(
     yyyymm: str = Query(..., description="기준월"),
 ):
     """Step 4d: 인과관계 규칙 엔진 실행"""
-    engine = RuleEngine()
-    await engine.execute_all_rules(yyyymm)
-    return {"yyyymm": yyyymm, "message": "규칙 엔진 실행 완료"}
+    engine = create_rule_engine()
+    rules = await engine.execute_all_rules(yyyymm)
+    return {"yyyymm": yyyymm, "rules": rules, "message": "규칙 엔진 실행 완료"}
 
 
 @router.post("/interpret")
@@ -109,13 +165,27 @@ async def get_spread_analysis(
 ):
     """파급 경로 탐색"""
     records = await run_query("""
-        MATCH (start:Variance {var_id: $var_id})-[:SPREADS_TO]->(affected:Variance)
+        MATCH (start:Variance {var_id: $var_id})-[:SPREADS_TO]->(:CostPool)
+              -[:AFFECTS]->(affected:Variance)
+        WHERE affected.product_cd <> start.product_cd
         RETURN affected {.*} AS affected_variance
         ORDER BY abs(affected.var_amt) DESC
     """, {"var_id": var_id})
     return {"source": var_id, "affected": [r["affected_variance"] for r in records]}
 
 
+@router.get("/material-variance")
+async def get_material_variance(
+    yyyymm: str = Query(..., description="기준월"),
+    product_cd: str = Query(None, description="제품코드"),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """후공정 재료비 자재별 드릴다운 (단가 차이 / 사용량 차이)"""
+    calculator = VarianceCalculator(session)
+    items = await calculator.calculate_material_detail(yyyymm, product_cd)
+    return {"yyyymm": yyyymm, "product_cd": product_cd, "items": items}
+
+
 @router.get("/evidence-package")
 async def get_evidence_package(
     var_id: str = Query(..., description="차이 ID"),
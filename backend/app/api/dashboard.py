@@ -10,12 +10,18 @@
 부서별 뷰: 경영진 / 원가팀 / 생산팀 / 구매팀
 """
 
+import asyncio
+
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from app.db.database import get_db_session
+from app.config import settings
+from app.db import query_log
 from app.db.neo4j_db import run_query
+from app.services.graph_stats import graph_stats
+from app.services.graph_builder import month_build_status
 
 router = APIRouter()
 
@@ -280,31 +286,36 @@ async def get_causal_analysis(
     product_cd: str = Query(..., description="제품코드"),
 ):
     """특정 제품의 인과 경로 분석 — Neo4j 그래프 탐색"""
+    # 제품 차이 노드는 var_key('기준월|제품|공정|원가요소') 접두어 인덱스 탐색으로 조회
+    params = {"prefix": f"{yyyymm}|{product_cd}|"}
     # 해당 제품의 차이 노드 요약
     variances = await run_query("""
-        MATCH (v:Variance {yyyymm: $yyyymm, product_cd: $product_cd})
+        MATCH (v:Variance) USING INDEX v:Variance(var_key)
+        WHERE v.var_key STARTS WITH $prefix
         RETURN v.var_id AS var_id, v.var_type AS var_type,
                v.proc_cd AS proc_cd, v.ce_cd AS ce_cd,
                v.var_amt AS var_amt, v.var_rate AS var_rate
         ORDER BY abs(v.var_amt) DESC
-    """, {"yyyymm": yyyymm, "product_cd": product_cd})
+    """, params)
 
     # 인과 경로 (CAUSED_BY)
     caused_by = await run_query("""
-        MATCH (parent:Variance {yyyymm: $yyyymm, product_cd: $product_cd})
-              -[r:CAUSED_BY]->(child:Variance)
+        MATCH (parent:Variance)-[r:CAUSED_BY]->(child:Variance)
+        USING INDEX parent:Variance(var_key)
+        WHERE parent.var_key STARTS WITH $prefix
         RETURN parent.var_id AS parent_id, parent.var_type AS parent_type,
                child.var_id AS child_id, child.var_type AS child_type,
                child.var_amt AS child_amt,
                r.contribution AS contribution
         ORDER BY abs(child.var_amt) DESC
-    """, {"yyyymm": yyyymm, "product_cd": product_cd})
+    """, params)
 
     # 근거 이벤트 (EVIDENCED_BY)
     evidences = await run_query("""
-        MATCH (v:Variance {yyyymm: $yyyymm, product_cd: $product_cd})
-              -[:CAUSED_BY*0..3]->(leaf:Variance)
+        MATCH (v:Variance)-[:CAUSED_BY*0..3]->(leaf:Variance)
               -[eb:EVIDENCED_BY]->(evt:Event)
+        USING INDEX v:Variance(var_key)
+        WHERE v.var_key STARTS WITH $prefix
         RETURN DISTINCT leaf.var_id AS var_id, leaf.var_type AS var_type,
                evt.event_id AS event_id, evt.source AS source,
                evt.event_type AS event_type, evt.target_cd AS target_cd,
@@ -313,18 +324,20 @@ async def get_causal_analysis(
                evt.chg_rate AS chg_rate,
                eb.match_score AS match_score
         ORDER BY eb.match_score DESC
-    """, {"yyyymm": yyyymm, "product_cd": product_cd})
+    """, params)
 
-    # 파급 관계 (SPREADS_TO)
+    # 파급 관계 (SPREADS_TO → CostPool → AFFECTS)
     spreads = await run_query("""
-        MATCH (v1:Variance {yyyymm: $yyyymm, product_cd: $product_cd,
-                            var_type: 'RATE_VAR'})
-              -[:SPREADS_TO]->(v2:Variance)
+        MATCH (v1:Variance {var_type: 'RATE_VAR'})
+              -[:SPREADS_TO]->(:CostPool)-[:AFFECTS]->(v2:Variance)
+        USING INDEX v1:Variance(var_key)
+        WHERE v1.var_key STARTS WITH $prefix
+          AND v2.product_cd <> v1.product_cd
         RETURN DISTINCT v1.proc_cd AS proc_cd, v1.ce_cd AS ce_cd,
                v2.product_cd AS affected_product,
                v2.var_amt AS affected_amt, v2.var_rate AS affected_rate
         ORDER BY abs(v2.var_amt) DESC
-    """, {"yyyymm": yyyymm, "product_cd": product_cd})
+    """, params)
 
     return {
         "yyyymm": yyyymm,
@@ -333,6 +346,8 @@ async def get_causal_analysis(
         "caused_by": caused_by,
         "evidences": evidences,
         "spreads": spreads,
+        # COMPLETE가 아니면 월별 그래프 재구축 중 / 실패로 결과가 불완전할 수 있음
+        "build_status": await month_build_status(yyyymm),
     }
 
 
@@ -350,7 +365,7 @@ async def get_graph_data(
     Level 2: 하위 분해 (단위원가 변동, 생산Mix 변동 / 자재단가, BOM사용량)
     Level 3: 상세 원인 (총액 증감, 가동시간 변동 / 공정별 내역)
     Level 4: 근거 이벤트 (MES, PLM, 구매)
-    Level 5: 파급 제품 (SPREADS_TO)
+    Level 5: 파급 제품 (SPREADS_TO → CostPool → AFFECTS)
     """
     # ── 1) Neo4j 조회 ──
     variances = await run_query("""
@@ -375,7 +390,8 @@ async def get_graph_data(
     spreads = await run_query("""
         MATCH (v:Variance {yyyymm: $yyyymm, product_cd: $product_cd,
                            var_type: 'RATE_VAR'})
-              -[:SPREADS_TO]->(v2:Variance)
+              -[:SPREADS_TO]->(:CostPool)-[:AFFECTS]->(v2:Variance)
+        WHERE v2.product_cd <> v.product_cd
         WITH v2.product_cd AS product_cd, sum(v2.var_amt) AS total
         RETURN product_cd, round(total * 100) / 100 AS var_amt
         ORDER BY abs(total) DESC
@@ -560,34 +576,23 @@ async def get_graph_data(
 
 
 @router.get("/graph-stats")
-async def get_graph_stats():
-    """Neo4j 그래프 통계"""
-    node_labels = [
-        "ProductGroup", "Product", "Process", "ProcessGroup",
-        "Equipment", "Material", "CostElement", "AllocBase",
-        "Variance", "Event",
-    ]
-    nodes = {}
-    for label in node_labels:
-        rows = await run_query(f"MATCH (n:{label}) RETURN count(n) AS cnt")
-        nodes[label] = rows[0]["cnt"] if rows else 0
-
-    rel_types = [
-        "CONTAINS", "COST_AT", "HAS_SUBPROCESS", "HAS_EQUIPMENT",
-        "COST_COMPOSED_OF", "ALLOCATED_BY", "USES_MATERIAL", "CONSUMES_GAS",
-        "OCCURS_AT", "OCCURS_IN", "RELATES_TO", "INVOLVES",
-        "CAUSED_BY", "EVIDENCED_BY", "SPREADS_TO", "SIMILAR_TO",
-    ]
-    rels = {}
-    for rtype in rel_types:
-        rows = await run_query(f"MATCH ()-[r:{rtype}]->() RETURN count(r) AS cnt")
-        rels[rtype] = rows[0]["cnt"] if rows else 0
+async def get_graph_stats(
+    refresh: bool = Query(False, description="캐시 무시하고 재조회"),
+):
+    """Neo4j 그래프 통계 (카운트 스토어 1회 조회, TTL 캐시)"""
+    return await graph_stats.get(force=refresh)
 
+
+@router.get("/query-stats")
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=200, description="상위 쿼리 수"),
+):
+    """느린 Neo4j 쿼리 로그 집계 — 라벨/쿼리별 누적 소요 시간 상위 (NEO4J_QUERY_PROFILE 활성 시 기록)"""
+    queries = await asyncio.to_thread(query_log.top_queries, limit)
     return {
-        "nodes": nodes,
-        "relationships": rels,
-        "total_nodes": sum(nodes.values()),
-        "total_relationships": sum(rels.values()),
+        "profiling": settings.NEO4J_QUERY_PROFILE,
+        "slow_query_ms": settings.NEO4J_SLOW_QUERY_MS,
+        "queries": queries,
     }
 
 
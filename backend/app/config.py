@@ -6,8 +6,10 @@
 - 다중 LLM 프로바이더 설정 (Azure OpenAI / Anthropic / Exaone / Upstage)
 """
 
-from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Literal
+
+from pydantic_settings import BaseSettings
 
 
 # 프로젝트 루트 디렉토리
@@ -53,6 +55,20 @@ class Settings(BaseSettings):
     NEO4J_DATABASE: str = "neo4j"
     AURA_INSTANCEID: str = ""
     AURA_INSTANCENAME: str = ""
+    NEO4J_MAX_POOL_SIZE: int = 50                # 드라이버 커넥션 풀 최대 크기
+    NEO4J_MAX_CONNECTION_LIFETIME: float = 300.0  # 커넥션 최대 수명 (초, Aura 유휴 종료 전 교체)
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 30.0  # 풀에서 커넥션 획득 대기 한도 (초)
+    NEO4J_READ_ROUTING: bool = True             # run_query를 읽기 트랜잭션으로 실행 (클러스터 팔로워 라우팅)
+    NEO4J_BATCH_SIZE: int = 5000            # UNWIND 배치 적재 청크 크기 (트랜잭션당 행 수)
+    NEO4J_BATCH_MAX_RETRIES: int = 3        # 청크별 일시 오류 재시도 횟수
+    NEO4J_BATCH_RETRY_DELAY: float = 0.5    # 재시도 기본 대기 (초, 지수 증가)
+    NEO4J_DELETE_BATCH_SIZE: int = 10000    # 그래프 삭제 배치 크기 (트랜잭션당 삭제 건수)
+    NEO4J_QUERY_PROFILE: bool = False       # run_query / run_write_query 계측 (소요 시간, 행 수, 호출 위치)
+    NEO4J_QUERY_PROFILE_PLANS: bool = False  # 계측 시 PROFILE 접두어로 DB hits / 연산자 수집 (부하 증가)
+    NEO4J_SLOW_QUERY_MS: float = 500.0      # 느린 쿼리 로그 기록 기준 (ms, 0이면 전체 기록)
+    NEO4J_SLOW_QUERY_LOG: str = str(BASE_DIR / "logs" / "neo4j_slow_queries.jsonl")
+    NEO4J_SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024  # 로그 파일 회전 크기
+    NEO4J_SLOW_QUERY_LOG_BACKUPS: int = 5   # 회전 보관 파일 수
 
     # ── LLM 공통 설정 ──
     # azure_openai | anthropic | exaone | upstage
@@ -85,6 +101,14 @@ class Settings(BaseSettings):
     VARIANCE_AMT_THRESHOLD: float = 1.0      # |var_amt| >= 1억원
     SPREAD_RATE_THRESHOLD: float = 0.05      # |var_rate| >= 5%
     SIMILAR_LOOKBACK_MONTHS: int = 12        # 최근 12개월
+    VARIANCE_BULK_CHUNK_SIZE: int = 10000    # cal_variance 일괄 저장 청크 크기
+    VARIANCE_WORKERS: int = 0                # 차이 계산 병렬 프로세스 수 (0/1: 직렬)
+    VARIANCE_PARTITION_BY: Literal["product_grp", "proc_type"] = "product_grp"  # 병렬 분할 기준 (그 외 값은 기동 시 검증 오류)
+    RULE_BACKEND: str = "cypher"             # 규칙 평가 백엔드 (cypher | python)
+
+    # ── 캐시 설정 ──
+    MASTER_CACHE_CHECK_SEC: float = 60.0     # 마스터 버전 스탬프 재확인 주기 (초)
+    GRAPH_STATS_TTL_SEC: float = 30.0        # 그래프 통계 캐시 유지 시간 (초)
 
     # ── 보고서 설정 ──
     REPORT_TOP_N: int = 5
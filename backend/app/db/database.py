@@ -63,6 +63,13 @@ async def get_db_session() -> AsyncSession:
         yield session
 
 
+def get_session_factory() -> async_sessionmaker:
+    """세션 팩토리 제공 (동시 작업별로 별도 세션이 필요한 경우)"""
+    if _async_session_factory is None:
+        raise RuntimeError("PostgreSQL이 초기화되지 않았습니다. init_db()를 먼저 호출하세요.")
+    return _async_session_factory
+
+
 async def reset_db():
     """테이블 전체 재생성 (개발용)"""
     global _engine
@@ -3,26 +3,51 @@ Neo4j DB 연결 모듈 (Aura 호환)
 - 인과관계 그래프 + LLM 탐색용
 - 상설 그래프 (Permanent) + 월별 차이 그래프 (Monthly)
 - Neo4j Aura: neo4j+ssc:// 프로토콜 사용
+- 대량 적재: UNWIND $rows 배치 (청크당 쓰기 트랜잭션 1회, 일시 오류 시 청크 재시도)
+- 커넥션 풀 설정 (크기 / 수명 / 획득 대기) + 세션 재사용 API
+  neo4j_session(): 여러 문장을 세션 1개로 실행
+  execute_read / execute_write: 관리형 트랜잭션 (일시 오류 자동 재시도)
+- 읽기/쓰기 분리: run_query는 READ 모드 (클러스터에서는 팔로워/리드 레플리카가 처리)
+  모든 세션이 북마크 매니저를 공유 → 다른 세션의 쓰기 직후 읽기도 최신 상태 보장
+  단일 인스턴스(bolt:// 또는 neo4j://)에서도 동일하게 동작
+- 쿼리 계측 (NEO4J_QUERY_PROFILE): run_query / run_write_query 소요 시간·DB hits를
+  호출 위치 라벨과 함께 느린 쿼리 로그(query_log)에 기록
 """
 
-from neo4j import AsyncGraphDatabase, AsyncDriver
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from neo4j import (
+    AsyncGraphDatabase, AsyncDriver, AsyncBookmarkManager, AsyncManagedTransaction, AsyncSession,
+    READ_ACCESS, WRITE_ACCESS,
+)
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
 
 from app.config import settings
+from app.db import query_log
 
 
-# 드라이버 전역 변수
+# 드라이버 / 북마크 매니저 전역 변수
 _driver: AsyncDriver | None = None
+_bookmark_manager: AsyncBookmarkManager | None = None
 
 
 async def init_neo4j():
     """Neo4j Aura 연결 초기화"""
-    global _driver
+    global _driver, _bookmark_manager
 
     try:
         _driver = AsyncGraphDatabase.driver(
             settings.NEO4J_URI,
             auth=(settings.NEO4J_USERNAME, settings.NEO4J_PASSWORD),
+            max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+            max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+            connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
         )
+        # 세션 간 인과적 일관성 (쓰기 → 읽기 세션 북마크 공유)
+        _bookmark_manager = AsyncGraphDatabase.bookmark_manager()
         # 연결 테스트
         await _driver.verify_connectivity()
         aura_info = f" (Aura: {settings.AURA_INSTANCENAME})" if settings.AURA_INSTANCENAME else ""
@@ -49,24 +74,261 @@ def get_neo4j_driver() -> AsyncDriver | None:
     return _driver
 
 
-async def run_query(query: str, parameters: dict = None) -> list:
-    """Cypher 쿼리 실행 (읽기 전용)"""
+@asynccontextmanager
+async def neo4j_session(access_mode: str = WRITE_ACCESS) -> AsyncIterator[AsyncSession]:
+    """
+    Neo4j 세션 컨텍스트 (여러 문장/트랜잭션을 세션 1개로 실행)
+    예) async with neo4j_session() as session:
+            await session.execute_write(tx_run, query1, params1)
+            await session.execute_write(tx_run, query2, params2)
+    """
     if _driver is None:
         raise RuntimeError("Neo4j가 연결되지 않았습니다.")
 
-    async with _driver.session(database=settings.NEO4J_DATABASE) as session:
+    async with _driver.session(
+        database=settings.NEO4J_DATABASE,
+        default_access_mode=access_mode,
+        bookmark_manager=_bookmark_manager,
+    ) as session:
+        yield session
+
+
+async def tx_fetch(
+    tx: AsyncManagedTransaction, query: str, parameters: dict = None, summaries: list | None = None,
+) -> list:
+    """
+    트랜잭션 함수: 쿼리 실행 후 레코드 전체를 dict 목록으로 반환
+    summaries 지정 시 ResultSummary를 추가 (쿼리 계측용)
+    """
+    result = await tx.run(query, parameters or {})
+    records = [record.data() async for record in result]
+    if summaries is not None:
+        summaries.append(await result.consume())
+    return records
+
+
+# 쓰기 결과 카운터 항목 (ResultSummary.counters)
+COUNTER_KEYS = [
+    "nodes_created", "nodes_deleted",
+    "relationships_created", "relationships_deleted",
+    "properties_set",
+]
+
+
+def merge_counters(items: list[dict]) -> dict:
+    """쓰기 카운터 dict 목록 합산"""
+    return {key: sum(item.get(key, 0) for item in items) for key in COUNTER_KEYS}
+
+
+async def tx_run(
+    tx: AsyncManagedTransaction, query: str, parameters: dict = None, summaries: list | None = None,
+) -> dict:
+    """
+    트랜잭션 함수: 쿼리 실행 후 결과 소비 (쓰기용) — 카운터 dict 반환
+    summaries 지정 시 ResultSummary를 추가 (쿼리 계측용)
+    """
+    result = await tx.run(query, parameters or {})
+    summary = await result.consume()
+    if summaries is not None:
+        summaries.append(summary)
+    return {key: getattr(summary.counters, key) for key in COUNTER_KEYS}
+
+
+async def execute_read(
+    work: Callable[..., Awaitable[Any]], *args, session: AsyncSession | None = None, **kwargs,
+) -> Any:
+    """
+    관리형 읽기 트랜잭션 실행 — 일시 오류 시 드라이버가 work 전체를 재시도
+    session 지정 시 해당 세션 재사용, 없으면 세션을 열고 닫음
+    """
+    if session is not None:
+        return await session.execute_read(work, *args, **kwargs)
+    async with neo4j_session(READ_ACCESS) as own:
+        return await own.execute_read(work, *args, **kwargs)
+
+
+async def execute_write(
+    work: Callable[..., Awaitable[Any]], *args, session: AsyncSession | None = None, **kwargs,
+) -> Any:
+    """
+    관리형 쓰기 트랜잭션 실행 — 일시 오류 시 드라이버가 work 전체를 재시도
+    session 지정 시 해당 세션 재사용, 없으면 세션을 열고 닫음
+    """
+    if session is not None:
+        return await session.execute_write(work, *args, **kwargs)
+    async with neo4j_session() as own:
+        return await own.execute_write(work, *args, **kwargs)
+
+
+async def run_query(query: str, parameters: dict = None, label: str = "") -> list:
+    """
+    Cypher 쿼리 실행 (읽기 전용)
+    NEO4J_READ_ROUTING이면 관리형 읽기 트랜잭션으로 실행 → 클러스터 팔로워로 라우팅
+    (쓰기 문장을 넘기면 서버가 거부하므로 쓰기는 run_write_query 사용)
+    label: 계측 로그 라벨 (생략 시 호출 위치 모듈.함수)
+    """
+    if not settings.NEO4J_QUERY_PROFILE:
+        return await _run_read(query, parameters)
+
+    label = label or query_log.caller_label()
+    summaries: list = []
+    start = time.perf_counter()
+    records = await _run_read(query_log.profiled_cypher(query), parameters, summaries)
+    query_log.record_query(
+        label, query, (time.perf_counter() - start) * 1000, len(records),
+        summaries[-1] if summaries else None,
+    )
+    return records
+
+
+async def _run_read(query: str, parameters: dict | None, summaries: list | None = None) -> list:
+    """읽기 실행 본체 (READ 라우팅 여부에 따라 관리형 트랜잭션 / 자동 커밋)"""
+    if settings.NEO4J_READ_ROUTING:
+        return await execute_read(tx_fetch, query, parameters, summaries)
+
+    async with neo4j_session() as session:
         result = await session.run(query, parameters or {})
         records = [record.data() async for record in result]
+        if summaries is not None:
+            summaries.append(await result.consume())
         return records
 
 
-async def run_write_query(query: str, parameters: dict = None) -> None:
-    """Cypher 쿼리 실행 (쓰기)"""
+async def run_write_query(query: str, parameters: dict = None, label: str = "") -> dict:
+    """
+    Cypher 쿼리 실행 (쓰기, 관리형 트랜잭션 — 일시 오류 자동 재시도)
+    반환: 쓰기 카운터 {nodes_created, relationships_created, properties_set, ...}
+    label: 계측 로그 라벨 (생략 시 호출 위치 모듈.함수)
+    """
+    if not settings.NEO4J_QUERY_PROFILE:
+        return await execute_write(tx_run, query, parameters)
+
+    label = label or query_log.caller_label()
+    summaries: list = []
+    start = time.perf_counter()
+    counters = await execute_write(tx_run, query_log.profiled_cypher(query), parameters, summaries)
+    query_log.record_query(
+        label, query, (time.perf_counter() - start) * 1000, 0,
+        summaries[-1] if summaries else None,
+    )
+    return counters
+
+
+async def run_write_batches(
+    query: str, rows: list[dict], label: str = "", chunk_size: int | None = None,
+    parameters: dict = None, counters: list | None = None,
+) -> int:
+    """
+    UNWIND 배치 쓰기
+    - query는 `UNWIND $rows AS row ...` 형태로 작성
+    - rows를 chunk_size(기본 NEO4J_BATCH_SIZE) 단위로 나눠 청크당 명시적 쓰기 트랜잭션 1회 실행
+    - parameters: 모든 청크에 공통으로 전달할 추가 파라미터
+    - counters 지정 시 커밋된 청크별 쓰기 카운터 dict를 추가 (merge_counters로 합산)
+    - 일시 오류(TransientError/연결 끊김)는 해당 청크만 NEO4J_BATCH_MAX_RETRIES회까지 재시도
+      (청크 단위 트랜잭션이므로 재실행해도 중복 없음 — MERGE 기반 쿼리 전제)
+    반환: 처리 행 수
+    """
+    if _driver is None:
+        raise RuntimeError("Neo4j가 연결되지 않았습니다.")
+    if not rows:
+        return 0
+
+    chunk_size = chunk_size or settings.NEO4J_BATCH_SIZE
+    start = time.perf_counter()
+
+    retries = 0
+    async with neo4j_session() as session:
+        for i in range(0, len(rows), chunk_size):
+            params = {**(parameters or {}), "rows": rows[i:i + chunk_size]}
+            attempt = 0
+            while True:
+                try:
+                    async with await session.begin_transaction() as tx:
+                        result = await tx.run(query, params)
+                        summary = await result.consume()
+                        await tx.commit()
+                    if counters is not None:
+                        counters.append({key: getattr(summary.counters, key) for key in COUNTER_KEYS})
+                    break
+                except (TransientError, ServiceUnavailable, SessionExpired) as e:
+                    if attempt >= settings.NEO4J_BATCH_MAX_RETRIES:
+                        raise
+                    attempt += 1
+                    retries += 1
+                    delay = settings.NEO4J_BATCH_RETRY_DELAY * (2 ** (attempt - 1))
+                    print(
+                        f"[Neo4j] {label or '배치 적재'} 청크 {i // chunk_size + 1} "
+                        f"재시도 {attempt}/{settings.NEO4J_BATCH_MAX_RETRIES} ({delay:.1f}s 후): {e}"
+                    )
+                    await asyncio.sleep(delay)
+
+    elapsed = time.perf_counter() - start
+    rate = len(rows) / elapsed if elapsed > 0 else float(len(rows))
+    print(
+        f"[Neo4j] {label or '배치 적재'} {len(rows)}건 "
+        f"({elapsed:.2f}s, {rate:,.0f}건/s, 청크 {chunk_size}"
+        + (f", 재시도 {retries}회" if retries else "") + ")"
+    )
+    return len(rows)
+
+
+async def run_batched_delete(
+    query: str, parameters: dict = None, label: str = "", batch_size: int | None = None,
+) -> int:
+    """
+    배치 삭제 (트랜잭션 메모리 한도 회피)
+    - query는 `... WITH x LIMIT $batch (DETACH) DELETE x RETURN count(*) AS deleted` 형태로 작성
+    - 삭제 건수가 0이 될 때까지 배치당 쓰기 트랜잭션 1회 반복 실행
+    반환: 총 삭제 건수
+    """
+    return await _run_until_exhausted(query, parameters, label or "삭제", batch_size, "deleted")
+
+
+async def run_batched_update(
+    query: str, parameters: dict = None, label: str = "", batch_size: int | None = None,
+) -> int:
+    """
+    배치 갱신 (속성 백필 등)
+    - query는 `... WHERE <미갱신 조건> WITH x LIMIT $batch SET ... RETURN count(*) AS updated` 형태로 작성
+      (갱신된 노드가 다시 조건에 걸리지 않아야 함)
+    반환: 총 갱신 건수
+    """
+    return await _run_until_exhausted(query, parameters, label or "갱신", batch_size, "updated")
+
+
+async def _run_until_exhausted(
+    query: str, parameters: dict | None, label: str, batch_size: int | None, count_key: str,
+) -> int:
+    """처리 건수가 배치 크기 미만이 될 때까지 배치당 쓰기 트랜잭션 1회 반복 실행"""
     if _driver is None:
         raise RuntimeError("Neo4j가 연결되지 않았습니다.")
 
-    async with _driver.session(database=settings.NEO4J_DATABASE) as session:
-        await session.run(query, parameters or {})
+    batch_size = batch_size or settings.NEO4J_DELETE_BATCH_SIZE
+    params = {**(parameters or {}), "batch": batch_size}
+    start = time.perf_counter()
+    total = 0
+
+    async with neo4j_session() as session:
+        while True:
+            async with await session.begin_transaction() as tx:
+                result = await tx.run(query, params)
+                record = await result.single()
+                await tx.commit()
+            count = record[count_key] if record else 0
+            if count == 0:
+                break
+            total += count
+            elapsed = time.perf_counter() - start
+            print(
+                f"[Neo4j] {label} 진행: {total}건 "
+                f"({total / elapsed if elapsed > 0 else total:,.0f}건/s)"
+            )
+            if count < batch_size:
+                break
+
+    elapsed = time.perf_counter() - start
+    print(f"[Neo4j] {label} 완료: {total}건 ({elapsed:.2f}s)")
+    return total
 
 
 async def _create_constraints_and_indexes():
@@ -80,6 +342,8 @@ async def _create_constraints_and_indexes():
         "CREATE CONSTRAINT IF NOT EXISTS FOR (ce:CostElement) REQUIRE ce.ce_cd IS UNIQUE",
         "CREATE CONSTRAINT IF NOT EXISTS FOR (v:Variance) REQUIRE v.var_id IS UNIQUE",
         "CREATE CONSTRAINT IF NOT EXISTS FOR (e:Event) REQUIRE e.event_id IS UNIQUE",
+        "CREATE CONSTRAINT IF NOT EXISTS FOR (cp:CostPool) REQUIRE cp.pool_id IS UNIQUE",
+        "CREATE CONSTRAINT IF NOT EXISTS FOR (b:MonthBuild) REQUIRE b.yyyymm IS UNIQUE",
     ]
 
     indexes = [
@@ -87,6 +351,11 @@ async def _create_constraints_and_indexes():
         "CREATE INDEX IF NOT EXISTS FOR (v:Variance) ON (v.product_cd)",
         "CREATE INDEX IF NOT EXISTS FOR (v:Variance) ON (v.product_grp)",
         "CREATE INDEX IF NOT EXISTS FOR (v:Variance) ON (v.var_type)",
+        # Rule 6 유사 사례 탐색용 복합 인덱스 (동등 3개 + 기준월 범위)
+        "CREATE INDEX variance_similar_key IF NOT EXISTS "
+        "FOR (v:Variance) ON (v.proc_cd, v.ce_cd, v.var_type, v.yyyymm)",
+        # 같은 (기준월, 제품, 공정, 원가요소) 형제 차이 조회용 키 (동등 / 접두어 탐색)
+        "CREATE INDEX variance_var_key IF NOT EXISTS FOR (v:Variance) ON (v.var_key)",
         "CREATE INDEX IF NOT EXISTS FOR (e:Event) ON (e.yyyymm)",
         "CREATE INDEX IF NOT EXISTS FOR (e:Event) ON (e.source)",
     ]
@@ -94,7 +363,7 @@ async def _create_constraints_and_indexes():
     if _driver is None:
         return
 
-    async with _driver.session(database=settings.NEO4J_DATABASE) as session:
+    async with neo4j_session() as session:
         for query in constraints + indexes:
             try:
                 await session.run(query)
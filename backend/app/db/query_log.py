@@ -0,0 +1,175 @@
+"""
+Neo4j 쿼리 계측 / 느린 쿼리 로그
+- NEO4J_QUERY_PROFILE=True일 때 run_query / run_write_query가 호출
+- 쿼리별 소요 시간, 반환 행 수, 서버 처리 시간, (PROFILE 시) DB hits / 연산자 기록
+- 호출 위치 라벨(모듈.함수) 또는 호출 측이 지정한 라벨로 태깅
+- NEO4J_SLOW_QUERY_MS 이상인 쿼리만 회전 JSONL 로그에 1줄씩 기록
+  (이벤트 루프에서는 QueueHandler로 큐에 넣기만 하고, 파일 쓰기 / 회전은 QueueListener 스레드가 수행)
+- top_queries(): 로그(회전 파일 포함)를 읽어 라벨/쿼리별 누적 시간 순 집계
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import re
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+from app.config import settings
+
+
+_logger: logging.Logger | None = None
+_listener: QueueListener | None = None
+_WHITESPACE = re.compile(r"\s+")
+_PLAN_PREFIX = re.compile(r"^\s*(EXPLAIN|PROFILE)\b", re.IGNORECASE)
+
+
+def _get_logger() -> logging.Logger:
+    """
+    느린 쿼리 로거 (최초 기록 시 연결)
+    로거에는 QueueHandler만 두고, 회전 파일 핸들러는 QueueListener 백그라운드 스레드가 실행
+    """
+    global _logger, _listener
+    if _logger is None:
+        path = Path(settings.NEO4J_SLOW_QUERY_LOG)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.NEO4J_SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.NEO4J_SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(records, file_handler)
+        _listener.start()
+        # 스크립트 등 close()를 호출하지 않는 실행도 종료 시 큐를 비움
+        atexit.register(close)
+
+        logger = logging.getLogger("app.neo4j.slow_query")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(QueueHandler(records))
+        _logger = logger
+    return _logger
+
+
+def close():
+    """큐에 남은 기록을 파일에 쓰고 리스너 종료 (앱 종료 시 호출, 시작 전이면 무시)"""
+    global _logger, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+    _logger, _listener = None, None
+
+
+def caller_label(depth: int = 2) -> str:
+    """호출 위치 라벨 (모듈.함수) — depth는 이 함수 기준 거슬러 올라갈 프레임 수"""
+    frame = sys._getframe(depth)
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+def profiled_cypher(query: str) -> str:
+    """NEO4J_QUERY_PROFILE_PLANS이면 PROFILE 접두어 추가 (이미 EXPLAIN/PROFILE이면 그대로)"""
+    if settings.NEO4J_QUERY_PROFILE_PLANS and not _PLAN_PREFIX.match(query):
+        return f"PROFILE {query}"
+    return query
+
+
+def _operators(plan: dict) -> list[dict]:
+    """PROFILE 계획 트리 → 연산자 목록 (깊이 우선)"""
+    node = {
+        "operator": plan.get("operatorType"),
+        "db_hits": plan.get("dbHits", 0),
+        "rows": plan.get("rows", 0),
+    }
+    return [node] + [op for child in plan.get("children", []) for op in _operators(child)]
+
+
+def record_query(label: str, query: str, elapsed_ms: float, rows: int, summary=None):
+    """
+    쿼리 1건 계측 결과 기록 (NEO4J_SLOW_QUERY_MS 미만이면 무시)
+    summary: neo4j ResultSummary (없으면 서버 시간 / 계획 생략)
+    """
+    if elapsed_ms < settings.NEO4J_SLOW_QUERY_MS:
+        return
+
+    text = _WHITESPACE.sub(" ", query).strip()
+    entry = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "label": label,
+        "query_hash": hashlib.md5(text.encode("utf-8")).hexdigest()[:12],
+        "query": text[:2000],
+        "elapsed_ms": round(elapsed_ms, 2),
+        "rows": rows,
+        "server_ms": None,
+        "db_hits": None,
+        "operators": None,
+    }
+    if summary is not None:
+        available = summary.result_available_after or 0
+        consumed = summary.result_consumed_after or 0
+        entry["server_ms"] = available + consumed
+        if summary.profile:
+            operators = _operators(summary.profile)
+            entry["db_hits"] = sum(op["db_hits"] for op in operators)
+            entry["operators"] = operators
+
+    _get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+    print(f"[Neo4j] 느린 쿼리 {entry['elapsed_ms']:.0f}ms ({label})")
+
+
+def top_queries(limit: int = 20) -> list[dict]:
+    """
+    느린 쿼리 로그 집계 (현재 파일 + 회전 보관 파일)
+    반환: (라벨, 쿼리 해시)별 {count, total_ms, avg_ms, max_ms, total_rows, total_db_hits} — 누적 시간 내림차순
+    """
+    path = Path(settings.NEO4J_SLOW_QUERY_LOG)
+    files = [path] + [
+        path.with_name(f"{path.name}.{i}")
+        for i in range(1, settings.NEO4J_SLOW_QUERY_LOG_BACKUPS + 1)
+    ]
+
+    stats: dict[tuple[str, str], dict] = {}
+    for file in files:
+        if not file.exists():
+            continue
+        with file.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                key = (entry["label"], entry["query_hash"])
+                stat = stats.setdefault(key, {
+                    "label": entry["label"],
+                    "query_hash": entry["query_hash"],
+                    "query": entry["query"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "total_rows": 0,
+                    "total_db_hits": None,
+                    "last_seen": entry["ts"],
+                })
+                stat["count"] += 1
+                stat["total_ms"] += entry["elapsed_ms"]
+                stat["max_ms"] = max(stat["max_ms"], entry["elapsed_ms"])
+                stat["total_rows"] += entry.get("rows") or 0
+                if entry.get("db_hits") is not None:
+                    stat["total_db_hits"] = (stat["total_db_hits"] or 0) + entry["db_hits"]
+                stat["last_seen"] = max(stat["last_seen"], entry["ts"])
+
+    ranked = sorted(stats.values(), key=lambda s: s["total_ms"], reverse=True)[:limit]
+    for stat in ranked:
+        stat["total_ms"] = round(stat["total_ms"], 2)
+        stat["avg_ms"] = round(stat["total_ms"] / stat["count"], 2)
+    return ranked
@@ -16,6 +16,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.db.database import init_db, close_db
 from app.db.neo4j_db import init_neo4j, close_neo4j
+from app.db import query_log
+from app.services.variance_calc import shutdown_pool
 from app.api.dashboard import router as dashboard_router
 from app.api.analysis import router as analysis_router
 from app.api.chat import router as chat_router
@@ -32,6 +34,8 @@ async def lifespan(app: FastAPI):
     # 종료 시
     await close_db()
     await close_neo4j()
+    shutdown_pool()
+    query_log.close()
 
 
 app = FastAPI(
@@ -1,6 +1,6 @@
 # 데이터 모델
 from app.models.master import (
-    MstProduct, MstProcess, MstEquipment, MstMaterial, MstCostElement,
+    MstProduct, MstProcess, MstEquipment, MstMaterial, MstCostElement, MstVersion,
 )
 from app.models.snapshot import (
     SnpCostResult, SnpAllocRate, SnpAllocResult, SnpBom,
@@ -9,5 +9,5 @@ from app.models.event import (
     EvtMes, EvtPlm, EvtPurchase,
 )
 from app.models.variance import (
-    CalVariance,
+    CalVariance, CalSourceHash,
 )
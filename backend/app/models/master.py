@@ -1,9 +1,10 @@
 """
 Layer A: 마스터 데이터 모델
 - 제품, 공정, 장비, 자재, 원가요소
+- 마스터 버전 (mst_* 변경 시 트리거가 테이블별 버전 증가 → 캐시 신선도 확인용)
 """
 
-from sqlalchemy import String, Column, CHAR, DECIMAL
+from sqlalchemy import String, Column, CHAR, DECIMAL, BigInteger, DateTime, DDL, event, func
 from app.db.database import Base
 
 
@@ -57,3 +58,41 @@ class MstCostElement(Base):
     ce_cd = Column(String(20), primary_key=True, comment="원가요소코드")
     ce_nm = Column(String(100), comment="원가요소명")
     ce_grp = Column(String(20), comment="원가요소그룹 (FIXED/VARIABLE/MIXED)")
+
+
+class MstVersion(Base):
+    """마스터 테이블 버전 — INSERT/UPDATE/DELETE/TRUNCATE 문장마다 트리거가 증가"""
+    __tablename__ = "mst_version"
+
+    table_nm = Column(String(30), primary_key=True, comment="마스터 테이블명")
+    version = Column(BigInteger, nullable=False, default=0, comment="변경 횟수")
+    updated_at = Column(DateTime, server_default=func.now(), comment="마지막 변경 시각")
+
+
+# 버전 추적 대상 마스터 테이블
+VERSIONED_TABLES = ["mst_product", "mst_process", "mst_material", "mst_equipment"]
+
+_BUMP_FUNCTION = DDL("""
+    CREATE OR REPLACE FUNCTION bump_mst_version() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO mst_version (table_nm, version, updated_at)
+        VALUES (TG_TABLE_NAME, 1, now())
+        ON CONFLICT (table_nm)
+        DO UPDATE SET version = mst_version.version + 1, updated_at = now();
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+""")
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_version_triggers(target, connection, **kw):
+    """create_all 후 버전 증가 함수 / 문장 단위 트리거 설치 (멱등)"""
+    connection.execute(_BUMP_FUNCTION)
+    for table_nm in VERSIONED_TABLES:
+        connection.execute(DDL(f"DROP TRIGGER IF EXISTS trg_{table_nm}_version ON {table_nm}"))
+        connection.execute(DDL(
+            f"CREATE TRIGGER trg_{table_nm}_version "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table_nm} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_mst_version()"
+        ))
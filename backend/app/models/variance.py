@@ -4,6 +4,7 @@ Layer D: 차이 계산 결과 데이터 모델
 - 전공정: RATE_VAR, QTY_VAR, RATE_COST, RATE_BASE
 - 후공정 재료비: PRICE_VAR, USAGE_VAR
 - 후공정 가공비: RATE_VAR, QTY_VAR
+- 계산 입력 스냅샷 행 해시 (증분 재계산용 변경 감지)
 """
 
 from sqlalchemy import String, Column, CHAR, Float
@@ -25,3 +26,14 @@ class CalVariance(Base):
     var_rate = Column(Float, comment="차이비율")
     prev_amt = Column(Float, comment="전월 금액")
     curr_amt = Column(Float, comment="당월 금액")
+
+
+class CalSourceHash(Base):
+    """차이 계산 입력 스냅샷 행 해시 — 계산월별로 마지막 계산 시점의 입력을 기록"""
+    __tablename__ = "cal_source_hash"
+
+    calc_yyyymm = Column(CHAR(6), primary_key=True, comment="계산 기준월")
+    table_nm = Column(String(30), primary_key=True, comment="스냅샷 테이블명")
+    src_yyyymm = Column(CHAR(6), primary_key=True, comment="스냅샷 기준월 (당월/전월)")
+    row_key = Column(String(100), primary_key=True, comment="행 키 (키 컬럼 JSON 배열)")
+    row_hash = Column(CHAR(32), nullable=False, comment="행 내용 md5")
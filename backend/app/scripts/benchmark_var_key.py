@@ -0,0 +1,157 @@
+"""
+형제 차이 조회 실행 계획 벤치마크 (var_key 인덱스 전/후)
+- Rule 1b / 1c / 2 및 인과 분석(causal-analysis) 조회를
+  기존 방식(yyyymm/product_cd/proc_cd/ce_cd 속성 매칭)과 var_key 탐색 방식으로 각각
+  EXPLAIN + PROFILE 실행 (읽기 전용: MERGE 대신 count(*) 반환)
+- 연산자 트리 / DB hits / 행 수 / 소요 시간을 JSON으로 기록
+
+실행 방법:
+  cd backend
+  python -m app.scripts.benchmark_var_key 202501 [출력 경로]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from neo4j import READ_ACCESS
+
+from app.db.neo4j_db import init_neo4j, close_neo4j, neo4j_session
+
+
+DEFAULT_YYYYMM = "202501"
+DEFAULT_PRODUCT = "HBM_001"
+
+# 조회명 → (기존 쿼리, var_key 쿼리)
+QUERIES: dict[str, tuple[str, str]] = {
+    "rule_01b": (
+        """
+        MATCH (rv:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+        WHERE rv.product_cd IS NOT NULL
+        MATCH (qv:Variance {yyyymm: $yyyymm, var_type: 'QTY_VAR', product_cd: rv.product_cd,
+                            proc_cd: rv.proc_cd, ce_cd: rv.ce_cd})
+        RETURN count(*) AS pairs
+        """,
+        """
+        MATCH (rv:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+        WHERE rv.product_cd IS NOT NULL
+        MATCH (qv:Variance {var_key: rv.var_key, var_type: 'QTY_VAR'})
+        USING INDEX qv:Variance(var_key)
+        RETURN count(*) AS pairs
+        """,
+    ),
+    "rule_01c": (
+        """
+        MATCH (pv:Variance {yyyymm: $yyyymm, var_type: 'PRICE_VAR'})
+        WHERE pv.product_cd IS NOT NULL
+        MATCH (uv:Variance {yyyymm: $yyyymm, var_type: 'USAGE_VAR', product_cd: pv.product_cd,
+                            proc_cd: pv.proc_cd, ce_cd: pv.ce_cd})
+        RETURN count(*) AS pairs
+        """,
+        """
+        MATCH (pv:Variance {yyyymm: $yyyymm, var_type: 'PRICE_VAR'})
+        WHERE pv.product_cd IS NOT NULL
+        MATCH (uv:Variance {var_key: pv.var_key, var_type: 'USAGE_VAR'})
+        USING INDEX uv:Variance(var_key)
+        RETURN count(*) AS pairs
+        """,
+    ),
+    "rule_02": (
+        """
+        MATCH (rate:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+        WHERE rate.product_cd IS NOT NULL
+        MATCH (sub:Variance {yyyymm: $yyyymm, product_cd: rate.product_cd,
+                             proc_cd: rate.proc_cd, ce_cd: rate.ce_cd})
+        WHERE sub.var_type IN ['RATE_COST', 'RATE_BASE']
+        RETURN count(*) AS pairs
+        """,
+        """
+        MATCH (rate:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+        WHERE rate.product_cd IS NOT NULL
+        MATCH (sub:Variance {var_key: rate.var_key})
+        USING INDEX sub:Variance(var_key)
+        WHERE sub.var_type IN ['RATE_COST', 'RATE_BASE']
+        RETURN count(*) AS pairs
+        """,
+    ),
+    "causal_analysis": (
+        """
+        MATCH (v:Variance {yyyymm: $yyyymm, product_cd: $product_cd})
+        RETURN count(v) AS nodes
+        """,
+        """
+        MATCH (v:Variance) USING INDEX v:Variance(var_key)
+        WHERE v.var_key STARTS WITH $prefix
+        RETURN count(v) AS nodes
+        """,
+    ),
+}
+
+
+def _operators(plan: dict) -> list[dict]:
+    """실행 계획 트리 → 연산자 목록 (깊이 우선)"""
+    args = plan.get("args") or plan.get("arguments") or {}
+    node = {
+        "operator": plan.get("operatorType"),
+        "details": args.get("Details"),
+        "db_hits": plan.get("dbHits"),
+        "rows": plan.get("rows"),
+    }
+    return [node] + [op for child in plan.get("children", []) for op in _operators(child)]
+
+
+async def _plan(session, mode: str, query: str, params: dict) -> dict:
+    """EXPLAIN / PROFILE 실행 후 계획 요약"""
+    start = time.perf_counter()
+    result = await session.run(f"{mode} {query}", params)
+    records = [record.data() async for record in result]
+    summary = await result.consume()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    plan = summary.profile if mode == "PROFILE" else summary.plan
+    operators = _operators(plan or {})
+    return {
+        "elapsed_ms": round(elapsed_ms, 2),
+        "result": records[0] if records else None,
+        "total_db_hits": sum(op["db_hits"] or 0 for op in operators) if mode == "PROFILE" else None,
+        "operators": operators,
+    }
+
+
+async def benchmark(yyyymm: str, output: Path):
+    await init_neo4j()
+    params = {
+        "yyyymm": yyyymm,
+        "product_cd": DEFAULT_PRODUCT,
+        "prefix": f"{yyyymm}|{DEFAULT_PRODUCT}|",
+    }
+
+    report = {"yyyymm": yyyymm, "product_cd": DEFAULT_PRODUCT, "queries": {}}
+    async with neo4j_session(READ_ACCESS) as session:
+        for name, (before, after) in QUERIES.items():
+            entry = {}
+            for variant, query in [("before", before), ("after", after)]:
+                entry[variant] = {
+                    "explain": await _plan(session, "EXPLAIN", query, params),
+                    "profile": await _plan(session, "PROFILE", query, params),
+                }
+            report["queries"][name] = entry
+            print(
+                f"[Benchmark] {name}: DB hits "
+                f"{entry['before']['profile']['total_db_hits']} → {entry['after']['profile']['total_db_hits']}, "
+                f"{entry['before']['profile']['elapsed_ms']}ms → {entry['after']['profile']['elapsed_ms']}ms"
+            )
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    print(f"[Benchmark] 실행 계획 기록: {output}")
+    await close_neo4j()
+
+
+if __name__ == "__main__":
+    ym = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_YYYYMM
+    out = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(f"benchmarks/var_key_plans_{ym}.json")
+    asyncio.run(benchmark(ym, out))
@@ -27,9 +27,10 @@ import app.models.event        # noqa: F401
 import app.models.variance     # noqa: F401
 
 import app.db.database as database
-from app.db.neo4j_db import init_neo4j, close_neo4j, run_query
+from app.db.neo4j_db import init_neo4j, close_neo4j
 from app.services.graph_builder import GraphBuilder
-from app.services.rule_engine import RuleEngine
+from app.services.rule_engine import create_rule_engine
+from app.services.graph_stats import graph_stats
 
 
 YYYYMM = "202501"
@@ -79,7 +80,7 @@ async def build_graph():
         # ── 6. Step 4d: 인과관계 규칙 엔진 ──
         print()
         print(f"[Step 4d] 인과관계 규칙 엔진 실행 ({YYYYMM})...")
-        rule_engine = RuleEngine()
+        rule_engine = create_rule_engine()
         await rule_engine.execute_all_rules(YYYYMM)
 
     # ── 7. 검증 및 통계 ──
@@ -99,44 +100,26 @@ async def build_graph():
 
 async def _print_graph_stats():
     """Neo4j 노드/관계 통계 출력"""
+    stats = await graph_stats.get(force=True)
 
     # 노드 레이블별 카운트
-    node_labels = [
-        "ProductGroup", "Product", "Process", "ProcessGroup",
-        "Equipment", "Material", "CostElement", "AllocBase",
-        "Variance", "Event",
-    ]
     print()
     print("  [노드 통계]")
     print("  " + "-" * 45)
-    total_nodes = 0
-    for label in node_labels:
-        rows = await run_query(f"MATCH (n:{label}) RETURN count(n) AS cnt")
-        cnt = rows[0]["cnt"] if rows else 0
-        total_nodes += cnt
+    for label, cnt in stats["nodes"].items():
         print(f"    {label:20s}: {cnt:>5}개")
     print("  " + "-" * 45)
-    print(f"    {'총 노드 수':20s}: {total_nodes:>5}개")
+    print(f"    {'총 노드 수':20s}: {stats['total_nodes']:>5}개")
 
     # 관계 유형별 카운트
-    rel_types = [
-        "CONTAINS", "COST_AT", "HAS_SUBPROCESS", "HAS_EQUIPMENT",
-        "COST_COMPOSED_OF", "ALLOCATED_BY", "USES_MATERIAL", "CONSUMES_GAS",
-        "OCCURS_AT", "OCCURS_IN", "RELATES_TO", "INVOLVES",
-        "CAUSED_BY", "EVIDENCED_BY", "SPREADS_TO", "SIMILAR_TO",
-    ]
     print()
     print("  [관계 통계]")
     print("  " + "-" * 45)
-    total_rels = 0
-    for rtype in rel_types:
-        rows = await run_query(f"MATCH ()-[r:{rtype}]->() RETURN count(r) AS cnt")
-        cnt = rows[0]["cnt"] if rows else 0
-        total_rels += cnt
+    for rtype, cnt in stats["relationships"].items():
         if cnt > 0:
             print(f"    {rtype:20s}: {cnt:>5}개")
     print("  " + "-" * 45)
-    print(f"    {'총 관계 수':20s}: {total_rels:>5}개")
+    print(f"    {'총 관계 수':20s}: {stats['total_relationships']:>5}개")
 
 
 if __name__ == "__main__":
@@ -24,9 +24,9 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
 from app.db.database import init_db, _async_session_factory
 from app.db.neo4j_db import init_neo4j
-from app.services.variance_calc import VarianceCalculator
+from app.services.variance_calc import VarianceCalculator, shutdown_pool
 from app.services.graph_builder import GraphBuilder
-from app.services.rule_engine import RuleEngine
+from app.services.rule_engine import create_rule_engine
 from app.services.evidence import EvidenceBuilder
 from app.services.llm_engine import LLMEngine
 
@@ -55,10 +55,10 @@ async def run_monthly_process(yyyymm: str):
         variances = await calculator.calculate_all(yyyymm)
         print(f"[Step 3] 완료: {len(variances)}건 생성")
 
-        # ── Step 4a: 상설 그래프 갱신 ──
+        # ── Step 4a: 상설 그래프 갱신 (변경분만) ──
         print("\n[Step 4a] 상설 그래프 갱신...")
         builder = GraphBuilder(session)
-        await builder.build_permanent_graph()
+        await builder.build_permanent_graph(delta=True)
 
         # ── Step 4b: 차이 노드 생성 ──
         print("\n[Step 4b] 차이 노드 생성...")
@@ -70,7 +70,7 @@ async def run_monthly_process(yyyymm: str):
 
         # ── Step 4d: 인과관계 연결 ──
         print("\n[Step 4d] 인과관계 규칙 엔진 실행...")
-        rule_engine = RuleEngine()
+        rule_engine = create_rule_engine()
         await rule_engine.execute_all_rules(yyyymm)
 
         # ── Step 5: LLM 해석 생성 ──
@@ -92,4 +92,7 @@ async def run_monthly_process(yyyymm: str):
 
 if __name__ == "__main__":
     yyyymm = sys.argv[1] if len(sys.argv) > 1 else "202501"
-    asyncio.run(run_monthly_process(yyyymm))
+    try:
+        asyncio.run(run_monthly_process(yyyymm))
+    finally:
+        shutdown_pool()
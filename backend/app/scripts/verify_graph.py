@@ -126,7 +126,8 @@ async def verify():
     rows = await run_query("""
         MATCH (v1:Variance {var_type: 'RATE_VAR', proc_cd: 'FE_01', ce_cd: 'CE_DEP',
                             yyyymm: '202501', product_cd: 'HBM_001'})
-              -[:SPREADS_TO]->(v2:Variance)
+              -[:SPREADS_TO]->(:CostPool)-[:AFFECTS]->(v2:Variance)
+        WHERE v2.product_cd <> v1.product_cd
         RETURN v2.product_cd AS prod, v2.var_amt AS amt, v2.var_rate AS rate
         ORDER BY abs(v2.var_amt) DESC
     """)
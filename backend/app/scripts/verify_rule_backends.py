@@ -0,0 +1,121 @@
+"""
+규칙 백엔드 적합성 검증 스크립트
+- Cypher 백엔드(RuleEngine.evaluate)와 Python 백엔드(FrameRuleEngine.evaluate)로
+  Rule 1~5를 각각 평가해 관계 집합/속성 비교
+- 읽기 전용: 두 백엔드 모두 관계 목록만 계산하고 그래프에는 기록하지 않음
+- rule_id별 관계 집합 차이(누락 / 초과) 또는 속성 불일치가 하나라도 있거나,
+  평가된 관계가 없으면 종료 코드 1 (CI 적합성 검사로 사용)
+
+실행 방법:
+  cd backend
+  python -m app.scripts.verify_rule_backends 202501
+"""
+
+import asyncio
+import math
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import app.models.master       # noqa: F401
+import app.models.snapshot     # noqa: F401
+import app.models.event        # noqa: F401
+import app.models.variance     # noqa: F401
+
+import app.db.database as database
+from app.db.neo4j_db import init_neo4j, close_neo4j
+from app.services.rule_engine import RuleEngine
+from app.services.frame_rules import FrameRuleEngine
+
+
+DEFAULT_YYYYMM = "202501"
+PROP_KEYS = ["contribution", "match_score", "same_alloc_base"]
+
+
+def _same(a, b) -> bool:
+    """속성값 비교 (실수는 상대 오차 허용)"""
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    return a == b
+
+
+def _edge_map(evaluated: dict[str, list[dict]]) -> dict[tuple, dict]:
+    """규칙별 평가 결과 → {(관계 유형, rule_id, 시작, 끝): 속성}"""
+    return {
+        (e["rel"], e["rule_id"], e["src"], e["dst"]): e["props"]
+        for edges in evaluated.values() for e in edges
+    }
+
+
+def compare(cypher_edges: dict[tuple, dict], python_edges: dict[tuple, dict]) -> dict[str, dict]:
+    """
+    rule_id별 관계 집합 / 속성 비교
+    반환: {rule_id: {"cypher", "python", "missing", "extra", "diff_props"}} — missing/extra/diff_props는 관계 키 목록
+    """
+    rule_ids = sorted({key[1] for key in cypher_edges.keys() | python_edges.keys()})
+    report = {}
+    for rule_id in rule_ids:
+        cypher = {key for key in cypher_edges if key[1] == rule_id}
+        python = {key for key in python_edges if key[1] == rule_id}
+        report[rule_id] = {
+            "cypher": len(cypher),
+            "python": len(python),
+            "missing": sorted(cypher - python),
+            "extra": sorted(python - cypher),
+            "diff_props": sorted(
+                key for key in cypher & python
+                if any(
+                    not _same(cypher_edges[key].get(prop), python_edges[key].get(prop))
+                    for prop in PROP_KEYS
+                    if prop in python_edges[key] or prop in cypher_edges[key]
+                )
+            ),
+        }
+    return report
+
+
+async def verify(yyyymm: str) -> int:
+    """
+    두 백엔드 평가 결과 비교
+    반환(종료 코드): 0 = 모든 rule_id 일치, 1 = 불일치 또는 평가된 관계가 없음 (검증 불가)
+    """
+    await database.init_db()
+    await init_neo4j()
+    try:
+        print(f"[Verify] {yyyymm} Cypher 백엔드 평가")
+        cypher_edges = _edge_map(await RuleEngine().evaluate(yyyymm))
+
+        print(f"[Verify] {yyyymm} Python 백엔드 평가")
+        python_edges = _edge_map(await FrameRuleEngine().evaluate(yyyymm))
+    finally:
+        await close_neo4j()
+
+    report = compare(cypher_edges, python_edges)
+    failed = []
+    for rule_id, result in report.items():
+        mismatched = result["missing"] or result["extra"] or result["diff_props"]
+        print(
+            f"  [{rule_id}] {'불일치' if mismatched else '일치'}: "
+            f"Cypher {result['cypher']}, Python {result['python']}, "
+            f"Python 누락 {len(result['missing'])}, Python 초과 {len(result['extra'])}, "
+            f"속성 불일치 {len(result['diff_props'])}"
+        )
+        for label in ["missing", "extra", "diff_props"]:
+            for key in result[label][:10]:
+                print(f"    {label}: {key}")
+        if mismatched:
+            failed.append(rule_id)
+
+    if not report:
+        print(f"[Verify] 실패: {yyyymm} 평가된 관계가 없음 (차이 / 이벤트 데이터 확인)")
+        return 1
+    if failed:
+        print(f"[Verify] 실패: {', '.join(failed)} 백엔드 결과 불일치")
+        return 1
+    print(f"[Verify] 통과: {len(report)}개 rule_id 관계 집합 / 속성 일치")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(verify(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_YYYYMM)))
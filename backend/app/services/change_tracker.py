@@ -0,0 +1,113 @@
+"""
+스냅샷 변경 감지
+- 차이 계산 입력 스냅샷(snp_alloc_rate / snp_alloc_result / snp_bom) 행 해시 비교
+- 계산월별로 마지막 계산 시점의 입력 행 해시를 cal_source_hash에 기록
+- 저장된 해시와 현재 스냅샷을 비교해 추가/변경/삭제된 행 키만 반환
+- 행 키는 키 컬럼 JSON 배열 문자열 (NULL / 구분자 문자 포함 값도 손실 없이 복원)
+"""
+
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, bindparam
+
+
+# 추적 대상 스냅샷 테이블 → 행 키 컬럼 (기준월 제외)
+TRACKED_TABLES: dict[str, list[str]] = {
+    "snp_alloc_rate": ["proc_cd", "ce_cd"],
+    "snp_alloc_result": ["product_cd", "proc_cd", "ce_cd"],
+    "snp_bom": ["product_cd", "mat_cd"],
+}
+
+
+def _current_hashes_sql(table_nm: str) -> str:
+    """현재 스냅샷 행 키/해시 조회 SQL (키: json 배열 텍스트, 해시: md5(행 텍스트))"""
+    key_expr = "json_build_array(" + ", ".join(f"t.{c}" for c in TRACKED_TABLES[table_nm]) + ")::text"
+    return f"""
+        SELECT t.yyyymm AS src_yyyymm, {key_expr} AS row_key, md5(t::text) AS row_hash
+        FROM {table_nm} t
+        WHERE t.yyyymm IN :src_months
+    """
+
+
+class SnapshotChangeTracker:
+    """계산 입력 스냅샷 변경 감지기"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def detect_changes(
+        self, calc_yyyymm: str, src_months: list[str],
+    ) -> dict[str, list[tuple[str, tuple[str | None, ...]]]]:
+        """
+        마지막 계산 이후 변경된 입력 행 조회
+        - 반환: 테이블명 → [(스냅샷 기준월, 행 키 튜플), ...]
+        - 저장된 해시가 없으면 (최초 계산) 모든 행이 변경으로 간주됨
+        """
+        changes: dict[str, list[tuple[str, tuple[str | None, ...]]]] = {}
+
+        for table_nm in TRACKED_TABLES:
+            result = await self.session.execute(
+                text(f"""
+                    WITH cur AS ({_current_hashes_sql(table_nm)}),
+                         saved AS (
+                             SELECT src_yyyymm, row_key, row_hash
+                             FROM cal_source_hash
+                             WHERE calc_yyyymm = :calc AND table_nm = :table_nm
+                               AND src_yyyymm IN :src_months
+                         )
+                    SELECT coalesce(c.src_yyyymm, s.src_yyyymm) AS src_yyyymm,
+                           coalesce(c.row_key, s.row_key) AS row_key
+                    FROM cur c
+                    FULL OUTER JOIN saved s
+                      ON s.src_yyyymm = c.src_yyyymm AND s.row_key = c.row_key
+                    WHERE c.row_hash IS DISTINCT FROM s.row_hash
+                """).bindparams(bindparam("src_months", expanding=True)),
+                {"calc": calc_yyyymm, "table_nm": table_nm, "src_months": src_months},
+            )
+
+            changes[table_nm] = [
+                (row[0], tuple(json.loads(row[1])))
+                for row in result.fetchall()
+            ]
+
+        print(
+            f"[ChangeTracker] {calc_yyyymm} 변경 감지: "
+            + ", ".join(f"{t} {len(rows)}건" for t, rows in changes.items())
+        )
+        return changes
+
+    async def record(self, calc_sources: dict[str, list[str]]):
+        """
+        계산에 사용된 입력 행 해시 기록 (커밋은 호출 측 트랜잭션에서)
+        calc_sources: 계산월 → 입력 스냅샷 기준월 목록 ([전월, 당월])
+        기간 실행도 테이블당 1회 스캔 — 입력 기준월 합집합의 해시를 한 번 계산해
+        (계산월, 입력월) 쌍에 조인해 기록
+        """
+        calcs = [calc for calc, srcs in calc_sources.items() for _ in srcs]
+        srcs = [src for _, months in calc_sources.items() for src in months]
+        if not calcs:
+            return
+
+        await self.session.execute(
+            text("DELETE FROM cal_source_hash WHERE calc_yyyymm IN :calcs")
+            .bindparams(bindparam("calcs", expanding=True)),
+            {"calcs": sorted(calc_sources)},
+        )
+        for table_nm in TRACKED_TABLES:
+            await self.session.execute(
+                text(f"""
+                    INSERT INTO cal_source_hash (calc_yyyymm, table_nm, src_yyyymm, row_key, row_hash)
+                    SELECT p.calc_yyyymm, :table_nm, h.src_yyyymm, h.row_key, h.row_hash
+                    FROM ({_current_hashes_sql(table_nm)}) h
+                    JOIN unnest(CAST(:calc_list AS text[]), CAST(:src_list AS text[]))
+                         AS p(calc_yyyymm, src_yyyymm)
+                      ON p.src_yyyymm = h.src_yyyymm
+                """).bindparams(bindparam("src_months", expanding=True)),
+                {
+                    "table_nm": table_nm,
+                    "src_months": sorted(set(srcs)),
+                    "calc_list": calcs,
+                    "src_list": srcs,
+                },
+            )
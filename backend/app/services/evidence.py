@@ -6,12 +6,24 @@ LLM에게 제공할 증거 4종 조립:
   증거 2: 이벤트 매칭 (동일 시점 소스시스템 변동)
   증거 3: 파급 분석 (동일 배부기준 공유 제품 동반 변동)
   증거 4: 유사 과거 사례 (비슷한 변동 패턴 + 당시 원인)
+
+4종 증거는 asyncio.gather로 동시 조회 (Neo4j 3종은 조회마다 별도 세션,
+시계열은 전용 PostgreSQL 세션) → 패키지 지연 ≈ 가장 느린 증거 1종
+증거 2~4는 var_id만 쓰므로 차이 노드 기본 정보 조회와 동시에 시작하고,
+기본 정보가 필요한 시계열 / 월별 재구축 상태만 그 뒤에 동시 조회
+증거별 소요 시간은 metadata.latency_ms로 반환
 """
 
+import asyncio
+import time
+from typing import Any, Awaitable
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from app.db.database import get_session_factory
 from app.db.neo4j_db import run_query
+from app.services.graph_builder import month_build_status
 
 
 class EvidenceBuilder:
@@ -22,16 +34,31 @@ class EvidenceBuilder:
 
     async def build_evidence_package(self, var_id: str) -> dict:
         """특정 차이 노드에 대한 전체 증거 패키지 조립"""
-        # 차이 노드 기본 정보 조회
-        var_info = await self._get_variance_info(var_id)
+        start = time.perf_counter()
+        latency_ms: dict[str, float] = {}
+
+        async def target_legs() -> tuple[dict | None, Any, dict | None]:
+            """기본 정보 조회 후 이를 필요로 하는 시계열 / 월별 재구축 상태를 동시 조회"""
+            var_info = await self._timed(latency_ms, "target", self._get_variance_info(var_id))
+            if not var_info:
+                return None, None, None
+            time_series, build_status = await asyncio.gather(
+                self._timed(latency_ms, "time_series", self._get_time_series(var_info)),
+                # 월별 그래프가 재구축 중 / 실패 상태면 증거 2~4가 불완전할 수 있음
+                self._timed(latency_ms, "build_status", month_build_status(var_info["yyyymm"])),
+            )
+            return var_info, time_series, build_status
+
+        # var_id만 필요한 증거 2~4는 기본 정보 조회와 동시에 시작
+        (var_info, evidence_1, build_status), evidence_2, evidence_3, evidence_4 = await asyncio.gather(
+            target_legs(),
+            self._timed(latency_ms, "events", self._get_matched_events(var_id)),
+            self._timed(latency_ms, "spread", self._get_spread_analysis(var_id)),
+            self._timed(latency_ms, "similar_cases", self._get_similar_past_cases(var_id)),
+        )
         if not var_info:
             return {"error": f"차이 노드를 찾을 수 없습니다: {var_id}"}
-
-        # 4종 증거 병렬 조립
-        evidence_1 = await self._get_time_series(var_info)
-        evidence_2 = await self._get_matched_events(var_id)
-        evidence_3 = await self._get_spread_analysis(var_id)
-        evidence_4 = await self._get_similar_past_cases(var_id)
+        latency_ms["total"] = round((time.perf_counter() - start) * 1000, 2)
 
         return {
             "target": var_info,
@@ -39,8 +66,18 @@ class EvidenceBuilder:
             "evidence_2_events": evidence_2,
             "evidence_3_spread": evidence_3,
             "evidence_4_similar_cases": evidence_4,
+            "metadata": {"latency_ms": latency_ms, "build_status": build_status},
         }
 
+    @staticmethod
+    async def _timed(latency_ms: dict, name: str, work: Awaitable[Any]) -> Any:
+        """증거 조회 1종 실행 + 소요 시간(ms) 기록"""
+        start = time.perf_counter()
+        try:
+            return await work
+        finally:
+            latency_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+
     async def _get_variance_info(self, var_id: str) -> dict | None:
         """차이 노드 기본 정보 조회 (Neo4j)"""
         records = await run_query("""
@@ -54,6 +91,7 @@ class EvidenceBuilder:
         증거 1: 시계열 패턴
         - 최근 6~12개월 추이
         - 이동평균 대비 이탈도
+        - Neo4j 증거와 동시 실행되므로 요청 세션 대신 전용 DB 세션 사용
         """
         product_cd = var_info.get("product_cd")
         proc_cd = var_info.get("proc_cd")
@@ -62,17 +100,18 @@ class EvidenceBuilder:
         if not all([product_cd, proc_cd, ce_cd]):
             return {"data": [], "avg": 0, "deviation": 0}
 
-        result = await self.session.execute(
-            text("""
-                SELECT yyyymm, cost_amt
-                FROM snp_cost_result
-                WHERE product_cd = :prod AND proc_cd = :proc AND ce_cd = :ce
-                ORDER BY yyyymm DESC
-                LIMIT 12
-            """),
-            {"prod": product_cd, "proc": proc_cd, "ce": ce_cd},
-        )
-        rows = result.fetchall()
+        async with get_session_factory()() as session:
+            result = await session.execute(
+                text("""
+                    SELECT yyyymm, cost_amt
+                    FROM snp_cost_result
+                    WHERE product_cd = :prod AND proc_cd = :proc AND ce_cd = :ce
+                    ORDER BY yyyymm DESC
+                    LIMIT 12
+                """),
+                {"prod": product_cd, "proc": proc_cd, "ce": ce_cd},
+            )
+            rows = result.fetchall()
 
         if len(rows) < 2:
             return {"data": [], "avg": 0, "deviation": 0}
@@ -109,7 +148,9 @@ class EvidenceBuilder:
         - 동일 배부기준 공유 제품의 동반 변동
         """
         records = await run_query("""
-            MATCH (v:Variance {var_id: $var_id})-[:SPREADS_TO]->(affected:Variance)
+            MATCH (v:Variance {var_id: $var_id})-[:SPREADS_TO]->(:CostPool)
+                  -[:AFFECTS]->(affected:Variance)
+            WHERE affected.product_cd <> v.product_cd
             RETURN affected.product_cd AS product_cd,
                    affected.var_amt AS var_amt,
                    affected.var_rate AS var_rate
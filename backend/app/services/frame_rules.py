@@ -0,0 +1,334 @@
+"""
+Python 규칙 엔진 백엔드 (RULE_BACKEND = "python")
+- Rule 1~5를 Neo4j 패턴 매칭 대신 PostgreSQL 데이터프레임 해시 조인으로 평가
+  (cal_variance / evt_* / 마스터 / 도달 가능성 인덱스)
+- 결과 관계 목록을 UNWIND 배치로 Neo4j에 기록 (Cypher 백엔드와 동일한 관계/속성)
+- Rule 6은 과거 월 그래프 노드 탐색이므로 Cypher 백엔드 그대로 사용
+
+관계 dict 형식: {"rel", "rule_id", "src", "dst", "props"}
+  src/dst: Variance.var_id / Event.event_id / CostPool.pool_id
+"""
+
+import asyncio
+
+import pandas as pd
+from sqlalchemy import text
+
+from app.config import settings
+from app.db.database import get_session_factory
+from app.db.neo4j_db import run_write_query, run_write_batches, merge_counters
+from app.services.graph_builder import mes_event_id
+from app.services.master_cache import master_cache
+from app.services.reachability import reachability
+from app.services.rule_engine import RuleEngine
+
+
+_VAR_KEYS = ["product_cd", "proc_cd", "ce_cd"]
+
+# (관계 유형, 시작 노드 레이블/키, 끝 노드 레이블/키)
+_EDGE_TARGETS = {
+    "CAUSED_BY": (("Variance", "var_id"), ("Variance", "var_id")),
+    "EVIDENCED_BY": (("Variance", "var_id"), ("Event", "event_id")),
+    "SPREADS_TO": (("Variance", "var_id"), ("CostPool", "pool_id")),
+    "AFFECTS": (("CostPool", "pool_id"), ("Variance", "var_id")),
+}
+
+
+def _edges(rel: str, rule_id: str, src: pd.Series, dst: pd.Series, **props: pd.Series) -> list[dict]:
+    """컬럼 단위 시작/끝/속성 → 관계 dict 목록 (동일 (시작, 끝) 중복 제거)"""
+    frame = pd.DataFrame({"src": src.values, "dst": dst.values})
+    for name, values in props.items():
+        frame[name] = values.values if isinstance(values, pd.Series) else values
+    frame = frame.drop_duplicates(["src", "dst"])
+    names = list(props)
+    return [
+        {
+            "rel": rel, "rule_id": rule_id, "src": s, "dst": d,
+            "props": dict(zip(names, values)),
+        }
+        for s, d, *values in frame.itertuples(index=False, name=None)
+    ]
+
+
+class FrameRuleEngine(RuleEngine):
+    """데이터프레임 기반 규칙 엔진 (Rule 1~5), Rule 6은 Cypher 상속"""
+
+    def __init__(self):
+        self._frames: dict | None = None
+        self._frames_month: str | None = None
+        self._lock = asyncio.Lock()
+
+    # ─────────────────────────────────────
+    # 데이터 적재
+    # ─────────────────────────────────────
+
+    async def _get_frames(self, yyyymm: str) -> dict:
+        """월별 평가 데이터 1회 적재 (동시 실행 규칙 간 공유)"""
+        async with self._lock:
+            if self._frames is None or self._frames_month != yyyymm:
+                self._frames = await self._load_frames(yyyymm)
+                self._frames_month = yyyymm
+            return self._frames
+
+    async def _load_frames(self, yyyymm: str) -> dict:
+        """cal_variance / 이벤트 조회 (전용 DB 세션) + 도달 가능성 인덱스"""
+        async with get_session_factory()() as session:
+            master = await master_cache.get(session)
+
+            async def frame(sql: str, params: dict | None = None) -> pd.DataFrame:
+                result = await session.execute(text(sql), params or {})
+                return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+            frames = {
+                "variance": await frame(
+                    "SELECT var_id, product_cd, proc_cd, ce_cd, var_type, var_amt, var_rate "
+                    "FROM cal_variance WHERE yyyymm = :ym", {"ym": yyyymm},
+                ),
+                "mes": await frame(
+                    "SELECT equip_cd, metric_type FROM evt_mes WHERE yyyymm = :ym", {"ym": yyyymm},
+                ),
+                "plm": await frame(
+                    "SELECT event_id, product_cd, chg_type FROM evt_plm WHERE yyyymm = :ym",
+                    {"ym": yyyymm},
+                ),
+                "purchase": await frame(
+                    "SELECT event_id, mat_cd, chg_type FROM evt_purchase WHERE yyyymm = :ym",
+                    {"ym": yyyymm},
+                ),
+            }
+
+        frames["products"] = set(master.products)
+        frames["reach"] = await reachability.get()
+        print(
+            f"[FrameRuleEngine] {yyyymm} 적재: 차이 {len(frames['variance'])}, "
+            f"MES {len(frames['mes'])}, PLM {len(frames['plm'])}, 구매 {len(frames['purchase'])}"
+        )
+        return frames
+
+    # ─────────────────────────────────────
+    # 규칙 평가 (관계 목록 생성)
+    # ─────────────────────────────────────
+
+    async def evaluate(self, yyyymm: str) -> dict[str, list[dict]]:
+        """Rule 1~5 평가 결과 (그래프 기록 없음) — 적합성 검증용"""
+        frames = await self._get_frames(yyyymm)
+        edges, _ = self._eval_rule_05(frames, yyyymm)
+        return {
+            "RULE_01": self._eval_rule_01(frames),
+            "RULE_02": self._eval_rule_02(frames),
+            "RULE_03": self._eval_rule_03(frames, yyyymm),
+            "RULE_04": self._eval_rule_04(frames),
+            "RULE_05": edges,
+        }
+
+    @staticmethod
+    def _by_type(variance: pd.DataFrame, *var_types: str, product_required: bool = True) -> pd.DataFrame:
+        """차이유형 필터 (+ 제품 레벨만)"""
+        df = variance[variance["var_type"].isin(var_types)]
+        if product_required:
+            df = df[df["product_cd"].notna()]
+        return df
+
+    def _pair(self, variance: pd.DataFrame, left: str, right: str) -> list[dict]:
+        """같은 (제품, 공정, 원가요소) left ↔ right 쌍 → CAUSED_BY (Rule 1b/1c)"""
+        lhs = self._by_type(variance, left).dropna(subset=_VAR_KEYS)
+        rhs = variance[variance["var_type"] == right].dropna(subset=_VAR_KEYS)
+        pairs = lhs.merge(rhs, on=_VAR_KEYS, suffixes=("_l", "_r"))
+        total_abs = pairs["var_amt_l"].abs() + pairs["var_amt_r"].abs()
+        pairs = pairs[total_abs > 0]
+        return _edges(
+            "CAUSED_BY", "RULE_01", pairs["var_id_l"], pairs["var_id_r"],
+            contribution=pairs["var_amt_l"].abs() / total_abs[total_abs > 0],
+        )
+
+    def _eval_rule_01(self, frames: dict) -> list[dict]:
+        """Rule 1: TOTAL_VAR → 세부 차이, RATE_VAR ↔ QTY_VAR, PRICE_VAR ↔ USAGE_VAR"""
+        variance = frames["variance"]
+
+        # 1a: TOTAL_VAR → 세부 차이 (기여도 = |세부| / Σ|세부|)
+        totals = self._by_type(variance, "TOTAL_VAR")
+        details = variance[
+            variance["var_type"].isin(["RATE_VAR", "QTY_VAR", "PRICE_VAR", "USAGE_VAR"])
+            & (variance["var_amt"].abs() > 0)
+        ].dropna(subset=["product_cd"])
+        joined = totals.merge(details, on="product_cd", suffixes=("_t", "_d"))
+        abs_amt = joined["var_amt_d"].abs()
+        total_abs = abs_amt.groupby(joined["var_id_t"]).transform("sum")
+        edges = _edges(
+            "CAUSED_BY", "RULE_01", joined["var_id_t"], joined["var_id_d"],
+            contribution=(abs_amt / total_abs).where(total_abs > 0, 0.0),
+        )
+
+        # 1b / 1c: 쌍 연결
+        edges += self._pair(variance, "RATE_VAR", "QTY_VAR")
+        edges += self._pair(variance, "PRICE_VAR", "USAGE_VAR")
+        return edges
+
+    def _eval_rule_02(self, frames: dict) -> list[dict]:
+        """Rule 2: RATE_VAR → RATE_COST / RATE_BASE (기여도 = |하위| / |배부율 차이|)"""
+        variance = frames["variance"]
+        rate = self._by_type(variance, "RATE_VAR").dropna(subset=_VAR_KEYS)
+        subs = variance[variance["var_type"].isin(["RATE_COST", "RATE_BASE"])].dropna(subset=_VAR_KEYS)
+        joined = rate.merge(subs, on=_VAR_KEYS, suffixes=("_r", "_s"))
+        rate_abs = joined["var_amt_r"].abs()
+        return _edges(
+            "CAUSED_BY", "RULE_02", joined["var_id_r"], joined["var_id_s"],
+            contribution=(joined["var_amt_s"].abs() / rate_abs).where(rate_abs > 0, 0.0),
+        )
+
+    def _eval_rule_03(self, frames: dict, yyyymm: str) -> list[dict]:
+        """
+        Rule 3: RATE_BASE → 같은 공정군 장비의 가동률(UTIL) 변동 MES 이벤트
+        공정 → 장비 집합은 도달 가능성 인덱스 사용
+        (인덱스는 mst_equipment 기준 = Cypher의 삭제 표시 없는 Equipment INVOLVES 조건과 동일)
+        """
+        variance = frames["variance"]
+        rb = variance[variance["var_type"] == "RATE_BASE"]
+
+        reach = pd.DataFrame(
+            [(proc_cd, equip_cd) for proc_cd, equipment in frames["reach"].proc_equipment.items()
+             for equip_cd in equipment],
+            columns=["proc_cd", "equip_cd"],
+        )
+        mes = frames["mes"]
+        mes = mes[mes["metric_type"] == "UTIL"].merge(reach, on="equip_cd")
+        joined = rb.dropna(subset=["proc_cd"]).merge(mes, on="proc_cd")
+        event_id = pd.Series(
+            [mes_event_id(yyyymm, e, m) for e, m in zip(joined["equip_cd"], joined["metric_type"])],
+            dtype=object,
+        )
+        return _edges("EVIDENCED_BY", "RULE_03", joined["var_id"], event_id, match_score=0.9)
+
+    def _eval_rule_04(self, frames: dict) -> list[dict]:
+        """Rule 4: PRICE_VAR → 구매 단가 변동 (제품 BOM 자재), USAGE_VAR → PLM BOM 변경"""
+        variance, products = frames["variance"], frames["products"]
+
+        # 4a: 단가 차이 → 구매 이벤트 (제품 → 자재는 도달 가능성 인덱스 사용)
+        pv = variance[variance["var_type"] == "PRICE_VAR"]
+        bom = pd.DataFrame(
+            [(product_cd, mat_cd) for product_cd, materials in frames["reach"].product_materials.items()
+             for mat_cd in materials],
+            columns=["product_cd", "mat_cd"],
+        )
+        purchase = frames["purchase"]
+        purchase = purchase[purchase["chg_type"] == "PRICE_CHG"]
+        joined = pv.merge(bom, on="product_cd").merge(purchase, on="mat_cd")
+        edges = _edges("EVIDENCED_BY", "RULE_04a", joined["var_id"], joined["event_id"], match_score=0.95)
+
+        # 4b: 사용량 차이 → PLM 이벤트 (Cypher와 같은 기준: 마스터에 있는 = 삭제 표시 없는 제품)
+        uv = variance[(variance["var_type"] == "USAGE_VAR") & variance["product_cd"].isin(products)]
+        plm = frames["plm"]
+        plm = plm[plm["chg_type"] == "BOM_CHG"]
+        joined = uv.merge(plm, on="product_cd")
+        edges += _edges("EVIDENCED_BY", "RULE_04b", joined["var_id"], joined["event_id"], match_score=0.85)
+        return edges
+
+    def _eval_rule_05(self, frames: dict, yyyymm: str) -> tuple[list[dict], list[dict]]:
+        """
+        Rule 5: (공정, 원가요소)별 CostPool 허브
+        반환: (관계 목록, CostPool 노드 목록)
+        """
+        threshold = settings.SPREAD_RATE_THRESHOLD
+        members = self._by_type(frames["variance"], "RATE_VAR").dropna(subset=["proc_cd", "ce_cd"])
+        members = members.assign(above=members["var_rate"].abs() >= threshold)
+
+        grouped = members.groupby(["proc_cd", "ce_cd"])
+        pools = grouped.agg(
+            product_cnt=("var_id", "size"),
+            total_var_amt=("var_amt", "sum"),
+            has_source=("above", "any"),
+        ).reset_index()
+        pools = pools[(pools["product_cnt"] > 1) & pools["has_source"]]
+        pools["pool_id"] = "CP_" + yyyymm + "_" + pools["proc_cd"] + "_" + pools["ce_cd"]
+
+        members = members.merge(pools[["proc_cd", "ce_cd", "pool_id"]], on=["proc_cd", "ce_cd"])
+        edges = _edges("AFFECTS", "RULE_05", members["pool_id"], members["var_id"])
+        sources = members[members["above"]]
+        edges += _edges(
+            "SPREADS_TO", "RULE_05", sources["var_id"], sources["pool_id"],
+            same_alloc_base=sources["proc_cd"],
+        )
+
+        nodes = [
+            {
+                "pool_id": row.pool_id, "yyyymm": yyyymm,
+                "proc_cd": row.proc_cd, "ce_cd": row.ce_cd,
+                "product_cnt": int(row.product_cnt), "total_var_amt": float(row.total_var_amt),
+            }
+            for row in pools.itertuples(index=False)
+        ]
+        return edges, nodes
+
+    # ─────────────────────────────────────
+    # 그래프 기록
+    # ─────────────────────────────────────
+
+    @staticmethod
+    async def _write_edges(edges: list[dict]) -> dict:
+        """관계 목록을 유형별 UNWIND 배치로 MERGE (rule_id 기준, 속성은 SET) — 청크 재시도 포함"""
+        counters = []
+        for rel, ((src_label, src_key), (dst_label, dst_key)) in _EDGE_TARGETS.items():
+            rows = [
+                {"src": e["src"], "dst": e["dst"], "rule_id": e["rule_id"], "props": e["props"]}
+                for e in edges if e["rel"] == rel
+            ]
+            await run_write_batches(f"""
+                UNWIND $rows AS row
+                MATCH (a:{src_label} {{{src_key}: row.src}}), (b:{dst_label} {{{dst_key}: row.dst}})
+                MERGE (a)-[r:{rel} {{rule_id: row.rule_id}}]->(b)
+                ON CREATE SET r.created_at = datetime()
+                SET r += row.props
+            """, rows, label=rel, counters=counters)
+        return merge_counters(counters)
+
+    async def rule_01_cost_decomposition(self, yyyymm: str) -> dict:
+        """Rule 1 (데이터프레임 평가)"""
+        counters = await self._write_edges(self._eval_rule_01(await self._get_frames(yyyymm)))
+        print("  [Rule 1] 원가요소별 분해 연결 완료 (python)")
+        return counters
+
+    async def rule_02_rate_decomposition(self, yyyymm: str) -> dict:
+        """Rule 2 (데이터프레임 평가)"""
+        counters = await self._write_edges(self._eval_rule_02(await self._get_frames(yyyymm)))
+        print("  [Rule 2] 배부율 분해 연결 완료 (python)")
+        return counters
+
+    async def rule_03_mes_event_matching(self, yyyymm: str) -> dict:
+        """Rule 3 (데이터프레임 평가)"""
+        counters = await self._write_edges(self._eval_rule_03(await self._get_frames(yyyymm), yyyymm))
+        print("  [Rule 3] MES 이벤트 매칭 완료 (python)")
+        return counters
+
+    async def rule_04_material_event_matching(self, yyyymm: str) -> dict:
+        """Rule 4 (데이터프레임 평가)"""
+        counters = await self._write_edges(self._eval_rule_04(await self._get_frames(yyyymm)))
+        print("  [Rule 4] 재료비 이벤트 매칭 완료 (python)")
+        return counters
+
+    async def rule_05_spread_relationship(self, yyyymm: str) -> dict:
+        """Rule 5 (데이터프레임 평가) — CostPool 노드 적재 후 관계 기록"""
+        edges, pools = self._eval_rule_05(await self._get_frames(yyyymm), yyyymm)
+        counters = [await run_write_query("""
+            MATCH (:Variance {yyyymm: $yyyymm})-[r:SPREADS_TO]->(:Variance)
+            DELETE r
+        """, {"yyyymm": yyyymm})]
+        # 현재 기준에서 빠진 CostPool / 구성원 관계 정리 (Cypher 백엔드와 동일)
+        membership = {pool["pool_id"]: {"members": [], "sources": []} for pool in pools}
+        for e in edges:
+            if e["rel"] == "AFFECTS":
+                membership[e["src"]]["members"].append(e["dst"])
+            elif e["rel"] == "SPREADS_TO":
+                membership[e["dst"]]["sources"].append(e["src"])
+        counters += await self._prune_cost_pools(
+            yyyymm, [{"pool_id": pool_id, **ids} for pool_id, ids in membership.items()],
+        )
+        await run_write_batches("""
+            UNWIND $rows AS row
+            MERGE (cp:CostPool {pool_id: row.pool_id})
+            ON CREATE SET cp.created_at = datetime()
+            SET cp.yyyymm = row.yyyymm, cp.proc_cd = row.proc_cd, cp.ce_cd = row.ce_cd,
+                cp.product_cnt = row.product_cnt, cp.total_var_amt = row.total_var_amt
+        """, pools, label="CostPool", counters=counters)
+        counters.append(await self._write_edges(edges))
+        print("  [Rule 5] 파급 관계 생성 완료 (python)")
+        return merge_counters(counters)
@@ -14,11 +14,73 @@ Neo4j 그래프 빌더 (Step 4)
   ProcessGroup -CONSUMES_GAS-> Material (GAS type)
 """
 
+import asyncio
+import hashlib
+import json
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 
-from app.db.neo4j_db import run_write_query, run_query
+from app.db.database import get_session_factory
+from app.db.neo4j_db import (
+    run_write_query, run_write_batches, run_batched_delete, run_batched_update, run_query,
+)
 from app.config import settings
+from app.services.master_cache import master_cache, MasterData
+from app.services.rule_engine import create_rule_engine
+from app.services.graph_stats import graph_stats
+from app.services.reachability import reachability
+
+
+# 월별 그래프 노드 레이블 (yyyymm 속성 보유, 월 단위 삭제 대상)
+MONTHLY_LABELS = ["Variance", "Event", "CostPool"]
+
+# 월별 재구축 상태 (MonthBuild 노드의 status)
+BUILD_IN_PROGRESS = "IN_PROGRESS"
+BUILD_COMPLETE = "COMPLETE"
+BUILD_FAILED = "FAILED"
+
+
+async def month_build_status(yyyymm: str) -> dict | None:
+    """
+    월별 그래프 재구축 상태 조회 (MonthBuild 노드)
+    반환: {status, started_at, finished_at, error} — rebuild_month 이력이 없으면 None
+    status가 COMPLETE가 아니면 해당 월 그래프는 일부만 적재된 상태일 수 있음
+    """
+    records = await run_query("""
+        MATCH (b:MonthBuild {yyyymm: $yyyymm})
+        RETURN b.status AS status, toString(b.started_at) AS started_at,
+               toString(b.finished_at) AS finished_at, b.error AS error
+    """, {"yyyymm": yyyymm})
+    return records[0] if records else None
+
+
+async def _mark_month_build(yyyymm: str, status: str, error: str | None = None):
+    """MonthBuild 상태 기록 (IN_PROGRESS 시 시작 시각 갱신, 그 외 종료 시각 기록)"""
+    await run_write_query("""
+        MERGE (b:MonthBuild {yyyymm: $yyyymm})
+        SET b.status = $status,
+            b.error = $error,
+            b.started_at = CASE WHEN $status = $in_progress THEN datetime() ELSE b.started_at END,
+            b.finished_at = CASE WHEN $status = $in_progress THEN null ELSE datetime() END
+    """, {"yyyymm": yyyymm, "status": status, "error": error, "in_progress": BUILD_IN_PROGRESS})
+
+
+def mes_event_id(yyyymm: str, equip_cd: str, metric_type: str) -> str:
+    """MES 이벤트 ID 'MES_{기준월}_{장비}_{지표}' (이벤트 적재 / Rule 3 이벤트 키 조회 공용)"""
+    return f"MES_{yyyymm}_{equip_cd}_{metric_type}"
+
+
+def var_key_expr(alias: str) -> str:
+    """
+    Variance 형제 조회 키(var_key) Cypher 식: 'yyyymm|product_cd|proc_cd|ce_cd'
+    (없는 값은 빈 문자열) — alias는 yyyymm/product_cd/proc_cd/ce_cd를 가진 노드 또는 맵
+    """
+    return (
+        f"{alias}.yyyymm + '|' + coalesce({alias}.product_cd, '') + '|' "
+        f"+ coalesce({alias}.proc_cd, '') + '|' + coalesce({alias}.ce_cd, '')"
+    )
 
 
 class GraphBuilder:
@@ -26,224 +88,398 @@ class GraphBuilder:
 
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.master: MasterData | None = None
+        self.delta = False
 
     # ─────────────────────────────────────
     # 그래프 초기화
     # ─────────────────────────────────────
 
-    async def clear_graph(self):
-        """Neo4j 그래프 전체 삭제 (초기화용)"""
-        # 관계 먼저 삭제 → 노드 삭제
-        await run_write_query("MATCH ()-[r]->() DELETE r")
-        await run_write_query("MATCH (n) DELETE n")
-        print("[GraphBuilder] 기존 그래프 데이터 삭제 완료")
+    async def clear_graph(self, yyyymm: str | None = None):
+        """
+        Neo4j 그래프 삭제 (배치 단위)
+        - yyyymm 미지정: 전체 삭제 (초기화용) — 관계 먼저 배치 삭제 → 노드 배치 삭제
+        - yyyymm 지정: 해당 월 월별 그래프(Variance / Event / CostPool 노드 + 연결 관계)만 삭제
+        """
+        if yyyymm is None:
+            await run_batched_delete("""
+                MATCH ()-[r]->()
+                WITH r LIMIT $batch
+                DELETE r
+                RETURN count(*) AS deleted
+            """, label="관계 삭제")
+            await run_batched_delete("""
+                MATCH (n)
+                WITH n LIMIT $batch
+                DETACH DELETE n
+                RETURN count(*) AS deleted
+            """, label="노드 삭제")
+            graph_stats.invalidate()
+            print("[GraphBuilder] 기존 그래프 데이터 삭제 완료")
+            return
+
+        for label in MONTHLY_LABELS:
+            await run_batched_delete(f"""
+                MATCH (n:{label} {{yyyymm: $yyyymm}})
+                WITH n LIMIT $batch
+                DETACH DELETE n
+                RETURN count(*) AS deleted
+            """, {"yyyymm": yyyymm}, label=f"{label} {yyyymm} 삭제")
+        graph_stats.invalidate()
+        print(f"[GraphBuilder] {yyyymm} 월별 그래프 삭제 완료")
+
+    async def rebuild_month(self, yyyymm: str):
+        """
+        월별 그래프 재구축 (해당 월만)
+        1) 해당 월 규칙 관계 / CostPool / Event 배치 삭제, cal_variance에 없는 차이 노드 삭제
+           (차이 노드는 유지 — 이후 월 차이가 과거 사례로 가리키는 SIMILAR_TO 유입 관계 보존)
+        2) 차이 노드 upsert / 이벤트 노드 배치 재적재
+        3) 규칙 엔진 재실행
+        상설 그래프와 다른 월 노드는 건드리지 않으므로 소요시간은 해당 월 규모에 비례
+
+        원자적이지 않음: 각 단계가 별도 배치 트랜잭션으로 커밋되므로 실행 중이거나
+        중간에 실패하면 해당 월 그래프가 규칙 관계 / 이벤트 없이 일부만 적재된 상태로 남음.
+        MonthBuild {yyyymm} 노드에 IN_PROGRESS → COMPLETE / FAILED 상태를 기록하므로
+        조회 측은 month_build_status()로 COMPLETE 여부를 확인하고,
+        COMPLETE가 아닌 월은 rebuild_month를 다시 실행하면 됨 (삭제부터 다시 수행 — 재실행 안전)
+        """
+        start = time.perf_counter()
+        await _mark_month_build(yyyymm, BUILD_IN_PROGRESS)
+        try:
+            await self._reset_month(yyyymm)
+            await self.create_variance_nodes(yyyymm)
+            await self.create_event_nodes(yyyymm)
+            await create_rule_engine().execute_all_rules(yyyymm)
+        except Exception as e:
+            await _mark_month_build(yyyymm, BUILD_FAILED, f"{type(e).__name__}: {e}"[:1000])
+            print(f"[GraphBuilder] {yyyymm} 월별 그래프 재구축 실패 — 재실행 필요: {e}")
+            raise
+        await _mark_month_build(yyyymm, BUILD_COMPLETE)
+        print(f"[GraphBuilder] {yyyymm} 월별 그래프 재구축 완료 ({time.perf_counter() - start:.1f}s)")
+
+    async def _reset_month(self, yyyymm: str):
+        """
+        월별 재구축 전 정리 (차이 노드는 upsert 대상이므로 남김)
+        - 해당 월 차이 노드의 규칙 관계 삭제 (다른 월에서 들어오는 SIMILAR_TO는 유지)
+        - 해당 월 CostPool / Event 노드 삭제
+        - cal_variance에서 사라진 차이 노드 삭제
+        """
+        await run_batched_delete("""
+            MATCH (v:Variance {yyyymm: $yyyymm})-[r]-()
+            WHERE r.rule_id IS NOT NULL
+              AND NOT (type(r) = 'SIMILAR_TO' AND endNode(r) = v)
+            WITH DISTINCT r LIMIT $batch
+            DELETE r
+            RETURN count(*) AS deleted
+        """, {"yyyymm": yyyymm}, label=f"규칙 관계 {yyyymm} 삭제")
+        for label in ["CostPool", "Event"]:
+            await run_batched_delete(f"""
+                MATCH (n:{label} {{yyyymm: $yyyymm}})
+                WITH n LIMIT $batch
+                DETACH DELETE n
+                RETURN count(*) AS deleted
+            """, {"yyyymm": yyyymm}, label=f"{label} {yyyymm} 삭제")
+
+        result = await self.session.execute(
+            text("SELECT var_id FROM cal_variance WHERE yyyymm = :ym"), {"ym": yyyymm}
+        )
+        current = {row[0] for row in result.fetchall()}
+        stale = [
+            record["var_id"]
+            for record in await run_query(
+                "MATCH (v:Variance {yyyymm: $yyyymm}) RETURN v.var_id AS var_id",
+                {"yyyymm": yyyymm},
+            )
+            if record["var_id"] not in current
+        ]
+        await self.delete_variance_nodes(stale)
+        graph_stats.invalidate()
 
     # ─────────────────────────────────────
     # Step 4a: 상설 그래프 갱신
     # ─────────────────────────────────────
 
-    async def build_permanent_graph(self):
-        """상설 그래프 전체 구축 (초기 또는 갱신)"""
+    async def build_permanent_graph(self, delta: bool = False):
+        """
+        상설 그래프 구축 (초기 또는 갱신)
+        - delta=False: 전체 마스터 노드 재기록
+        - delta=True: 노드의 content_hash와 비교해 변경 노드만 기록,
+          마스터에서 사라진 노드는 삭제 표시(deleted=true) — 월별 실행용
+        """
+        self.delta = delta
+        # 제품/공정/자재 마스터는 캐시에서 1회 적재
+        self.master = await master_cache.get(self.session, check_version=True)
+
         # ── 노드 생성 ──
-        await self._create_product_group_nodes()
-        await self._create_product_nodes()
-        await self._create_process_nodes()
-        await self._create_process_group_nodes()
-        await self._create_equipment_nodes()
-        await self._create_material_nodes()
-        await self._create_cost_element_nodes()
-        await self._create_alloc_base_nodes()
+        changed = 0
+        changed += await self._create_product_group_nodes()
+        changed += await self._create_product_nodes()
+        changed += await self._create_process_nodes()
+        changed += await self._create_process_group_nodes()
+        changed += await self._create_equipment_nodes()
+        changed += await self._create_material_nodes()
+        changed += await self._create_cost_element_nodes()
+        changed += await self._create_alloc_base_nodes()
         # ── 관계 생성 ──
-        await self._create_structural_relationships()
-        print("[GraphBuilder] 상설 그래프 구축 완료")
-
-    async def _create_product_group_nodes(self):
+        await self._create_structural_relationships(master_changed=not delta or changed > 0)
+        # ── 규칙 매칭용 도달 가능성 인덱스 재구축 ──
+        await reachability.rebuild(self.session)
+        # ── 이전 버전에서 적재된 차이 노드의 형제 조회 키 보완 ──
+        await self.backfill_var_keys()
+        graph_stats.invalidate()
+        mode = "증분" if delta else "전체"
+        print(f"[GraphBuilder] 상설 그래프 구축 완료 ({mode}, 변경 노드 {changed}건)")
+
+    @staticmethod
+    def _content_hash(row: dict) -> str:
+        """노드 속성 내용 해시 (키 정렬 JSON의 md5)"""
+        payload = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+    async def _sync_nodes(self, label: str, key: str, rows: list[dict], set_clause: str) -> int:
+        """
+        마스터 노드 동기화
+        - set_clause: 노드 별칭 n, 입력 행 별칭 row 기준 SET 절
+        - 모든 기록 노드에 content_hash / deleted=false / updated_at 설정
+        - 증분 모드: 해시가 같은 노드는 건너뛰고, 마스터에 없는 노드는 삭제 표시
+          (삭제 표시 노드의 관계는 모두 제거 — 규칙/조회 경로에서 자연히 빠짐.
+           구조 관계 / 차이·이벤트 연결 MATCH도 deleted 노드를 제외해 재연결 방지)
+        - 증분 모드도 라벨별 전체 노드의 키/해시를 매 실행 조회 (노드 수에 비례하는 읽기 비용)
+        반환: 기록(변경 + 삭제 표시) 노드 수
+        """
+        for row in rows:
+            row["content_hash"] = self._content_hash(row)
+
+        to_write, tombstones = rows, []
+        if self.delta:
+            existing = {
+                record["key"]: (record["hash"], record["deleted"])
+                for record in await run_query(f"""
+                    MATCH (n:{label})
+                    RETURN n.{key} AS key, n.content_hash AS hash,
+                           coalesce(n.deleted, false) AS deleted
+                """)
+            }
+            desired = {row[key] for row in rows}
+            to_write = [
+                row for row in rows
+                if existing.get(row[key]) != (row["content_hash"], False)
+            ]
+            tombstones = [
+                {"key": k} for k, (_, deleted) in existing.items()
+                if k not in desired and not deleted
+            ]
+
+        await run_write_batches(f"""
+            UNWIND $rows AS row
+            MERGE (n:{label} {{{key}: row.{key}}})
+            SET {set_clause},
+                n.content_hash = row.content_hash,
+                n.deleted = false,
+                n.updated_at = datetime()
+        """, to_write, label=label)
+        await run_write_batches(f"""
+            UNWIND $rows AS row
+            MATCH (n:{label} {{{key}: row.key}})
+            SET n.deleted = true, n.deleted_at = datetime()
+            WITH n
+            OPTIONAL MATCH (n)-[r]-()
+            DELETE r
+        """, tombstones, label=f"{label} 삭제 표시")
+
+        if self.delta:
+            print(
+                f"[GraphBuilder] {label}: 대상 {len(rows)}, 변경 {len(to_write)}, "
+                f"삭제 표시 {len(tombstones)}"
+            )
+        return len(to_write) + len(tombstones)
+
+    async def _create_product_group_nodes(self) -> int:
         """제품군 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT DISTINCT product_grp FROM mst_product")
+        rows = [{"grp_cd": grp_cd} for grp_cd in self.master.product_groups()]
+        return await self._sync_nodes(
+            "ProductGroup", "grp_cd", rows,
+            "n.grp_nm = row.grp_cd",
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MERGE (pg:ProductGroup {grp_cd: $grp_cd})
-                SET pg.grp_nm = $grp_cd, pg.updated_at = datetime()
-            """, {"grp_cd": row[0]})
 
-    async def _create_product_nodes(self):
+    async def _create_product_nodes(self) -> int:
         """제품 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT product_cd, product_nm, product_grp, proc_type, use_yn FROM mst_product")
+        rows = [
+            {
+                "prod_cd": row["product_cd"], "prod_nm": row["product_nm"],
+                "grp_cd": row["product_grp"], "proc_type": row["proc_type"],
+                "use_yn": row["use_yn"],
+            }
+            for row in self.master.products.values()
+        ]
+        return await self._sync_nodes(
+            "Product", "prod_cd", rows,
+            """n.prod_nm = row.prod_nm, n.grp_cd = row.grp_cd,
+                n.proc_type = row.proc_type, n.use_yn = row.use_yn""",
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MERGE (p:Product {prod_cd: $prod_cd})
-                SET p.prod_nm = $prod_nm, p.grp_cd = $grp_cd,
-                    p.proc_type = $proc_type, p.use_yn = $use_yn,
-                    p.updated_at = datetime()
-            """, {
-                "prod_cd": row[0], "prod_nm": row[1],
-                "grp_cd": row[2], "proc_type": row[3], "use_yn": row[4],
-            })
-
-    async def _create_process_nodes(self):
+
+    async def _create_process_nodes(self) -> int:
         """공정(대공정) 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT proc_cd, proc_nm, proc_type, proc_grp, alloc_type, alloc_base FROM mst_process")
+        rows = [dict(row) for row in self.master.processes.values()]
+        return await self._sync_nodes(
+            "Process", "proc_cd", rows,
+            """n.proc_nm = row.proc_nm, n.proc_type = row.proc_type,
+                n.proc_grp = row.proc_grp, n.alloc_type = row.alloc_type,
+                n.alloc_base = row.alloc_base""",
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MERGE (proc:Process {proc_cd: $proc_cd})
-                SET proc.proc_nm = $proc_nm, proc.proc_type = $proc_type,
-                    proc.proc_grp = $proc_grp, proc.alloc_type = $alloc_type,
-                    proc.alloc_base = $alloc_base, proc.updated_at = datetime()
-            """, {
-                "proc_cd": row[0], "proc_nm": row[1], "proc_type": row[2],
-                "proc_grp": row[3], "alloc_type": row[4], "alloc_base": row[5],
-            })
-
-    async def _create_process_group_nodes(self):
+
+    async def _create_process_group_nodes(self) -> int:
         """공정군(ProcessGroup) 노드 생성 — ETCH, DEP, PHOTO, DIFF, CMP, ASSY, TEST"""
-        result = await self.session.execute(
-            text("SELECT DISTINCT proc_grp, proc_type FROM mst_process WHERE proc_grp IS NOT NULL")
+        # 공정군 이름 매핑
+        pgrp_names = {
+            "ETCH": "식각", "DEP": "증착", "PHOTO": "포토",
+            "DIFF": "확산", "CMP": "CMP", "ASSY": "조립", "TEST": "테스트",
+        }
+        rows = [
+            {"pgrp_cd": pgrp_cd, "pgrp_nm": pgrp_names.get(pgrp_cd, pgrp_cd), "proc_type": proc_type}
+            for pgrp_cd, proc_type in self.master.process_groups()
+        ]
+        return await self._sync_nodes(
+            "ProcessGroup", "pgrp_cd", rows,
+            "n.pgrp_nm = row.pgrp_nm, n.proc_type = row.proc_type",
         )
-        for row in result.fetchall():
-            pgrp_cd = row[0]
-            proc_type = row[1]
-            # 공정군 이름 매핑
-            pgrp_names = {
-                "ETCH": "식각", "DEP": "증착", "PHOTO": "포토",
-                "DIFF": "확산", "CMP": "CMP", "ASSY": "조립", "TEST": "테스트",
-            }
-            pgrp_nm = pgrp_names.get(pgrp_cd, pgrp_cd)
-            await run_write_query("""
-                MERGE (pg:ProcessGroup {pgrp_cd: $pgrp_cd})
-                SET pg.pgrp_nm = $pgrp_nm, pg.proc_type = $proc_type,
-                    pg.updated_at = datetime()
-            """, {"pgrp_cd": pgrp_cd, "pgrp_nm": pgrp_nm, "proc_type": proc_type})
-
-    async def _create_equipment_nodes(self):
+
+    async def _create_equipment_nodes(self) -> int:
         """장비 노드 생성"""
         result = await self.session.execute(
             text("SELECT equip_cd, equip_nm, proc_cd, fab_cd FROM mst_equipment")
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MERGE (eq:Equipment {equip_cd: $equip_cd})
-                SET eq.equip_nm = $equip_nm, eq.proc_cd = $proc_cd,
-                    eq.fab_cd = $fab_cd, eq.updated_at = datetime()
-            """, {
-                "equip_cd": row[0], "equip_nm": row[1],
-                "proc_cd": row[2], "fab_cd": row[3],
-            })
-
-    async def _create_material_nodes(self):
+        rows = [dict(row._mapping) for row in result.fetchall()]
+        return await self._sync_nodes(
+            "Equipment", "equip_cd", rows,
+            """n.equip_nm = row.equip_nm, n.proc_cd = row.proc_cd,
+                n.fab_cd = row.fab_cd""",
+        )
+
+    async def _create_material_nodes(self) -> int:
         """자재 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT mat_cd, mat_nm, mat_type, proc_type FROM mst_material")
+        rows = [dict(row) for row in self.master.materials.values()]
+        return await self._sync_nodes(
+            "Material", "mat_cd", rows,
+            """n.mat_nm = row.mat_nm, n.mat_type = row.mat_type,
+                n.proc_type = row.proc_type""",
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MERGE (m:Material {mat_cd: $mat_cd})
-                SET m.mat_nm = $mat_nm, m.mat_type = $mat_type,
-                    m.proc_type = $proc_type, m.updated_at = datetime()
-            """, {
-                "mat_cd": row[0], "mat_nm": row[1],
-                "mat_type": row[2], "proc_type": row[3],
-            })
-
-    async def _create_cost_element_nodes(self):
+
+    async def _create_cost_element_nodes(self) -> int:
         """원가요소 노드 생성"""
         result = await self.session.execute(
             text("SELECT ce_cd, ce_nm, ce_grp FROM mst_cost_element")
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MERGE (ce:CostElement {ce_cd: $ce_cd})
-                SET ce.ce_nm = $ce_nm, ce.ce_grp = $ce_grp,
-                    ce.updated_at = datetime()
-            """, {"ce_cd": row[0], "ce_nm": row[1], "ce_grp": row[2]})
-
-    async def _create_alloc_base_nodes(self):
+        rows = [dict(row._mapping) for row in result.fetchall()]
+        return await self._sync_nodes(
+            "CostElement", "ce_cd", rows,
+            "n.ce_nm = row.ce_nm, n.ce_grp = row.ce_grp",
+        )
+
+    async def _create_alloc_base_nodes(self) -> int:
         """배부기준 노드 생성"""
         alloc_bases = [
             {"base_cd": "ST", "base_nm": "장비가동시간", "base_unit": "만h"},
             {"base_cd": "BOM", "base_nm": "표준BOM", "base_unit": "개"},
             {"base_cd": "QTY", "base_nm": "생산수량", "base_unit": "개"},
         ]
-        for ab in alloc_bases:
-            await run_write_query("""
-                MERGE (ab:AllocBase {base_cd: $base_cd})
-                SET ab.base_nm = $base_nm, ab.base_unit = $base_unit,
-                    ab.updated_at = datetime()
-            """, ab)
+        return await self._sync_nodes(
+            "AllocBase", "base_cd", alloc_bases,
+            "n.base_nm = row.base_nm, n.base_unit = row.base_unit",
+        )
 
-    async def _create_structural_relationships(self):
-        """구조적 관계 생성 (GRAPH_DB_SCHEMA.md 준수)"""
+    async def _create_structural_relationships(self, master_changed: bool = True):
+        """
+        구조적 관계 생성 (GRAPH_DB_SCHEMA.md 준수)
+        master_changed=False면 마스터 속성만으로 결정되는 관계
+        (CONTAINS / HAS_SUBPROCESS / HAS_EQUIPMENT / ALLOCATED_BY / CONSUMES_GAS)는 생략
+        모든 관계는 원천 기준 관계 집합과 차분 동기화 — 상위 코드가 바뀐 노드의 이전 관계는 삭제
+        """
 
         # ── 1) 제품군 → 제품 (CONTAINS) ──
-        await run_write_query("""
-            MATCH (pg:ProductGroup), (p:Product)
-            WHERE pg.grp_cd = p.grp_cd
-            MERGE (pg)-[:CONTAINS]->(p)
-        """)
-
-        # ── 2) 제품 → 공정 (COST_AT) — 배부결과 기반 ──
-        result = await self.session.execute(
-            text("SELECT DISTINCT product_cd, proc_cd FROM snp_alloc_result")
+        if master_changed:
+            await self._sync_plain_edges(
+                "CONTAINS", ("ProductGroup", "grp_cd"), ("Product", "prod_cd"),
+                {
+                    (row["product_grp"], product_cd)
+                    for product_cd, row in self.master.products.items()
+                    if row["product_grp"] is not None
+                },
+            )
+
+        # ── 2) 제품 → 공정 (COST_AT) — 배부결과 + BE_01 BOM 직접집계 공정 ──
+        result = await self.session.execute(text("""
+            SELECT DISTINCT product_cd, proc_cd FROM snp_alloc_result
+            UNION
+            SELECT DISTINCT product_cd, proc_cd FROM snp_cost_result WHERE proc_cd = 'BE_01'
+        """))
+        await self._sync_edges(
+            "COST_AT", ("Product", "prod_cd"), ("Process", "proc_cd"),
+            """
+            MATCH (p:Product)-[:COST_AT]->(proc:Process)
+            RETURN [p.prod_cd, proc.proc_cd] AS key, {} AS props
+            """,
+            {(row[0], row[1]): {} for row in result.fetchall()},
+            """
+            UNWIND $rows AS row
+            MATCH (p:Product {prod_cd: row.src}), (proc:Process {proc_cd: row.dst})
+            WHERE coalesce(p.deleted, false) = false AND coalesce(proc.deleted, false) = false
+            MERGE (p)-[:COST_AT]->(proc)
+            """,
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MATCH (p:Product {prod_cd: $prod_cd}), (proc:Process {proc_cd: $proc_cd})
-                MERGE (p)-[:COST_AT]->(proc)
-            """, {"prod_cd": row[0], "proc_cd": row[1]})
-
-        # ── 2b) 제품 → BE_01 (COST_AT) — BOM 직접집계 공정 ──
-        result = await self.session.execute(
-            text("SELECT DISTINCT product_cd FROM snp_cost_result WHERE proc_cd = 'BE_01'")
-        )
-        for row in result.fetchall():
-            await run_write_query("""
-                MATCH (p:Product {prod_cd: $prod_cd}), (proc:Process {proc_cd: 'BE_01'})
-                MERGE (p)-[:COST_AT]->(proc)
-            """, {"prod_cd": row[0]})
-
-        # ── 3) 대공정 → 공정군 (HAS_SUBPROCESS) ──
-        await run_write_query("""
-            MATCH (proc:Process), (pg:ProcessGroup)
-            WHERE proc.proc_grp = pg.pgrp_cd
-            MERGE (proc)-[:HAS_SUBPROCESS]->(pg)
-        """)
 
-        # ── 4) 공정군 → 장비 (HAS_EQUIPMENT) ──
-        #   Equipment.proc_cd → Process.proc_cd → Process.proc_grp = ProcessGroup.pgrp_cd
-        await run_write_query("""
-            MATCH (pg:ProcessGroup)<-[:HAS_SUBPROCESS]-(proc:Process),
-                  (eq:Equipment)
-            WHERE eq.proc_cd = proc.proc_cd
-            MERGE (pg)-[:HAS_EQUIPMENT]->(eq)
-        """)
-
-        # ── 5) 공정 → 원가요소 (COST_COMPOSED_OF) ──
+        if master_changed:
+            # ── 3) 대공정 → 공정군 (HAS_SUBPROCESS) ──
+            proc_grp = {
+                proc_cd: row["proc_grp"] for proc_cd, row in self.master.processes.items()
+                if row["proc_grp"] is not None
+            }
+            await self._sync_plain_edges(
+                "HAS_SUBPROCESS", ("Process", "proc_cd"), ("ProcessGroup", "pgrp_cd"),
+                set(proc_grp.items()),
+            )
+
+            # ── 4) 공정군 → 장비 (HAS_EQUIPMENT) ──
+            #   Equipment.proc_cd → Process.proc_cd → Process.proc_grp = ProcessGroup.pgrp_cd
+            result = await self.session.execute(text("SELECT equip_cd, proc_cd FROM mst_equipment"))
+            await self._sync_plain_edges(
+                "HAS_EQUIPMENT", ("ProcessGroup", "pgrp_cd"), ("Equipment", "equip_cd"),
+                {
+                    (proc_grp[proc_cd], equip_cd)
+                    for equip_cd, proc_cd in result.fetchall() if proc_cd in proc_grp
+                },
+            )
+
+        # ── 5) 공정 → 원가요소 (COST_COMPOSED_OF) — 배부율 + BE_01 → CE_MAT (직접집계) ──
         result = await self.session.execute(
             text("SELECT DISTINCT proc_cd, ce_cd FROM snp_alloc_rate")
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MATCH (proc:Process {proc_cd: $proc_cd}), (ce:CostElement {ce_cd: $ce_cd})
-                MERGE (proc)-[:COST_COMPOSED_OF]->(ce)
-            """, {"proc_cd": row[0], "ce_cd": row[1]})
-
-        # ── 5b) BE_01 → CE_MAT (직접집계 원가요소) ──
-        await run_write_query("""
-            MATCH (proc:Process {proc_cd: 'BE_01'}), (ce:CostElement {ce_cd: 'CE_MAT'})
+        composed = {(row[0], row[1]): {} for row in result.fetchall()}
+        composed[("BE_01", "CE_MAT")] = {}
+        await self._sync_edges(
+            "COST_COMPOSED_OF", ("Process", "proc_cd"), ("CostElement", "ce_cd"),
+            """
+            MATCH (proc:Process)-[:COST_COMPOSED_OF]->(ce:CostElement)
+            RETURN [proc.proc_cd, ce.ce_cd] AS key, {} AS props
+            """,
+            composed,
+            """
+            UNWIND $rows AS row
+            MATCH (proc:Process {proc_cd: row.src}), (ce:CostElement {ce_cd: row.dst})
+            WHERE coalesce(proc.deleted, false) = false AND coalesce(ce.deleted, false) = false
             MERGE (proc)-[:COST_COMPOSED_OF]->(ce)
-        """)
+            """,
+        )
 
         # ── 6) 공정 → 배부기준 (ALLOCATED_BY) ──
-        await run_write_query("""
-            MATCH (proc:Process), (ab:AllocBase)
-            WHERE proc.alloc_base = ab.base_cd
-            MERGE (proc)-[:ALLOCATED_BY]->(ab)
-        """)
+        if master_changed:
+            await self._sync_plain_edges(
+                "ALLOCATED_BY", ("Process", "proc_cd"), ("AllocBase", "base_cd"),
+                {
+                    (proc_cd, row["alloc_base"]) for proc_cd, row in self.master.processes.items()
+                    if row["alloc_base"] is not None
+                },
+            )
 
         # ── 7) 제품 → 자재 (USES_MATERIAL) — BOM 기반 ──
         result = await self.session.execute(
@@ -253,176 +489,339 @@ class GraphBuilder:
                 WHERE yyyymm = (SELECT MAX(yyyymm) FROM snp_bom)
             """)
         )
-        for row in result.fetchall():
-            await run_write_query("""
-                MATCH (p:Product {prod_cd: $prod_cd}), (m:Material {mat_cd: $mat_cd})
-                MERGE (p)-[r:USES_MATERIAL]->(m)
-                SET r.std_qty = $std_qty, r.unit_price = $unit_price
-            """, {
-                "prod_cd": row[0], "mat_cd": row[1],
-                "std_qty": row[2], "unit_price": row[3],
-            })
+        await self._sync_edges(
+            "USES_MATERIAL", ("Product", "prod_cd"), ("Material", "mat_cd"),
+            """
+            MATCH (p:Product)-[r:USES_MATERIAL]->(m:Material)
+            RETURN [p.prod_cd, m.mat_cd] AS key,
+                   {std_qty: r.std_qty, unit_price: r.unit_price} AS props
+            """,
+            {
+                (row[0], row[1]): {"std_qty": row[2], "unit_price": row[3]}
+                for row in result.fetchall()
+            },
+            """
+            UNWIND $rows AS row
+            MATCH (p:Product {prod_cd: row.src}), (m:Material {mat_cd: row.dst})
+            WHERE coalesce(p.deleted, false) = false AND coalesce(m.deleted, false) = false
+            MERGE (p)-[r:USES_MATERIAL]->(m)
+            SET r.std_qty = row.std_qty, r.unit_price = row.unit_price
+            """,
+        )
 
         # ── 8) 공정군 → 기료 (CONSUMES_GAS) — FE 가스 자재 ──
         #   mat_nm 기반 매칭: Etch_Gas → ETCH, Dep_Gas → DEP
-        gas_mapping = [
-            {"pgrp_cd": "ETCH", "mat_cd": "MAT_G01"},
-            {"pgrp_cd": "DEP",  "mat_cd": "MAT_G02"},
+        gas_mapping = {("ETCH", "MAT_G01"), ("DEP", "MAT_G02")}
+        if master_changed:
+            await self._sync_plain_edges(
+                "CONSUMES_GAS", ("ProcessGroup", "pgrp_cd"), ("Material", "mat_cd"), gas_mapping,
+            )
+
+    async def _sync_plain_edges(
+        self, rel: str, src: tuple[str, str], dst: tuple[str, str], desired: set[tuple],
+    ) -> int:
+        """속성 없는 구조 관계 차분 동기화 (_sync_edges의 조회 / 기록 쿼리를 레이블 / 키로 구성)"""
+        (src_label, src_key), (dst_label, dst_key) = src, dst
+        return await self._sync_edges(
+            rel, src, dst,
+            f"""
+            MATCH (s:{src_label})-[:{rel}]->(d:{dst_label})
+            RETURN [s.{src_key}, d.{dst_key}] AS key, {{}} AS props
+            """,
+            {key: {} for key in desired},
+            f"""
+            UNWIND $rows AS row
+            MATCH (s:{src_label} {{{src_key}: row.src}}), (d:{dst_label} {{{dst_key}: row.dst}})
+            WHERE coalesce(s.deleted, false) = false AND coalesce(d.deleted, false) = false
+            MERGE (s)-[:{rel}]->(d)
+            """,
+        )
+
+    async def _sync_edges(
+        self, rel: str, src: tuple[str, str], dst: tuple[str, str],
+        existing_query: str, desired: dict[tuple, dict], write_query: str,
+    ) -> int:
+        """
+        구조 관계 차분 동기화
+        - src / dst: 출발 / 도착 노드 (레이블, 키 속성)
+        - existing_query: 현재 그래프의 관계 목록 (key=[출발코드, 도착코드], props=비교 속성)
+        - desired: 스냅샷 기준 관계 {(출발코드, 도착코드): 속성}
+        - 양 끝 노드가 (삭제 표시 없이) 존재하는 관계만 대상 — 없는 노드 관계는 매 실행 재전송하지 않음
+        - 신규이거나 속성이 바뀐 관계만 UNWIND 배치로 기록 (row.src / row.dst + 속성)
+        - 스냅샷에서 사라진 관계(기존 - 대상)는 배치 삭제
+        반환: 기록 + 삭제한 관계 수
+        """
+        src_keys = await self._live_node_keys(*src)
+        dst_keys = await self._live_node_keys(*dst)
+        targets = {
+            key: props for key, props in desired.items()
+            if key[0] in src_keys and key[1] in dst_keys
+        }
+
+        existing = {
+            tuple(record["key"]): record["props"]
+            for record in await run_query(existing_query)
+        }
+        rows = [
+            {"src": key[0], "dst": key[1], **props}
+            for key, props in targets.items()
+            if existing.get(key) != props
         ]
-        for gm in gas_mapping:
-            await run_write_query("""
-                MATCH (pg:ProcessGroup {pgrp_cd: $pgrp_cd}), (m:Material {mat_cd: $mat_cd})
-                MERGE (pg)-[:CONSUMES_GAS]->(m)
-            """, gm)
+        stale = [
+            {"src": key[0], "dst": key[1]}
+            for key in existing if key not in targets
+        ]
+        await run_write_batches(write_query, rows, label=rel)
+        (src_label, src_key), (dst_label, dst_key) = src, dst
+        await run_write_batches(f"""
+            UNWIND $rows AS row
+            MATCH (s:{src_label} {{{src_key}: row.src}})-[r:{rel}]->(d:{dst_label} {{{dst_key}: row.dst}})
+            DELETE r
+        """, stale, label=f"{rel} 삭제")
+        print(
+            f"[GraphBuilder] {rel}: 기존 {len(existing)}, 대상 {len(targets)} "
+            f"(노드 없음 제외 {len(desired) - len(targets)}), "
+            f"신규/변경 {len(rows)}, 삭제 {len(stale)}"
+        )
+        return len(rows) + len(stale)
+
+    @staticmethod
+    async def _live_node_keys(label: str, key: str) -> set:
+        """삭제 표시되지 않은 노드의 키 집합"""
+        records = await run_query(f"""
+            MATCH (n:{label})
+            WHERE coalesce(n.deleted, false) = false
+            RETURN n.{key} AS key
+        """)
+        return {record["key"] for record in records}
 
     # ─────────────────────────────────────
     # Step 4b: 차이 노드 생성
     # ─────────────────────────────────────
 
-    async def create_variance_nodes(self, yyyymm: str):
-        """차이 노드 생성 + 위치 연결"""
-        result = await self.session.execute(
-            text("SELECT * FROM cal_variance WHERE yyyymm = :ym"),
-            {"ym": yyyymm},
-        )
-        rows = result.fetchall()
-        columns = result.keys()
+    async def create_variance_nodes(self, yyyymm: str, var_ids: list[str] | None = None):
+        """
+        차이 노드 생성 + 위치 연결
+        var_ids 지정 시 해당 차이만 갱신 (증분 재계산 결과 반영)
+        """
+        if var_ids is not None:
+            if not var_ids:
+                return
+            result = await self.session.execute(
+                text("SELECT * FROM cal_variance WHERE yyyymm = :ym AND var_id IN :ids")
+                .bindparams(bindparam("ids", expanding=True)),
+                {"ym": yyyymm, "ids": var_ids},
+            )
+        else:
+            result = await self.session.execute(
+                text("SELECT * FROM cal_variance WHERE yyyymm = :ym"),
+                {"ym": yyyymm},
+            )
+        rows = [dict(row._mapping) for row in result.fetchall()]
+
+        # 노드 + 위치 연결(OCCURS_AT / OCCURS_IN / RELATES_TO)을 청크당 1문장으로 적재
+        # 대상 마스터 노드가 없으면 해당 관계만 생략 (OPTIONAL MATCH + FOREACH)
+        await run_write_batches(f"""
+            UNWIND $rows AS row
+            MERGE (v:Variance {{var_id: row.var_id}})
+            SET v.yyyymm = row.yyyymm,
+                v.product_grp = row.product_grp,
+                v.product_cd = row.product_cd,
+                v.proc_cd = row.proc_cd,
+                v.ce_cd = row.ce_cd,
+                v.var_type = row.var_type,
+                v.var_amt = row.var_amt,
+                v.var_rate = row.var_rate,
+                v.prev_amt = row.prev_amt,
+                v.curr_amt = row.curr_amt,
+                v.var_key = {var_key_expr("row")},
+                v.level = CASE WHEN row.product_cd IS NULL THEN 'GROUP' ELSE 'PRODUCT' END,
+                v.created_at = datetime()
+            WITH v, row
+            OPTIONAL MATCH (p:Product {{prod_cd: row.product_cd}})
+            WHERE coalesce(p.deleted, false) = false
+            FOREACH (_ IN CASE WHEN p IS NULL THEN [] ELSE [1] END |
+                MERGE (v)-[:OCCURS_AT]->(p))
+            WITH v, row
+            OPTIONAL MATCH (proc:Process {{proc_cd: row.proc_cd}})
+            WHERE coalesce(proc.deleted, false) = false
+            FOREACH (_ IN CASE WHEN proc IS NULL THEN [] ELSE [1] END |
+                MERGE (v)-[:OCCURS_IN]->(proc))
+            WITH v, row
+            OPTIONAL MATCH (ce:CostElement {{ce_cd: row.ce_cd}})
+            WHERE coalesce(ce.deleted, false) = false
+            FOREACH (_ IN CASE WHEN ce IS NULL THEN [] ELSE [1] END |
+                MERGE (v)-[:RELATES_TO]->(ce))
+        """, rows, label="Variance")
+
+        graph_stats.invalidate()
+        print(f"[GraphBuilder] 차이 노드 {len(rows)}건 생성 완료")
 
-        for row in rows:
-            data = dict(zip(columns, row))
-
-            # Variance 노드 생성
-            await run_write_query("""
-                MERGE (v:Variance {var_id: $var_id})
-                SET v.yyyymm = $yyyymm,
-                    v.product_grp = $product_grp,
-                    v.product_cd = $product_cd,
-                    v.proc_cd = $proc_cd,
-                    v.ce_cd = $ce_cd,
-                    v.var_type = $var_type,
-                    v.var_amt = $var_amt,
-                    v.var_rate = $var_rate,
-                    v.prev_amt = $prev_amt,
-                    v.curr_amt = $curr_amt,
-                    v.level = CASE WHEN $product_cd IS NULL THEN 'GROUP' ELSE 'PRODUCT' END,
-                    v.created_at = datetime()
-            """, data)
-
-            # 위치 연결: OCCURS_AT (제품)
-            if data.get("product_cd"):
-                await run_write_query("""
-                    MATCH (v:Variance {var_id: $var_id}), (p:Product {prod_cd: $prod_cd})
-                    MERGE (v)-[:OCCURS_AT]->(p)
-                """, {"var_id": data["var_id"], "prod_cd": data["product_cd"]})
-
-            # 위치 연결: OCCURS_IN (공정)
-            if data.get("proc_cd"):
-                await run_write_query("""
-                    MATCH (v:Variance {var_id: $var_id}), (proc:Process {proc_cd: $proc_cd})
-                    MERGE (v)-[:OCCURS_IN]->(proc)
-                """, {"var_id": data["var_id"], "proc_cd": data["proc_cd"]})
-
-            # 위치 연결: RELATES_TO (원가요소)
-            if data.get("ce_cd"):
-                await run_write_query("""
-                    MATCH (v:Variance {var_id: $var_id}), (ce:CostElement {ce_cd: $ce_cd})
-                    MERGE (v)-[:RELATES_TO]->(ce)
-                """, {"var_id": data["var_id"], "ce_cd": data["ce_cd"]})
+    async def apply_incremental(self, yyyymm: str, upserted: list[str], removed: list[str]) -> dict:
+        """
+        증분 재계산 결과 반영 (calculate_incremental 이후)
+        1) 변경/삭제 차이에 걸린 규칙 관계 삭제
+           (과거 사례를 가리키는 다른 월의 SIMILAR_TO 유입 관계는 유지)
+        2) 해당 (공정, 원가요소) CostPool 삭제 — 구성원이 바뀌므로 Rule 5가 재생성
+        3) 삭제 차이 노드 제거 / 변경 차이 노드 upsert
+        4) 해당 월 규칙 재실행 (MERGE 기반 — 변경 없는 관계는 그대로, 기여도 등 속성은 갱신)
+        반환: 규칙별 실행 결과
+        """
+        touched = sorted(set(upserted) | set(removed))
+        if not touched:
+            return {}
 
-        print(f"[GraphBuilder] 차이 노드 {len(rows)}건 생성 완료")
+        await run_write_query("""
+            MATCH (v:Variance) WHERE v.var_id IN $var_ids
+            OPTIONAL MATCH (cp:CostPool {pool_id: 'CP_' + v.yyyymm + '_' + v.proc_cd + '_' + v.ce_cd})
+            DETACH DELETE cp
+        """, {"var_ids": touched})
+        await run_write_query("""
+            MATCH (v:Variance)-[r]-() WHERE v.var_id IN $var_ids
+              AND r.rule_id IS NOT NULL
+              AND NOT (type(r) = 'SIMILAR_TO' AND endNode(r) = v)
+            DELETE r
+        """, {"var_ids": touched})
+
+        await self.delete_variance_nodes(removed)
+        await self.create_variance_nodes(yyyymm, var_ids=upserted)
+        return await create_rule_engine().execute_all_rules(yyyymm)
+
+    async def backfill_var_keys(self) -> int:
+        """var_key 속성이 없는 기존 차이 노드에 키 채우기 (배치 갱신)"""
+        return await run_batched_update(f"""
+            MATCH (v:Variance) WHERE v.var_key IS NULL
+            WITH v LIMIT $batch
+            SET v.var_key = {var_key_expr("v")}
+            RETURN count(*) AS updated
+        """, label="Variance.var_key 백필")
+
+    async def delete_variance_nodes(self, var_ids: list[str]):
+        """차이 노드 삭제 (증분 재계산에서 제거된 차이)"""
+        if not var_ids:
+            return
+        await run_write_query("""
+            MATCH (v:Variance) WHERE v.var_id IN $var_ids
+            DETACH DELETE v
+        """, {"var_ids": var_ids})
+        graph_stats.invalidate()
+        print(f"[GraphBuilder] 차이 노드 {len(var_ids)}건 삭제 완료")
 
     # ─────────────────────────────────────
     # Step 4c: 이벤트 노드 생성
     # ─────────────────────────────────────
 
     async def create_event_nodes(self, yyyymm: str):
-        """이벤트 노드 생성 + 대상 연결"""
-        await self._create_mes_events(yyyymm)
-        await self._create_plm_events(yyyymm)
-        await self._create_purchase_events(yyyymm)
-        print(f"[GraphBuilder] 이벤트 노드 생성 완료")
-
-    async def _create_mes_events(self, yyyymm: str):
-        """MES 이벤트 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT * FROM evt_mes WHERE yyyymm = :ym"), {"ym": yyyymm}
+        """
+        이벤트 노드 생성 + 대상 연결
+        MES / PLM / 구매 3개 소스를 동시 적재 (소스별 DB 세션 + Neo4j 세션 분리)
+        """
+        mes, plm, purchase = await asyncio.gather(
+            self._create_mes_events(yyyymm),
+            self._create_plm_events(yyyymm),
+            self._create_purchase_events(yyyymm),
+        )
+        graph_stats.invalidate()
+        print(
+            f"[GraphBuilder] 이벤트 노드 생성 완료 "
+            f"(MES {mes}, PLM {plm}, PURCHASE {purchase})"
         )
-        for row in result.fetchall():
-            data = dict(zip(result.keys(), row))
-            event_id = f"MES_{yyyymm}_{data['equip_cd']}_{data['metric_type']}"
-
-            await run_write_query("""
-                MERGE (e:Event {event_id: $event_id})
-                SET e.yyyymm = $yyyymm, e.source = 'MES',
-                    e.event_type = $metric_type + '_CHG',
-                    e.target_cd = $equip_cd,
-                    e.metric_type = $metric_type,
-                    e.prev_value = $prev_value,
-                    e.curr_value = $curr_value,
-                    e.chg_value = $chg_value,
-                    e.chg_rate = $chg_rate,
-                    e.created_at = datetime()
-            """, {
-                "event_id": event_id, "yyyymm": yyyymm,
+
+    async def _stream_events(
+        self, source: str, sql: str, yyyymm: str, cypher: str, to_row,
+    ) -> int:
+        """
+        이벤트 소스 테이블을 서버 측 커서로 스트리밍 → UNWIND 배치 적재
+        - 소스별 전용 DB 세션 사용 (동시 실행 시 세션 공유 불가)
+        - NEO4J_BATCH_SIZE 행 단위 파티션마다 run_write_batches 1회
+        """
+        total = 0
+        async with get_session_factory()() as session:
+            result = await session.stream(text(sql), {"ym": yyyymm})
+            async for partition in result.mappings().partitions(settings.NEO4J_BATCH_SIZE):
+                rows = [to_row(data) for data in partition]
+                total += await run_write_batches(cypher, rows, label=f"Event({source})")
+        return total
+
+    async def _create_mes_events(self, yyyymm: str) -> int:
+        """MES 이벤트 노드 생성 + 장비 연결"""
+        return await self._stream_events(
+            "MES", "SELECT * FROM evt_mes WHERE yyyymm = :ym", yyyymm, """
+            UNWIND $rows AS row
+            MERGE (e:Event {event_id: row.event_id})
+            SET e.yyyymm = row.yyyymm, e.source = 'MES',
+                e.event_type = row.metric_type + '_CHG',
+                e.target_cd = row.equip_cd,
+                e.metric_type = row.metric_type,
+                e.prev_value = row.prev_value,
+                e.curr_value = row.curr_value,
+                e.chg_value = row.chg_value,
+                e.chg_rate = row.chg_rate,
+                e.created_at = datetime()
+            WITH e, row
+            OPTIONAL MATCH (eq:Equipment {equip_cd: row.equip_cd})
+            WHERE coalesce(eq.deleted, false) = false
+            FOREACH (_ IN CASE WHEN eq IS NULL THEN [] ELSE [1] END |
+                MERGE (e)-[:INVOLVES]->(eq))
+            """,
+            lambda data: {
+                "event_id": mes_event_id(yyyymm, data["equip_cd"], data["metric_type"]),
+                "yyyymm": yyyymm,
                 "metric_type": data["metric_type"],
                 "equip_cd": data["equip_cd"],
                 "prev_value": data["prev_value"],
                 "curr_value": data["curr_value"],
                 "chg_value": data["chg_value"],
                 "chg_rate": data["chg_rate"],
-            })
-
-            # 장비 연결
-            await run_write_query("""
-                MATCH (e:Event {event_id: $event_id}), (eq:Equipment {equip_cd: $equip_cd})
-                MERGE (e)-[:INVOLVES]->(eq)
-            """, {"event_id": event_id, "equip_cd": data["equip_cd"]})
-
-    async def _create_plm_events(self, yyyymm: str):
-        """PLM 이벤트 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT * FROM evt_plm WHERE yyyymm = :ym"), {"ym": yyyymm}
+            },
         )
-        for row in result.fetchall():
-            data = dict(zip(result.keys(), row))
-            await run_write_query("""
-                MERGE (e:Event {event_id: $event_id})
-                SET e.yyyymm = $yyyymm, e.source = 'PLM',
-                    e.event_type = $chg_type,
-                    e.target_cd = $product_cd,
-                    e.description = $chg_desc,
-                    e.created_at = datetime()
-            """, {
+
+    async def _create_plm_events(self, yyyymm: str) -> int:
+        """PLM 이벤트 노드 생성 + 제품 연결"""
+        return await self._stream_events(
+            "PLM", "SELECT * FROM evt_plm WHERE yyyymm = :ym", yyyymm, """
+            UNWIND $rows AS row
+            MERGE (e:Event {event_id: row.event_id})
+            SET e.yyyymm = row.yyyymm, e.source = 'PLM',
+                e.event_type = row.chg_type,
+                e.target_cd = row.product_cd,
+                e.description = row.chg_desc,
+                e.created_at = datetime()
+            WITH e, row
+            OPTIONAL MATCH (p:Product {prod_cd: row.product_cd})
+            WHERE coalesce(p.deleted, false) = false
+            FOREACH (_ IN CASE WHEN p IS NULL THEN [] ELSE [1] END |
+                MERGE (e)-[:INVOLVES]->(p))
+            """,
+            lambda data: {
                 "event_id": data["event_id"], "yyyymm": yyyymm,
                 "chg_type": data["chg_type"],
                 "product_cd": data["product_cd"],
                 "chg_desc": data["chg_desc"],
-            })
-
-            # 제품 연결
-            await run_write_query("""
-                MATCH (e:Event {event_id: $event_id}), (p:Product {prod_cd: $prod_cd})
-                MERGE (e)-[:INVOLVES]->(p)
-            """, {"event_id": data["event_id"], "prod_cd": data["product_cd"]})
-
-    async def _create_purchase_events(self, yyyymm: str):
-        """구매 이벤트 노드 생성"""
-        result = await self.session.execute(
-            text("SELECT * FROM evt_purchase WHERE yyyymm = :ym"), {"ym": yyyymm}
+            },
         )
-        for row in result.fetchall():
-            data = dict(zip(result.keys(), row))
-            await run_write_query("""
-                MERGE (e:Event {event_id: $event_id})
-                SET e.yyyymm = $yyyymm, e.source = 'PURCHASE',
-                    e.event_type = $chg_type,
-                    e.target_cd = $mat_cd,
-                    e.prev_value = $prev_value,
-                    e.curr_value = $curr_value,
-                    e.chg_rate = $chg_rate,
-                    e.description = $chg_reason,
-                    e.created_at = datetime()
-            """, {
+
+    async def _create_purchase_events(self, yyyymm: str) -> int:
+        """구매 이벤트 노드 생성 + 자재 연결"""
+        return await self._stream_events(
+            "PURCHASE", "SELECT * FROM evt_purchase WHERE yyyymm = :ym", yyyymm, """
+            UNWIND $rows AS row
+            MERGE (e:Event {event_id: row.event_id})
+            SET e.yyyymm = row.yyyymm, e.source = 'PURCHASE',
+                e.event_type = row.chg_type,
+                e.target_cd = row.mat_cd,
+                e.prev_value = row.prev_value,
+                e.curr_value = row.curr_value,
+                e.chg_rate = row.chg_rate,
+                e.description = row.chg_reason,
+                e.created_at = datetime()
+            WITH e, row
+            OPTIONAL MATCH (m:Material {mat_cd: row.mat_cd})
+            WHERE coalesce(m.deleted, false) = false
+            FOREACH (_ IN CASE WHEN m IS NULL THEN [] ELSE [1] END |
+                MERGE (e)-[:INVOLVES]->(m))
+            """,
+            lambda data: {
                 "event_id": data["event_id"], "yyyymm": yyyymm,
                 "chg_type": data["chg_type"],
                 "mat_cd": data["mat_cd"],
@@ -430,10 +829,5 @@ class GraphBuilder:
                 "curr_value": data["curr_value"],
                 "chg_rate": data["chg_rate"],
                 "chg_reason": data["chg_reason"],
-            })
-
-            # 자재 연결
-            await run_write_query("""
-                MATCH (e:Event {event_id: $event_id}), (m:Material {mat_cd: $mat_cd})
-                MERGE (e)-[:INVOLVES]->(m)
-            """, {"event_id": data["event_id"], "mat_cd": data["mat_cd"]})
+            },
+        )
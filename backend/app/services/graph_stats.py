@@ -0,0 +1,111 @@
+"""
+Neo4j 그래프 통계 캐시
+- 레이블별 노드 수 / 유형별 관계 수를 카운트 스토어에서 1회 조회
+  1) apoc.meta.stats() (APOC 설치 시)
+  2) 미설치 시 단일 UNION ALL 쿼리 (고정 문자열 → 실행 계획 캐시 재사용)
+- GRAPH_STATS_TTL_SEC 동안 캐시, GraphBuilder / RuleEngine 쓰기 완료 시 무효화
+"""
+
+import asyncio
+import time
+
+from neo4j.exceptions import ClientError
+
+from app.config import settings
+from app.db.neo4j_db import run_query
+
+
+NODE_LABELS = [
+    "ProductGroup", "Product", "Process", "ProcessGroup",
+    "Equipment", "Material", "CostElement", "AllocBase",
+    "Variance", "Event", "CostPool",
+]
+
+REL_TYPES = [
+    "CONTAINS", "COST_AT", "HAS_SUBPROCESS", "HAS_EQUIPMENT",
+    "COST_COMPOSED_OF", "ALLOCATED_BY", "USES_MATERIAL", "CONSUMES_GAS",
+    "OCCURS_AT", "OCCURS_IN", "RELATES_TO", "INVOLVES",
+    "CAUSED_BY", "EVIDENCED_BY", "SPREADS_TO", "AFFECTS", "SIMILAR_TO",
+]
+
+_APOC_QUERY = """
+    CALL apoc.meta.stats() YIELD labels, relTypesCount
+    RETURN labels, relTypesCount
+"""
+
+# 레이블/관계 유형은 파라미터화할 수 없으므로 상수 목록으로 한 번만 조립
+_UNION_QUERY = "\nUNION ALL\n".join(
+    [
+        f"MATCH (n:{label}) RETURN 'node' AS kind, '{label}' AS name, count(n) AS cnt"
+        for label in NODE_LABELS
+    ] + [
+        f"MATCH ()-[r:{rtype}]->() RETURN 'rel' AS kind, '{rtype}' AS name, count(r) AS cnt"
+        for rtype in REL_TYPES
+    ]
+)
+
+
+class GraphStatsCache:
+    """그래프 통계 캐시 — TTL + 쓰기 후 무효화"""
+
+    def __init__(self):
+        self._stats: dict | None = None
+        self._loaded_at = 0.0
+        self._use_apoc: bool | None = None   # None: 아직 확인 안 함
+        self._lock = asyncio.Lock()
+
+    async def get(self, force: bool = False) -> dict:
+        """
+        그래프 통계 조회
+        반환: {"nodes": {레이블: 수}, "relationships": {유형: 수}, "total_nodes", "total_relationships"}
+        """
+        async with self._lock:
+            now = time.monotonic()
+            if (
+                self._stats is not None
+                and not force
+                and now - self._loaded_at < settings.GRAPH_STATS_TTL_SEC
+            ):
+                return self._stats
+
+            nodes, rels = await self._load()
+            self._stats = {
+                "nodes": nodes,
+                "relationships": rels,
+                "total_nodes": sum(nodes.values()),
+                "total_relationships": sum(rels.values()),
+            }
+            self._loaded_at = now
+            return self._stats
+
+    def invalidate(self):
+        """캐시 무효화 (그래프 쓰기 완료 후 호출)"""
+        self._stats = None
+        self._loaded_at = 0.0
+
+    async def _load(self) -> tuple[dict, dict]:
+        """카운트 스토어 조회 (APOC 우선, 실패 시 UNION 쿼리로 전환)"""
+        if self._use_apoc is not False:
+            try:
+                rows = await run_query(_APOC_QUERY)
+                self._use_apoc = True
+                labels = rows[0]["labels"] if rows else {}
+                rel_counts = rows[0]["relTypesCount"] if rows else {}
+                return (
+                    {label: labels.get(label, 0) for label in NODE_LABELS},
+                    {rtype: rel_counts.get(rtype, 0) for rtype in REL_TYPES},
+                )
+            except ClientError as e:
+                print(f"[GraphStats] apoc.meta.stats 사용 불가 → UNION 쿼리 사용: {e.code}")
+                self._use_apoc = False
+
+        nodes = {label: 0 for label in NODE_LABELS}
+        rels = {rtype: 0 for rtype in REL_TYPES}
+        for row in await run_query(_UNION_QUERY):
+            target = nodes if row["kind"] == "node" else rels
+            target[row["name"]] = row["cnt"]
+        return nodes, rels
+
+
+# 싱글턴 캐시 인스턴스
+graph_stats = GraphStatsCache()
@@ -0,0 +1,130 @@
+"""
+마스터 데이터 캐시
+- 제품 → 제품군, 공정 → 유형/공정군/배부기준, 자재 → 자재유형
+- 일괄 조회로 1회 적재 (행 단위 mst_* 조회 제거)
+- mst_* 테이블 버전 스탬프(mst_version, 트리거 갱신)가 바뀌면 재적재
+- VarianceCalculator / GraphBuilder / 대시보드 API 공용 (프로세스 단위 싱글턴)
+"""
+
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.config import settings
+
+
+# mst_* 버전 스탬프 — 트리거가 갱신하는 mst_version 행만 조회 (마스터 테이블 스캔 없음)
+_VERSION_QUERY = text("""
+    SELECT coalesce(string_agg(table_nm || ':' || version, ',' ORDER BY table_nm), '')
+    FROM mst_version
+""")
+
+
+class MasterData:
+    """마스터 데이터 스냅샷 (읽기 전용)"""
+
+    def __init__(
+        self, version: str,
+        products: dict[str, dict],
+        processes: dict[str, dict],
+        materials: dict[str, dict],
+    ):
+        self.version = version
+        self.products = products      # product_cd → 제품 마스터 행
+        self.processes = processes    # proc_cd → 공정 마스터 행
+        self.materials = materials    # mat_cd → 자재 마스터 행
+
+    def product_group(self, product_cd: str) -> str:
+        """제품코드 → 제품군 (없으면 빈 문자열)"""
+        row = self.products.get(product_cd)
+        return row["product_grp"] if row else ""
+
+    def process(self, proc_cd: str) -> dict | None:
+        """공정코드 → 공정 마스터 행 (proc_type, proc_grp, alloc_base 등)"""
+        return self.processes.get(proc_cd)
+
+    def material_type(self, mat_cd: str) -> str:
+        """자재코드 → 자재유형 (없으면 빈 문자열)"""
+        row = self.materials.get(mat_cd)
+        return (row["mat_type"] or "") if row else ""
+
+    def product_groups(self) -> list[str]:
+        """제품군 목록 (중복 제거, 제품군 없는 제품 제외)"""
+        return sorted({
+            row["product_grp"]
+            for row in self.products.values()
+            if row["product_grp"] is not None
+        })
+
+    def process_groups(self) -> list[tuple[str, str]]:
+        """(공정군, 공정유형) 목록 (중복 제거)"""
+        return sorted({
+            (row["proc_grp"], row["proc_type"])
+            for row in self.processes.values()
+            if row["proc_grp"] is not None
+        }, key=lambda x: (x[0], x[1] or ""))
+
+
+class MasterCache:
+    """마스터 데이터 캐시 — 버전 스탬프 기반 무효화"""
+
+    def __init__(self):
+        self._data: MasterData | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, session: AsyncSession, check_version: bool = False) -> MasterData:
+        """
+        마스터 데이터 조회
+        - check_version=False: 마지막 확인 후 MASTER_CACHE_CHECK_SEC 이내면 캐시 그대로 사용
+        - check_version=True: 버전 스탬프를 항상 확인 (배치 실행 시작 시)
+        """
+        async with self._lock:
+            now = time.monotonic()
+            if (
+                self._data is not None
+                and not check_version
+                and now - self._checked_at < settings.MASTER_CACHE_CHECK_SEC
+            ):
+                return self._data
+
+            version = (await session.execute(_VERSION_QUERY)).scalar()
+            if self._data is None or self._data.version != version:
+                self._data = await self._load(session, version)
+                print(
+                    f"[MasterCache] 적재 완료: 제품 {len(self._data.products)}, "
+                    f"공정 {len(self._data.processes)}, 자재 {len(self._data.materials)}"
+                )
+            self._checked_at = now
+            return self._data
+
+    def invalidate(self):
+        """캐시 무효화 (다음 조회 시 재적재)"""
+        self._data = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    async def _load(session: AsyncSession, version: str) -> MasterData:
+        """mst_product / mst_process / mst_material 일괄 조회"""
+        result = await session.execute(text(
+            "SELECT product_cd, product_nm, product_grp, proc_type, use_yn FROM mst_product"
+        ))
+        products = {row[0]: dict(row._mapping) for row in result.fetchall()}
+
+        result = await session.execute(text(
+            "SELECT proc_cd, proc_nm, proc_type, proc_grp, alloc_type, alloc_base FROM mst_process"
+        ))
+        processes = {row[0]: dict(row._mapping) for row in result.fetchall()}
+
+        result = await session.execute(text(
+            "SELECT mat_cd, mat_nm, mat_type, proc_type FROM mst_material"
+        ))
+        materials = {row[0]: dict(row._mapping) for row in result.fetchall()}
+
+        return MasterData(version, products, processes, materials)
+
+
+# 싱글턴 캐시 인스턴스
+master_cache = MasterCache()
@@ -0,0 +1,141 @@
+"""
+규칙 매칭용 도달 가능성 인덱스
+- 공정 → 장비 집합 (Process -HAS_SUBPROCESS-> ProcessGroup -HAS_EQUIPMENT-> Equipment)
+- 제품 → 자재 집합 (Product -USES_MATERIAL-> Material, 최신 BOM 월)
+- 상설 그래프와 같은 원천(마스터 / snp_bom)에서 계산, 상설 그래프 갱신 시마다 재구축
+- 원천 스탬프(마스터 버전 스탬프 + 최신 BOM 월/행 수)가 바뀌면 조회 시 재구축
+  (상설 그래프를 다시 만들지 않고 마스터 / BOM만 바뀐 경우도 반영)
+- 내용 해시로 버전 관리 → 규칙 엔진은 그래프 경로 확장 대신 키 조회로 매칭
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.config import settings
+from app.db.database import get_session_factory
+from app.services.master_cache import master_cache
+
+
+# 최신 BOM 월 / 행 수 스탬프 (snp_bom PK 선두 컬럼 yyyymm 인덱스 범위 조회)
+_BOM_STAMP_QUERY = text("""
+    SELECT coalesce(max(yyyymm), '') || ':' || count(*)
+    FROM snp_bom
+    WHERE yyyymm = (SELECT max(yyyymm) FROM snp_bom)
+""")
+
+
+class ReachabilityIndex:
+    """도달 가능성 인덱스 스냅샷 (읽기 전용)"""
+
+    def __init__(
+        self, proc_equipment: dict[str, set[str]], product_materials: dict[str, set[str]],
+        source_stamp: str = "",
+    ):
+        self.source_stamp = source_stamp              # 구축 시점 원천 스탬프
+        self.proc_equipment = proc_equipment          # proc_cd → {equip_cd}
+        self.product_materials = product_materials    # product_cd → {mat_cd}
+        payload = json.dumps(
+            [
+                sorted((k, sorted(v)) for k, v in proc_equipment.items()),
+                sorted((k, sorted(v)) for k, v in product_materials.items()),
+            ],
+            ensure_ascii=False,
+        )
+        self.version = hashlib.md5(payload.encode("utf-8")).hexdigest()
+        self.built_at = time.time()
+
+    def equipment_of(self, proc_cd: str) -> set[str]:
+        """공정코드 → 같은 공정군 장비 집합"""
+        return self.proc_equipment.get(proc_cd, set())
+
+    def materials_of(self, product_cd: str) -> set[str]:
+        """제품코드 → BOM 자재 집합"""
+        return self.product_materials.get(product_cd, set())
+
+
+class ReachabilityCache:
+    """도달 가능성 인덱스 캐시 — 상설 그래프 갱신 시 또는 원천 스탬프 변경 시 재구축"""
+
+    def __init__(self):
+        self._index: ReachabilityIndex | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> ReachabilityIndex:
+        """
+        인덱스 조회
+        - 마지막 확인 후 MASTER_CACHE_CHECK_SEC 이내면 캐시 그대로 사용
+        - 그 외에는 전용 DB 세션으로 원천 스탬프를 확인해 구축 전이거나 바뀌었으면 재구축
+        """
+        async with self._lock:
+            now = time.monotonic()
+            if self._index is not None and now - self._checked_at < settings.MASTER_CACHE_CHECK_SEC:
+                return self._index
+
+            async with get_session_factory()() as session:
+                stamp = await self._source_stamp(session)
+                if self._index is None or self._index.source_stamp != stamp:
+                    self._index = await self._build(session, stamp)
+            self._checked_at = now
+            return self._index
+
+    async def rebuild(self, session: AsyncSession) -> ReachabilityIndex:
+        """인덱스 재구축 (GraphBuilder.build_permanent_graph 완료 시 호출)"""
+        async with self._lock:
+            self._index = await self._build(session, await self._source_stamp(session))
+            self._checked_at = time.monotonic()
+            return self._index
+
+    @staticmethod
+    async def _source_stamp(session: AsyncSession) -> str:
+        """원천 스탬프: mst_* 버전 스탬프(mst_equipment 포함) + 최신 BOM 월 / 행 수"""
+        master = await master_cache.get(session, check_version=True)
+        bom = (await session.execute(_BOM_STAMP_QUERY)).scalar()
+        return f"{master.version}|{bom}"
+
+    @staticmethod
+    async def _build(session: AsyncSession, stamp: str) -> ReachabilityIndex:
+        """마스터 / 장비 / 최신 BOM에서 공정→장비, 제품→자재 매핑 계산"""
+        master = await master_cache.get(session)
+
+        # 공정 → 공정군 → (소속 공정의 공정군이 같은) 장비
+        proc_grp = {
+            cd: row["proc_grp"] for cd, row in master.processes.items()
+            if row["proc_grp"] is not None
+        }
+        group_equipment: dict[str, set[str]] = {}
+        result = await session.execute(text("SELECT equip_cd, proc_cd FROM mst_equipment"))
+        for equip_cd, proc_cd in result.fetchall():
+            grp = proc_grp.get(proc_cd)
+            if grp is not None:
+                group_equipment.setdefault(grp, set()).add(equip_cd)
+        proc_equipment = {
+            proc_cd: group_equipment[grp]
+            for proc_cd, grp in proc_grp.items() if grp in group_equipment
+        }
+
+        # 제품 → 자재 (USES_MATERIAL과 동일 기준: 최신 BOM 월, 마스터에 있는 제품/자재만)
+        product_materials: dict[str, set[str]] = {}
+        result = await session.execute(text("""
+            SELECT DISTINCT product_cd, mat_cd FROM snp_bom
+            WHERE yyyymm = (SELECT MAX(yyyymm) FROM snp_bom)
+        """))
+        for product_cd, mat_cd in result.fetchall():
+            if product_cd in master.products and mat_cd in master.materials:
+                product_materials.setdefault(product_cd, set()).add(mat_cd)
+
+        index = ReachabilityIndex(proc_equipment, product_materials, stamp)
+        print(
+            f"[Reachability] 인덱스 구축: 공정 {len(proc_equipment)}, "
+            f"제품 {len(product_materials)} (버전 {index.version[:8]})"
+        )
+        return index
+
+
+# 싱글턴 캐시 인스턴스
+reachability = ReachabilityCache()
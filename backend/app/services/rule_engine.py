@@ -6,31 +6,197 @@
   Rule 2: 배부율 차이 → 총비용/총배부기준량 분해 연결
   Rule 3: 배부기준량(ST) 변동 → MES 이벤트 매칭
   Rule 4: 재료비 변동 → 구매/PLM 이벤트 매칭
-  Rule 5: 파급 관계 생성
+  Rule 5: 파급 관계 생성 (CostPool 허브 경유)
   Rule 6: 유사 과거 사례 매칭
+
+관계는 (시작 노드, 끝 노드, rule_id) 기준으로 MERGE하고 나머지 속성은 SET으로 갱신
+→ 같은 월을 여러 번 실행해도 관계가 중복 생성되지 않음 (created_at은 최초 생성 시각 유지)
+
+실행 순서: RULE_DAG 의존관계에 따라 독립 규칙은 asyncio.gather로 동시 실행
+(동시 쓰기 중 교착 감지 등 일시 오류는 관리형 트랜잭션이 자동 재시도)
 """
 
-from app.db.neo4j_db import run_write_query, run_query
+import asyncio
+import time
+
+from app.db.neo4j_db import run_write_query, run_query, merge_counters
 from app.config import settings
+from app.services.graph_stats import graph_stats
+from app.services.reachability import reachability
+
+
+# ── Rule 1~5 매칭 패턴 ──
+# 각 패턴은 a(시작 노드) / b(끝 노드) / props(관계 속성 맵)를 남기는 WITH로 끝남
+# 규칙 실행(_merge_patterns)은 MERGE를, 평가(evaluate)는 RETURN을 덧붙여 같은 패턴 공유
+
+# 1a: TOTAL_VAR → 세부 차이 (TOTAL_VAR이 있는 경우, 기여도 = |세부| / Σ|세부|)
+_RULE_01A = """
+    MATCH (total:Variance {yyyymm: $yyyymm, var_type: 'TOTAL_VAR'})
+    WHERE total.product_cd IS NOT NULL
+    MATCH (detail:Variance {yyyymm: $yyyymm, product_cd: total.product_cd})
+    WHERE detail.var_type IN ['RATE_VAR', 'QTY_VAR', 'PRICE_VAR', 'USAGE_VAR']
+      AND abs(detail.var_amt) > 0
+    WITH total, detail,
+         abs(detail.var_amt) AS abs_amt
+    WITH total, collect({node: detail, amt: abs_amt}) AS details,
+         sum(abs_amt) AS total_abs
+    UNWIND details AS d
+    WITH total AS a, d.node AS b,
+         {contribution: CASE WHEN total_abs > 0 THEN d.amt / total_abs ELSE 0 END} AS props
+"""
+
+# 1b: RATE_VAR ← QTY_VAR 쌍 연결 (같은 제품·공정·원가요소)
+_RULE_01B = """
+    MATCH (rv:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+    WHERE rv.product_cd IS NOT NULL
+    MATCH (qv:Variance {var_key: rv.var_key, var_type: 'QTY_VAR'})
+    USING INDEX qv:Variance(var_key)
+    WITH rv, qv,
+         abs(rv.var_amt) + abs(qv.var_amt) AS total_abs
+    WHERE total_abs > 0
+    WITH rv AS a, qv AS b, {contribution: abs(rv.var_amt) / total_abs} AS props
+"""
+
+# 1c: PRICE_VAR ← USAGE_VAR 쌍 연결 (같은 제품·공정·원가요소)
+_RULE_01C = """
+    MATCH (pv:Variance {yyyymm: $yyyymm, var_type: 'PRICE_VAR'})
+    WHERE pv.product_cd IS NOT NULL
+    MATCH (uv:Variance {var_key: pv.var_key, var_type: 'USAGE_VAR'})
+    USING INDEX uv:Variance(var_key)
+    WITH pv, uv,
+         abs(pv.var_amt) + abs(uv.var_amt) AS total_abs
+    WHERE total_abs > 0
+    WITH pv AS a, uv AS b, {contribution: abs(pv.var_amt) / total_abs} AS props
+"""
+
+# 2: RATE_VAR → RATE_COST / RATE_BASE (기여도 = |하위| / |배부율 차이|)
+_RULE_02 = """
+    MATCH (rate:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+    WHERE rate.product_cd IS NOT NULL
+
+    MATCH (sub:Variance {var_key: rate.var_key})
+    USING INDEX sub:Variance(var_key)
+    WHERE sub.var_type IN ['RATE_COST', 'RATE_BASE']
+
+    WITH rate AS a, sub AS b,
+         {contribution: CASE WHEN abs(rate.var_amt) > 0
+                             THEN abs(sub.var_amt) / abs(rate.var_amt)
+                             ELSE 0 END} AS props
+"""
+
+# 3: RATE_BASE → 같은 공정군 장비 UTIL MES 이벤트 ($rows: 공정별 이벤트 ID)
+_RULE_03 = """
+    UNWIND $rows AS row
+    MATCH (rb:Variance {yyyymm: $yyyymm, var_type: 'RATE_BASE', proc_cd: row.proc_cd})
+    UNWIND row.event_ids AS event_id
+    MATCH (evt:Event {event_id: event_id})
+    WHERE evt.event_type = 'UTIL_CHG'
+    MATCH (evt)-[:INVOLVES]->(eq:Equipment)
+    WHERE coalesce(eq.deleted, false) = false
+    WITH DISTINCT rb AS a, evt AS b
+    WITH a, b, {match_score: 0.9} AS props
+"""
+
+# 4a: 단가 차이 → 구매 이벤트 ($rows: 제품별 BOM 자재 단가 변동 이벤트 ID)
+_RULE_04A = """
+    UNWIND $rows AS row
+    MATCH (pv:Variance {yyyymm: $yyyymm, var_type: 'PRICE_VAR', product_cd: row.product_cd})
+    UNWIND row.event_ids AS event_id
+    MATCH (evt:Event {event_id: event_id})
+    WITH pv AS a, evt AS b, {match_score: 0.95} AS props
+"""
+
+# 4b: 사용량 차이 → 같은 제품(삭제 표시 없는 Product 노드)의 PLM BOM 변경 이벤트
+_RULE_04B = """
+    MATCH (uv:Variance {yyyymm: $yyyymm, var_type: 'USAGE_VAR'})
+    MATCH (prod:Product {prod_cd: uv.product_cd})
+    WHERE coalesce(prod.deleted, false) = false
+    MATCH (evt:Event {yyyymm: $yyyymm, source: 'PLM', event_type: 'BOM_CHG'})
+          -[:INVOLVES]->(prod)
+    WITH uv AS a, evt AS b, {match_score: 0.85} AS props
+"""
+
+# 규칙 ID → [(관계 유형, 관계 rule_id, 매칭 패턴)]
+_RULE_PATTERNS: dict[str, list[tuple[str, str, str]]] = {
+    "RULE_01": [
+        ("CAUSED_BY", "RULE_01", _RULE_01A),
+        ("CAUSED_BY", "RULE_01", _RULE_01B),
+        ("CAUSED_BY", "RULE_01", _RULE_01C),
+    ],
+    "RULE_02": [("CAUSED_BY", "RULE_02", _RULE_02)],
+    "RULE_03": [("EVIDENCED_BY", "RULE_03", _RULE_03)],
+    "RULE_04": [
+        ("EVIDENCED_BY", "RULE_04a", _RULE_04A),
+        ("EVIDENCED_BY", "RULE_04b", _RULE_04B),
+    ],
+}
+
+# 5: (공정, 원가요소)별 파급 대상 RATE_VAR 묶음 → pool_id / proc_cd / ce_cd / members
+_RULE_05_POOLS = """
+    MATCH (v:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
+    WHERE v.product_cd IS NOT NULL
+    WITH v.proc_cd AS proc_cd, v.ce_cd AS ce_cd, collect(v) AS members
+    WHERE size(members) > 1
+      AND any(m IN members WHERE abs(m.var_rate) >= $threshold)
+    WITH 'CP_' + $yyyymm + '_' + proc_cd + '_' + ce_cd AS pool_id, proc_cd, ce_cd, members
+"""
+
+
+def create_rule_engine() -> "RuleEngine":
+    """RULE_BACKEND 설정에 따른 규칙 엔진 생성 (cypher | python)"""
+    if settings.RULE_BACKEND == "python":
+        # frame_rules가 RuleEngine을 상속하므로 지연 import (순환 참조 방지)
+        from app.services.frame_rules import FrameRuleEngine
+        return FrameRuleEngine()
+    return RuleEngine()
 
 
 class RuleEngine:
     """인과관계 규칙 엔진"""
 
-    async def execute_all_rules(self, yyyymm: str):
-        """전체 규칙 순차 실행"""
+    # 규칙 의존관계 (규칙 ID → (메서드명, 선행 규칙 ID 목록))
+    # Rule 2는 Rule 1과 같은 RATE_VAR 노드에 CAUSED_BY를 추가하므로 Rule 1 이후 실행,
+    # Rule 3~6은 서로 다른 관계 유형만 생성하므로 차이/이벤트 노드만 있으면 독립 실행
+    RULE_DAG: dict[str, tuple[str, list[str]]] = {
+        "RULE_01": ("rule_01_cost_decomposition", []),
+        "RULE_02": ("rule_02_rate_decomposition", ["RULE_01"]),
+        "RULE_03": ("rule_03_mes_event_matching", []),
+        "RULE_04": ("rule_04_material_event_matching", []),
+        "RULE_05": ("rule_05_spread_relationship", []),
+        "RULE_06": ("rule_06_similar_past_cases", []),
+    }
+
+    async def execute_all_rules(self, yyyymm: str) -> dict[str, dict]:
+        """
+        전체 규칙 실행 (의존관계 DAG — 독립 규칙은 동시 실행)
+        반환: {규칙 ID: {"elapsed_sec", "relationships_created", "properties_set", ...}}
+        """
         print(f"[RuleEngine] 규칙 엔진 시작: {yyyymm}")
+        start = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
 
-        await self.rule_01_cost_decomposition(yyyymm)
-        await self.rule_02_rate_decomposition(yyyymm)
-        await self.rule_03_mes_event_matching(yyyymm)
-        await self.rule_04_material_event_matching(yyyymm)
-        await self.rule_05_spread_relationship(yyyymm)
-        await self.rule_06_similar_past_cases(yyyymm)
+        async def run_rule(rule_id: str) -> dict:
+            method_name, deps = self.RULE_DAG[rule_id]
+            await asyncio.gather(*(tasks[dep] for dep in deps))
+            rule_start = time.perf_counter()
+            counters = await getattr(self, method_name)(yyyymm)
+            return {"elapsed_sec": round(time.perf_counter() - rule_start, 3), **counters}
 
-        print(f"[RuleEngine] 규칙 엔진 완료: {yyyymm}")
+        # 선언 순서대로 태스크 생성 (선행 규칙이 항상 먼저 선언됨)
+        for rule_id in self.RULE_DAG:
+            tasks[rule_id] = asyncio.ensure_future(run_rule(rule_id))
+        results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
 
-    async def rule_01_cost_decomposition(self, yyyymm: str):
+        graph_stats.invalidate()
+        for rule_id, stat in results.items():
+            print(
+                f"  [{rule_id}] {stat['elapsed_sec']:.2f}s, "
+                f"관계 생성 {stat['relationships_created']}, 속성 설정 {stat['properties_set']}"
+            )
+        print(f"[RuleEngine] 규칙 엔진 완료: {yyyymm} ({time.perf_counter() - start:.2f}s)")
+        return results
+
+    async def rule_01_cost_decomposition(self, yyyymm: str) -> dict:
         """
         Rule 1: 제품 원가 차이 → 원가요소별 분해
         같은 제품·공정 내 RATE_VAR ↔ QTY_VAR, PRICE_VAR ↔ USAGE_VAR 쌍을
@@ -38,192 +204,214 @@ class RuleEngine:
 
         또한, TOTAL_VAR 노드가 있을 때는 TOTAL_VAR → 세부 차이로 연결
         """
-        # 1a: TOTAL_VAR → 세부 차이 (TOTAL_VAR이 있는 경우)
-        await run_write_query("""
-            MATCH (total:Variance {yyyymm: $yyyymm, var_type: 'TOTAL_VAR'})
-            WHERE total.product_cd IS NOT NULL
-            MATCH (detail:Variance {yyyymm: $yyyymm, product_cd: total.product_cd})
-            WHERE detail.var_type IN ['RATE_VAR', 'QTY_VAR', 'PRICE_VAR', 'USAGE_VAR']
-              AND abs(detail.var_amt) > 0
-            WITH total, detail,
-                 abs(detail.var_amt) AS abs_amt
-            WITH total, collect({node: detail, amt: abs_amt}) AS details,
-                 sum(abs_amt) AS total_abs
-            UNWIND details AS d
-            WITH total, d.node AS detail,
-                 CASE WHEN total_abs > 0 THEN d.amt / total_abs ELSE 0 END AS contrib
-            MERGE (total)-[:CAUSED_BY {
-                contribution: contrib,
-                rule_id: 'RULE_01',
-                created_at: datetime()
-            }]->(detail)
-        """, {"yyyymm": yyyymm})
-
-        # 1b: RATE_VAR ← QTY_VAR 쌍 연결 (같은 제품·공정·원가요소)
-        await run_write_query("""
-            MATCH (rv:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
-            WHERE rv.product_cd IS NOT NULL
-            MATCH (qv:Variance {
-                yyyymm: $yyyymm,
-                var_type: 'QTY_VAR',
-                product_cd: rv.product_cd,
-                proc_cd: rv.proc_cd,
-                ce_cd: rv.ce_cd
-            })
-            WITH rv, qv,
-                 abs(rv.var_amt) + abs(qv.var_amt) AS total_abs
-            WHERE total_abs > 0
-            MERGE (rv)-[:CAUSED_BY {
-                contribution: abs(rv.var_amt) / total_abs,
-                rule_id: 'RULE_01',
-                created_at: datetime()
-            }]->(qv)
-        """, {"yyyymm": yyyymm})
-
-        # 1c: PRICE_VAR ← USAGE_VAR 쌍 연결 (같은 제품·공정·원가요소)
-        await run_write_query("""
-            MATCH (pv:Variance {yyyymm: $yyyymm, var_type: 'PRICE_VAR'})
-            WHERE pv.product_cd IS NOT NULL
-            MATCH (uv:Variance {
-                yyyymm: $yyyymm,
-                var_type: 'USAGE_VAR',
-                product_cd: pv.product_cd,
-                proc_cd: pv.proc_cd,
-                ce_cd: pv.ce_cd
-            })
-            WITH pv, uv,
-                 abs(pv.var_amt) + abs(uv.var_amt) AS total_abs
-            WHERE total_abs > 0
-            MERGE (pv)-[:CAUSED_BY {
-                contribution: abs(pv.var_amt) / total_abs,
-                rule_id: 'RULE_01',
-                created_at: datetime()
-            }]->(uv)
-        """, {"yyyymm": yyyymm})
+        counters = await self._merge_patterns("RULE_01", {"yyyymm": yyyymm})
         print("  [Rule 1] 원가요소별 분해 연결 완료")
+        return counters
 
-    async def rule_02_rate_decomposition(self, yyyymm: str):
+    async def rule_02_rate_decomposition(self, yyyymm: str) -> dict:
         """
         Rule 2: 배부율 차이 → 총비용/총배부기준량 분해
         RATE_VAR → RATE_COST + RATE_BASE
         """
-        await run_write_query("""
-            MATCH (rate:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
-            WHERE rate.product_cd IS NOT NULL
-
-            MATCH (sub:Variance {
-                yyyymm: $yyyymm,
-                product_cd: rate.product_cd,
-                proc_cd: rate.proc_cd,
-                ce_cd: rate.ce_cd
-            })
-            WHERE sub.var_type IN ['RATE_COST', 'RATE_BASE']
-
-            WITH rate, sub,
-                 CASE WHEN abs(rate.var_amt) > 0
-                      THEN abs(sub.var_amt) / abs(rate.var_amt)
-                      ELSE 0 END AS contrib
-
-            MERGE (rate)-[:CAUSED_BY {
-                contribution: contrib,
-                rule_id: 'RULE_02',
-                created_at: datetime()
-            }]->(sub)
-        """, {"yyyymm": yyyymm})
+        counters = await self._merge_patterns("RULE_02", {"yyyymm": yyyymm})
         print("  [Rule 2] 배부율 분해 연결 완료")
+        return counters
 
-    async def rule_03_mes_event_matching(self, yyyymm: str):
+    async def rule_03_mes_event_matching(self, yyyymm: str) -> dict:
         """
         Rule 3: 배부기준량(ST) 변동 → MES 이벤트 매칭
         RATE_BASE 노드 ← 같은 공정 장비의 가동률 변동 이벤트
 
         경로: Variance -OCCURS_IN-> Process -HAS_SUBPROCESS-> ProcessGroup
               -HAS_EQUIPMENT-> Equipment <-INVOLVES- Event
+        → 공정별 장비 집합은 도달 가능성 인덱스에서 조회하고,
+          MES 이벤트 ID(MES_{기준월}_{장비}_UTIL)를 직접 구성해 키 조회로 매칭
+          (키 조회 후에도 삭제 표시 없는 Equipment로의 INVOLVES 관계가 있는 이벤트만 채택)
         """
-        await run_write_query("""
-            MATCH (rb:Variance {yyyymm: $yyyymm, var_type: 'RATE_BASE'})
-            MATCH (rb)-[:OCCURS_IN]->(proc:Process)
-                  -[:HAS_SUBPROCESS]->(pg:ProcessGroup)
-                  -[:HAS_EQUIPMENT]->(eq:Equipment)
-            MATCH (evt:Event {yyyymm: $yyyymm, source: 'MES'})
-                  -[:INVOLVES]->(eq)
-            WHERE evt.event_type = 'UTIL_CHG'
-
-            MERGE (rb)-[:EVIDENCED_BY {
-                match_score: 0.9,
-                rule_id: 'RULE_03',
-                created_at: datetime()
-            }]->(evt)
-        """, {"yyyymm": yyyymm})
+        counters = await self._merge_patterns("RULE_03", await self._rule_03_params(yyyymm))
         print("  [Rule 3] MES 이벤트 매칭 완료")
+        return counters
 
-    async def rule_04_material_event_matching(self, yyyymm: str):
+    async def rule_04_material_event_matching(self, yyyymm: str) -> dict:
         """
         Rule 4: 재료비 변동 → 구매/PLM 이벤트 매칭
         PRICE_VAR → 구매 이벤트, USAGE_VAR → PLM 이벤트
         """
-        # 4a: 단가 차이 → 구매 이벤트
-        await run_write_query("""
-            MATCH (pv:Variance {yyyymm: $yyyymm, var_type: 'PRICE_VAR'})
-            MATCH (pv)-[:OCCURS_AT]->(prod:Product)-[:USES_MATERIAL]->(mat:Material)
-            MATCH (evt:Event {yyyymm: $yyyymm, source: 'PURCHASE', event_type: 'PRICE_CHG'})
-                  -[:INVOLVES]->(mat)
-
-            MERGE (pv)-[:EVIDENCED_BY {
-                match_score: 0.95,
-                rule_id: 'RULE_04a',
-                created_at: datetime()
-            }]->(evt)
-        """, {"yyyymm": yyyymm})
-
-        # 4b: 사용량 차이 → PLM 이벤트
-        await run_write_query("""
-            MATCH (uv:Variance {yyyymm: $yyyymm, var_type: 'USAGE_VAR'})
-            MATCH (uv)-[:OCCURS_AT]->(prod:Product)
-            MATCH (evt:Event {yyyymm: $yyyymm, source: 'PLM', event_type: 'BOM_CHG'})
-                  -[:INVOLVES]->(prod)
-
-            MERGE (uv)-[:EVIDENCED_BY {
-                match_score: 0.85,
-                rule_id: 'RULE_04b',
-                created_at: datetime()
-            }]->(evt)
-        """, {"yyyymm": yyyymm})
+        counters = await self._merge_patterns("RULE_04", await self._rule_04_params(yyyymm))
         print("  [Rule 4] 재료비 이벤트 매칭 완료")
+        return counters
 
-    async def rule_05_spread_relationship(self, yyyymm: str):
+    async def rule_05_spread_relationship(self, yyyymm: str) -> dict:
         """
-        Rule 5: 파급 관계 생성
-        배부율 차이가 임계값 초과 시, 동일 배부기준 공유 제품 간 SPREADS_TO
+        Rule 5: 파급 관계 생성 (CostPool 허브 경유)
+        배부율 차이가 임계값 초과 시, 동일 배부기준 공유 제품으로 파급
+        (공정, 원가요소, 기준월)별 CostPool 허브를 두어 관계 수를 제품 수에 비례하도록 제한
+          (v1:Variance)-[:SPREADS_TO]->(cp:CostPool)-[:AFFECTS]->(v2:Variance)
+        파급 대상 조회 시 v2.product_cd <> v1.product_cd 조건으로 자기 자신 제외
         """
         threshold = settings.SPREAD_RATE_THRESHOLD
 
-        await run_write_query("""
-            MATCH (v1:Variance {yyyymm: $yyyymm, var_type: 'RATE_VAR'})
-            WHERE abs(v1.var_rate) >= $threshold
-              AND v1.product_cd IS NOT NULL
+        counters = []
+        # 이전 방식(Variance → Variance 직접 연결) 파급 관계 정리
+        counters.append(await run_write_query("""
+            MATCH (:Variance {yyyymm: $yyyymm})-[r:SPREADS_TO]->(:Variance)
+            DELETE r
+        """, {"yyyymm": yyyymm}))
 
-            MATCH (v2:Variance {
-                yyyymm: $yyyymm,
-                var_type: 'RATE_VAR',
-                proc_cd: v1.proc_cd,
-                ce_cd: v1.ce_cd
-            })
-            WHERE v2.product_cd IS NOT NULL
-              AND v2.product_cd <> v1.product_cd
-
-            MERGE (v1)-[:SPREADS_TO {
-                same_alloc_base: v1.proc_cd,
-                rule_id: 'RULE_05',
-                created_at: datetime()
-            }]->(v2)
+        # 현재 기준에서 빠진 CostPool / 구성원 관계 정리 (재실행 시 이전 결과가 남지 않도록)
+        pools = await run_query(_RULE_05_POOLS + """
+            RETURN pool_id,
+                   [m IN members | m.var_id] AS members,
+                   [m IN members WHERE abs(m.var_rate) >= $threshold | m.var_id] AS sources
         """, {"yyyymm": yyyymm, "threshold": threshold})
+        counters += await self._prune_cost_pools(yyyymm, pools)
+
+        counters.append(await run_write_query(_RULE_05_POOLS + """
+            MERGE (cp:CostPool {pool_id: pool_id})
+            ON CREATE SET cp.created_at = datetime()
+            SET cp.yyyymm = $yyyymm, cp.proc_cd = proc_cd, cp.ce_cd = ce_cd,
+                cp.product_cnt = size(members),
+                cp.total_var_amt = reduce(s = 0.0, m IN members | s + m.var_amt)
+
+            WITH cp, members
+            UNWIND members AS m
+            MERGE (cp)-[a:AFFECTS {rule_id: 'RULE_05'}]->(m)
+            ON CREATE SET a.created_at = datetime()
+            FOREACH (_ IN CASE WHEN abs(m.var_rate) >= $threshold THEN [1] ELSE [] END |
+                MERGE (m)-[r:SPREADS_TO {rule_id: 'RULE_05'}]->(cp)
+                ON CREATE SET r.created_at = datetime()
+                SET r.same_alloc_base = cp.proc_cd)
+        """, {"yyyymm": yyyymm, "threshold": threshold}))
         print("  [Rule 5] 파급 관계 생성 완료")
+        return merge_counters(counters)
+
+    @staticmethod
+    async def _prune_cost_pools(yyyymm: str, pools: list[dict]) -> list[dict]:
+        """
+        Rule 5 재실행 전 정리
+        pools: 현재 기준 CostPool 목록 [{pool_id, members: [var_id], sources: [var_id]}]
+        - 목록에 없는 해당 월 CostPool은 관계와 함께 삭제
+        - 남는 CostPool은 구성원에서 빠진 AFFECTS / 파급 원천에서 빠진 SPREADS_TO 삭제
+        반환: 쓰기 카운터 목록
+        """
+        counters = [await run_write_query("""
+            MATCH (cp:CostPool {yyyymm: $yyyymm})
+            WHERE NOT cp.pool_id IN $pool_ids
+            DETACH DELETE cp
+        """, {"yyyymm": yyyymm, "pool_ids": [pool["pool_id"] for pool in pools]})]
+        counters.append(await run_write_query("""
+            UNWIND $rows AS row
+            MATCH (cp:CostPool {pool_id: row.pool_id})
+            OPTIONAL MATCH (cp)-[a:AFFECTS]->(v:Variance)
+            WHERE NOT v.var_id IN row.members
+            DELETE a
+            WITH DISTINCT cp, row
+            OPTIONAL MATCH (v:Variance)-[r:SPREADS_TO]->(cp)
+            WHERE NOT v.var_id IN row.sources
+            DELETE r
+        """, {"rows": pools}))
+        return counters
+
+    # ─────────────────────────────────────
+    # 매칭 패턴 실행 / 평가
+    # ─────────────────────────────────────
+
+    async def _rule_03_params(self, yyyymm: str) -> dict:
+        """Rule 3 파라미터: 공정별 같은 공정군 장비의 UTIL MES 이벤트 ID (도달 가능성 인덱스)"""
+        # graph_builder가 이 모듈을 import하므로 지연 import (순환 참조 방지)
+        from app.services.graph_builder import mes_event_id
+
+        index = await reachability.get()
+        rows = [
+            {
+                "proc_cd": proc_cd,
+                "event_ids": [mes_event_id(yyyymm, equip_cd, "UTIL") for equip_cd in sorted(equipment)],
+            }
+            for proc_cd, equipment in index.proc_equipment.items()
+        ]
+        return {"yyyymm": yyyymm, "rows": rows}
+
+    async def _rule_04_params(self, yyyymm: str) -> dict:
+        """
+        Rule 4a 파라미터: 제품별 BOM 자재의 단가 변동 구매 이벤트 ID
+        해당 월 단가 변동 자재만 조회 → 도달 가능성 인덱스(제품 → 자재)와 교차
+        """
+        index = await reachability.get()
+        material_events: dict[str, list[str]] = {}
+        for record in await run_query("""
+            MATCH (evt:Event {yyyymm: $yyyymm, source: 'PURCHASE', event_type: 'PRICE_CHG'})
+                  -[:INVOLVES]->(mat:Material)
+            RETURN mat.mat_cd AS mat_cd, evt.event_id AS event_id
+        """, {"yyyymm": yyyymm}):
+            material_events.setdefault(record["mat_cd"], []).append(record["event_id"])
+        rows = []
+        for product_cd, materials in index.product_materials.items():
+            event_ids = sorted({
+                event_id
+                for mat_cd in materials & material_events.keys()
+                for event_id in material_events[mat_cd]
+            })
+            if event_ids:
+                rows.append({"product_cd": product_cd, "event_ids": event_ids})
+        return {"yyyymm": yyyymm, "rows": rows}
+
+    async def _merge_patterns(self, rule_id: str, params: dict) -> dict:
+        """규칙의 매칭 패턴별 관계 MERGE (rule_id 기준, 속성은 SET)"""
+        counters = []
+        for rel, edge_rule_id, pattern in _RULE_PATTERNS[rule_id]:
+            counters.append(await run_write_query(f"""{pattern}
+                MERGE (a)-[r:{rel} {{rule_id: '{edge_rule_id}'}}]->(b)
+                ON CREATE SET r.created_at = datetime()
+                SET r += props
+            """, params))
+        return merge_counters(counters)
+
+    async def evaluate(self, yyyymm: str) -> dict[str, list[dict]]:
+        """
+        Rule 1~5 평가 결과 (읽기 쿼리만 실행, 그래프 기록 없음) — 백엔드 적합성 검증용
+        규칙 실행과 같은 매칭 패턴에 MERGE 대신 RETURN을 붙여 관계 목록 조회
+        관계 dict 형식은 FrameRuleEngine.evaluate와 동일: {"rel", "rule_id", "src", "dst", "props"}
+        """
+        params = {
+            "RULE_01": {"yyyymm": yyyymm},
+            "RULE_02": {"yyyymm": yyyymm},
+            "RULE_03": await self._rule_03_params(yyyymm),
+            "RULE_04": await self._rule_04_params(yyyymm),
+        }
+        results: dict[str, list[dict]] = {}
+        for rule_id, patterns in _RULE_PATTERNS.items():
+            results[rule_id] = []
+            for rel, edge_rule_id, pattern in patterns:
+                results[rule_id] += await run_query(f"""{pattern}
+                    RETURN '{rel}' AS rel, '{edge_rule_id}' AS rule_id,
+                           a.var_id AS src, coalesce(b.var_id, b.event_id) AS dst, props
+                """, params[rule_id])
+
+        # Rule 5: CostPool은 만들지 않고 pool_id만 계산
+        results["RULE_05"] = []
+        for record in await run_query(_RULE_05_POOLS + """
+            UNWIND members AS m
+            RETURN pool_id, proc_cd, m.var_id AS var_id,
+                   abs(m.var_rate) >= $threshold AS is_source
+        """, {"yyyymm": yyyymm, "threshold": settings.SPREAD_RATE_THRESHOLD}):
+            results["RULE_05"].append({
+                "rel": "AFFECTS", "rule_id": "RULE_05",
+                "src": record["pool_id"], "dst": record["var_id"], "props": {},
+            })
+            if record["is_source"]:
+                results["RULE_05"].append({
+                    "rel": "SPREADS_TO", "rule_id": "RULE_05",
+                    "src": record["var_id"], "dst": record["pool_id"],
+                    "props": {"same_alloc_base": record["proc_cd"]},
+                })
+        return results
 
-    async def rule_06_similar_past_cases(self, yyyymm: str):
+    async def rule_06_similar_past_cases(self, yyyymm: str) -> dict:
         """
         Rule 6: 유사 과거 사례 매칭
         같은 공정 + 원가요소 + 비슷한 변동 크기의 과거 차이 노드를 SIMILAR_TO로 연결
+        과거 후보는 Variance(proc_cd, ce_cd, var_type, yyyymm) 복합 인덱스로 탐색
+        (레이블 전체 스캔 없이 현재 차이당 같은 키·기간 노드만 조회)
         """
         lookback = settings.SIMILAR_LOOKBACK_MONTHS
         # 과거 범위 시작월 계산
@@ -236,33 +424,40 @@ class RuleEngine:
             start_year -= 1
         min_yyyymm = f"{start_year}{start_month:02d}"
 
-        await run_write_query("""
+        counters = []
+        counters.append(await run_write_query("""
             MATCH (curr:Variance {yyyymm: $yyyymm})
             WHERE curr.var_type IN ['RATE_VAR', 'QTY_VAR', 'PRICE_VAR', 'USAGE_VAR']
               AND curr.product_cd IS NOT NULL
               AND abs(curr.var_rate) >= 0.03
 
-            MATCH (past:Variance)
-            WHERE past.proc_cd = curr.proc_cd
-              AND past.ce_cd = curr.ce_cd
-              AND past.var_type = curr.var_type
-              AND past.yyyymm < $yyyymm
-              AND past.yyyymm >= $min_yyyymm
-              AND abs(past.var_rate - curr.var_rate) / abs(curr.var_rate) < 0.5
+            // (공정, 원가요소, 차이유형) 동등 + 기준월 범위 → 복합 인덱스 seek
+            CALL {
+                WITH curr
+                MATCH (past:Variance)
+                USING INDEX past:Variance(proc_cd, ce_cd, var_type, yyyymm)
+                WHERE past.proc_cd = curr.proc_cd
+                  AND past.ce_cd = curr.ce_cd
+                  AND past.var_type = curr.var_type
+                  AND past.yyyymm >= $min_yyyymm
+                  AND past.yyyymm < $yyyymm
+                RETURN past
+            }
+            WITH curr, past
+            WHERE abs(past.var_rate - curr.var_rate) / abs(curr.var_rate) < 0.5
               AND sign(past.var_amt) = sign(curr.var_amt)
 
             WITH curr, past,
                  1.0 - abs(past.var_rate - curr.var_rate) / abs(curr.var_rate) AS similarity
 
-            MERGE (curr)-[:SIMILAR_TO {
-                similarity: similarity,
-                pattern: CASE
+            MERGE (curr)-[r:SIMILAR_TO {rule_id: 'RULE_06'}]->(past)
+            ON CREATE SET r.created_at = datetime()
+            SET r.similarity = similarity,
+                r.pattern = CASE
                     WHEN curr.var_type = 'RATE_VAR' AND curr.var_amt > 0 THEN 'RATE_INCREASE'
                     WHEN curr.var_type = 'RATE_VAR' AND curr.var_amt < 0 THEN 'RATE_DECREASE'
                     ELSE curr.var_type
-                END,
-                rule_id: 'RULE_06',
-                created_at: datetime()
-            }]->(past)
-        """, {"yyyymm": yyyymm, "min_yyyymm": min_yyyymm})
+                END
+        """, {"yyyymm": yyyymm, "min_yyyymm": min_yyyymm}))
         print("  [Rule 6] 유사 과거 사례 매칭 완료")
+        return merge_counters(counters)
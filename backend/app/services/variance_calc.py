@@ -13,13 +13,252 @@
   후공정 재료비:
     단가 차이 = Σ (P₁ - P₀) × Q₁
     사용량 차이 = Σ P₀ × (Q₁ - Q₀)
+
+증분 재계산:
+  입력 스냅샷 행 해시(cal_source_hash)와 비교해 변경된 키만 재계산
+  - 배부결과 변경 → 해당 (제품, 공정, 원가요소)
+  - 배부율 변경 → 해당 (공정, 원가요소)를 공유하는 모든 제품
+  - BOM 변경 → 해당 제품의 재료비 차이
 """
 
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
 import pandas as pd
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 
 from app.config import settings
+from app.services.master_cache import master_cache, MasterData
+from app.services.change_tracker import SnapshotChangeTracker
+
+
+# 배부 분해 차이유형 (차이유형, var_id 접미사)
+FE_ALLOC_VAR_TYPES = [
+    ("RATE_VAR", "RV"),   # 배부율 차이
+    ("QTY_VAR", "QV"),    # 배부량 차이
+    ("RATE_COST", "RC"),  # 총비용 변동 효과
+    ("RATE_BASE", "RB"),  # 총배부기준 변동 효과
+]
+BE_CONV_VAR_TYPES = FE_ALLOC_VAR_TYPES[:2]
+
+_ALLOC_KEYS = ["product_cd", "proc_cd", "ce_cd"]
+_RATE_KEYS = ["proc_cd", "ce_cd"]
+_BOM_KEYS = ["product_cd", "mat_cd"]
+
+# cal_variance 저장 컬럼 순서
+VARIANCE_COLUMNS = [
+    "var_id", "yyyymm", "product_cd", "product_grp", "proc_cd", "ce_cd",
+    "var_type", "var_amt", "var_rate", "prev_amt", "curr_amt",
+]
+
+_UPSERT_VARIANCE = text("""
+    INSERT INTO cal_variance
+    (var_id, yyyymm, product_cd, product_grp, proc_cd, ce_cd,
+     var_type, var_amt, var_rate, prev_amt, curr_amt)
+    VALUES (:var_id, :yyyymm, :product_cd, :product_grp, :proc_cd,
+            :ce_cd, :var_type, :var_amt, :var_rate, :prev_amt, :curr_amt)
+    ON CONFLICT (var_id) DO UPDATE SET
+        var_amt = EXCLUDED.var_amt,
+        var_rate = EXCLUDED.var_rate,
+        prev_amt = EXCLUDED.prev_amt,
+        curr_amt = EXCLUDED.curr_amt
+""")
+
+
+def decompose_allocation(
+    curr_alloc: pd.DataFrame, prev_alloc: pd.DataFrame,
+    curr_rates: pd.DataFrame, prev_rates: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    배부 분해 (벡터화)
+    당월/전월 배부결과를 (제품, 공정, 원가요소)로, 배부율을 (공정, 원가요소)로
+    한 번씩 병합한 뒤 컬럼 연산으로 분해한다.
+
+    반환 컬럼: product_cd, proc_cd, ce_cd, prev_amt, curr_amt,
+              RATE_VAR, QTY_VAR, RATE_COST, RATE_BASE
+    행 순서·인덱스는 당월 배부결과를 따르며, 전월 배부결과 또는 당월/전월 배부율이
+    없는 키는 제외된다. (키 중복 시 첫 행 사용)
+    """
+    alloc_cols = _ALLOC_KEYS + ["alloc_qty", "alloc_amt"]
+    rate_cols = _RATE_KEYS + ["alloc_rate", "total_cost", "total_base"]
+
+    curr = curr_alloc[alloc_cols].assign(_row=np.arange(len(curr_alloc)))
+    merged = (
+        curr
+        .merge(prev_alloc[alloc_cols].drop_duplicates(_ALLOC_KEYS),
+               on=_ALLOC_KEYS, how="inner", suffixes=("_1", "_0"))
+        .merge(curr_rates[rate_cols].drop_duplicates(_RATE_KEYS),
+               on=_RATE_KEYS, how="inner")
+        .merge(prev_rates[rate_cols].drop_duplicates(_RATE_KEYS),
+               on=_RATE_KEYS, how="inner", suffixes=("_1", "_0"))
+        .sort_values("_row", kind="stable")
+    )
+
+    Q1 = merged["alloc_qty_1"].to_numpy(dtype=float)  # 당월 배부량
+    Q0 = merged["alloc_qty_0"].to_numpy(dtype=float)  # 전월 배부량
+    R1 = merged["alloc_rate_1"].to_numpy(dtype=float)
+    R0 = merged["alloc_rate_0"].to_numpy(dtype=float)
+    C1 = merged["total_cost_1"].to_numpy(dtype=float)
+    C0 = merged["total_cost_0"].to_numpy(dtype=float)
+    B0 = merged["total_base_0"].to_numpy(dtype=float)
+
+    # 배부율 차이: (R₁ - R₀) × Q₁ / 10,000 → 억원
+    rate_var = (R1 - R0) * Q1 / 10000
+    # 배부량 차이: R₀ × (Q₁ - Q₀) / 10,000 → 억원
+    qty_var = R0 * (Q1 - Q0) / 10000
+    # 총비용 변동 효과: (C₁ - C₀) × Q₁ / B₀ (B₀ = 0이면 0)
+    rate_cost = np.divide(
+        (C1 - C0) * Q1, B0, out=np.zeros(len(merged)), where=(B0 != 0)
+    )
+    # 총배부기준 변동 효과: 나머지
+    rate_base = rate_var - rate_cost
+
+    return pd.DataFrame({
+        "product_cd": merged["product_cd"].to_numpy(),
+        "proc_cd": merged["proc_cd"].to_numpy(),
+        "ce_cd": merged["ce_cd"].to_numpy(),
+        "prev_amt": merged["alloc_amt_0"].to_numpy(dtype=float),
+        "curr_amt": merged["alloc_amt_1"].to_numpy(dtype=float),
+        "RATE_VAR": rate_var,
+        "QTY_VAR": qty_var,
+        "RATE_COST": rate_cost,
+        "RATE_BASE": rate_base,
+    }, index=curr_alloc.index[merged["_row"].to_numpy()])
+
+
+def decompose_material(
+    curr_bom: pd.DataFrame, prev_bom: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    후공정 재료비 분해 (집합 연산)
+    당월/전월 BOM을 (제품, 자재)로 병합해 자재별 단가/사용량 차이를 구하고
+    제품별로 합산한다.
+
+    반환:
+      totals: product_cd, prev_amt, curr_amt, PRICE_VAR, USAGE_VAR
+              (당월 BOM 등장 순서, 전월 BOM이 있는 제품만,
+               인덱스는 당월 BOM에서 제품이 처음 등장한 행)
+      detail: product_cd, mat_cd, 단가/사용량/재료비(_0: 전월, _1: 당월),
+              PRICE_VAR, USAGE_VAR (당월 BOM 행 순서, 전월에 없는 자재 제외)
+    """
+    bom_cols = _BOM_KEYS + ["std_qty", "unit_price", "mat_amt"]
+
+    curr = curr_bom[bom_cols].assign(_row=np.arange(len(curr_bom)))
+    detail = (
+        curr
+        .merge(prev_bom[bom_cols].drop_duplicates(_BOM_KEYS),
+               on=_BOM_KEYS, how="inner", suffixes=("_1", "_0"))
+        .sort_values("_row", kind="stable")
+        .drop(columns="_row")
+        .reset_index(drop=True)
+    )
+
+    P1 = detail["unit_price_1"].to_numpy(dtype=float)
+    P0 = detail["unit_price_0"].to_numpy(dtype=float)
+    Q1 = detail["std_qty_1"].to_numpy(dtype=float)
+    Q0 = detail["std_qty_0"].to_numpy(dtype=float)
+
+    # 단가 차이: (P₁ - P₀) × Q₁ / 10,000 → 억원
+    detail["PRICE_VAR"] = (P1 - P0) * Q1 / 10000
+    # 사용량 차이: P₀ × (Q₁ - Q₀) / 10,000 → 억원
+    detail["USAGE_VAR"] = P0 * (Q1 - Q0) / 10000
+
+    # 전월 BOM이 있는 제품만 (당월 등장 순서 유지)
+    first_rows = curr_bom["product_cd"].drop_duplicates()
+    first_rows = first_rows[first_rows.isin(prev_bom["product_cd"])]
+    products = pd.Index(first_rows.to_numpy())
+
+    sums = (
+        detail.groupby("product_cd", sort=False)[["PRICE_VAR", "USAGE_VAR"]]
+        .sum()
+        .reindex(products, fill_value=0.0)
+    )
+    totals = pd.DataFrame({
+        "product_cd": products.to_numpy(),
+        "prev_amt": prev_bom.groupby("product_cd")["mat_amt"].sum()
+                    .reindex(products).to_numpy(dtype=float),
+        "curr_amt": curr_bom.groupby("product_cd")["mat_amt"].sum()
+                    .reindex(products).to_numpy(dtype=float),
+        "PRICE_VAR": sums["PRICE_VAR"].to_numpy(dtype=float),
+        "USAGE_VAR": sums["USAGE_VAR"].to_numpy(dtype=float),
+    }, index=first_rows.index)
+
+    return totals, detail
+
+
+def _split_by_month(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """yyyymm 기준 분할 (월 내 행 순서 유지)"""
+    if df.empty:
+        return {}
+    return {yyyymm: part for yyyymm, part in df.groupby("yyyymm", sort=False)}
+
+
+# ─────────────────────────────────────
+# 프로세스 풀 병렬 계산 (파티션 단위)
+#   DataFrame 대신 컬럼별 NumPy 배열 + 원본 인덱스를 주고받는다.
+# ─────────────────────────────────────
+
+def _to_arrays(df: pd.DataFrame) -> dict:
+    """DataFrame → {"index": ndarray, "columns": {컬럼: ndarray}}"""
+    return {
+        "index": df.index.to_numpy(),
+        "columns": {col: df[col].to_numpy() for col in df.columns},
+    }
+
+
+def _from_arrays(arrays: dict) -> pd.DataFrame:
+    """_to_arrays 역변환"""
+    return pd.DataFrame(arrays["columns"], index=arrays["index"])
+
+
+def _decompose_partition(kind: str, frames: dict[str, dict]) -> dict:
+    """워커 프로세스 진입점 — 파티션 하나의 배부/재료비 분해"""
+    dfs = {name: _from_arrays(arrays) for name, arrays in frames.items()}
+    if kind == "alloc":
+        out = decompose_allocation(
+            dfs["curr"], dfs["prev"], dfs["curr_rates"], dfs["prev_rates"]
+        )
+    else:
+        out, _ = decompose_material(dfs["curr"], dfs["prev"])
+    return _to_arrays(out)
+
+
+def _merge_partitions(parts: list[dict]) -> pd.DataFrame:
+    """파티션 결과 병합 — 원본 인덱스 순 정렬로 직렬 실행과 동일한 순서 보장"""
+    frames = [_from_arrays(part) for part in parts]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames).sort_index(kind="stable")
+
+
+# 차이 계산 프로세스 풀 (VARIANCE_WORKERS > 1일 때 최초 사용 시 생성, 앱 종료 시 shutdown_pool)
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """프로세스 풀 조회 (spawn 워커 기동 비용은 프로세스 수명 동안 1회)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.VARIANCE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        print(f"[VarianceCalc] 프로세스 풀 생성 (워커 {settings.VARIANCE_WORKERS})")
+    return _pool
+
+
+def shutdown_pool():
+    """프로세스 풀 종료 (앱 종료 / 스크립트 종료 시 호출, 생성 전이면 무시)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        print("[VarianceCalc] 프로세스 풀 종료")
 
 
 class VarianceCalculator:
@@ -27,348 +266,564 @@ class VarianceCalculator:
 
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.master: MasterData | None = None
 
     async def calculate_all(self, yyyymm: str) -> list[dict]:
         """지정 월의 전체 차이 계산 실행"""
         prev_month = self._get_prev_month(yyyymm)
+        await self._load_master()
+
+        # 당월/전월 스냅샷 일괄 조회
+        snapshots = await self._load_snapshots(prev_month, yyyymm)
+        (results,) = await self._calc_months(snapshots, [yyyymm])
+
+        # 입력 해시 기록 (증분 재계산 기준) + 결과 저장
+        await SnapshotChangeTracker(self.session).record({yyyymm: [prev_month, yyyymm]})
+        await self._save_variances(results)
+
+        return results
+
+    async def calculate_incremental(self, yyyymm: str) -> dict:
+        """
+        증분 재계산
+        마지막 계산 이후 변경된 입력 행이 영향을 주는 차이 키만 재계산하고,
+        해당 cal_variance 행만 upsert / 삭제한다.
+        반환: {"yyyymm", "changed", "upserted": [var_id], "removed": [var_id]}
+        """
+        prev_month = self._get_prev_month(yyyymm)
+        src_months = [prev_month, yyyymm]
+        tracker = SnapshotChangeTracker(self.session)
+
+        changes = await tracker.detect_changes(yyyymm, src_months)
+        changed = sum(len(rows) for rows in changes.values())
+        if changed == 0:
+            print(f"[차이계산] {yyyymm}: 변경 없음 — 재계산 생략")
+            return {"yyyymm": yyyymm, "changed": 0, "upserted": [], "removed": []}
+
+        await self._load_master()
+        snapshots = await self._load_snapshots(prev_month, yyyymm)
+
+        # 영향 키 산출 → 스냅샷을 해당 키로 축소해 재계산
+        alloc_keys, bom_products = self._affected_keys(snapshots, changes, src_months)
+        scoped = self._scope_snapshots(snapshots, alloc_keys, bom_products)
+        (results,) = await self._calc_months(scoped, [yyyymm])
+
+        # 영향 키 중 더 이상 계산되지 않는 기존 행 삭제
+        existing = await self._existing_var_ids(yyyymm, alloc_keys, bom_products)
+        upserted = sorted({v["var_id"] for v in results})
+        removed = sorted(existing - set(upserted))
+        if removed:
+            await self.session.execute(
+                text("DELETE FROM cal_variance WHERE var_id IN :ids")
+                .bindparams(bindparam("ids", expanding=True)),
+                {"ids": removed},
+            )
+
+        await tracker.record({yyyymm: src_months})
+        await self._save_variances(results)
+        await self.session.commit()
+
+        print(
+            f"[차이계산] {yyyymm} 증분: 변경 입력 {changed}건 → "
+            f"배부 키 {len(alloc_keys)}, 재료비 제품 {len(bom_products)}, "
+            f"upsert {len(upserted)}건, 삭제 {len(removed)}건"
+        )
+        return {"yyyymm": yyyymm, "changed": changed, "upserted": upserted, "removed": removed}
+
+    @staticmethod
+    def _affected_keys(
+        snapshots: dict, changes: dict, src_months: list[str],
+    ) -> tuple[set[tuple], set[str]]:
+        """
+        변경 입력 → 영향받는 차이 키
+        반환: ((제품, 공정, 원가요소) 집합, 재료비 재계산 대상 제품 집합)
+        """
+        alloc_keys = {key for _, key in changes["snp_alloc_result"]}
+
+        # 배부율 변경은 같은 (공정, 원가요소)로 배부받는 모든 제품에 영향
+        rate_keys = {key for _, key in changes["snp_alloc_rate"]}
+        if rate_keys:
+            for kind in ("fe_alloc", "be_alloc"):
+                for ym in src_months:
+                    df = snapshots[kind].get(ym)
+                    if df is None:
+                        continue
+                    alloc_keys.update(
+                        (prod, proc, ce)
+                        for prod, proc, ce in zip(df["product_cd"], df["proc_cd"], df["ce_cd"])
+                        if (proc, ce) in rate_keys
+                    )
+
+        bom_products = {key[0] for _, key in changes["snp_bom"]}
+        return alloc_keys, bom_products
+
+    @staticmethod
+    def _scope_snapshots(
+        snapshots: dict, alloc_keys: set[tuple], bom_products: set[str],
+    ) -> dict:
+        """스냅샷을 영향 키로 축소 (배부율은 조인 대상이므로 그대로 유지)"""
+        def scope_alloc(frames: dict) -> dict:
+            return {
+                ym: df[pd.MultiIndex.from_frame(df[_ALLOC_KEYS]).isin(alloc_keys)]
+                for ym, df in frames.items()
+            }
+
+        return {
+            "fe_rates": snapshots["fe_rates"],
+            "be_rates": snapshots["be_rates"],
+            "fe_alloc": scope_alloc(snapshots["fe_alloc"]),
+            "be_alloc": scope_alloc(snapshots["be_alloc"]),
+            "bom": {
+                ym: df[df["product_cd"].isin(bom_products)]
+                for ym, df in snapshots["bom"].items()
+            },
+        }
+
+    async def _existing_var_ids(
+        self, yyyymm: str, alloc_keys: set[tuple], bom_products: set[str],
+    ) -> set[str]:
+        """영향 키에 해당하는 기존 cal_variance var_id"""
+        result = await self.session.execute(text("""
+            SELECT var_id, product_cd, proc_cd, ce_cd, var_type
+            FROM cal_variance
+            WHERE yyyymm = :ym
+        """), {"ym": yyyymm})
+
+        existing = set()
+        for var_id, prod, proc, ce, var_type in result.fetchall():
+            if var_type in ("PRICE_VAR", "USAGE_VAR"):
+                if prod in bom_products:
+                    existing.add(var_id)
+            elif (prod, proc, ce) in alloc_keys:
+                existing.add(var_id)
+        return existing
+
+    async def calculate_range(self, start: str, end: str) -> list[dict]:
+        """
+        기간 일괄 재계산 (백필)
+        start 전월 ~ end 스냅샷을 한 번에 조회한 뒤 연속 월 쌍을 모두 계산하고,
+        결과를 한 트랜잭션으로 일괄 저장한다.
+        """
+        months = self._iter_months(start, end)
+        if not months:
+            return []
+        await self._load_master()
+
+        snapshots = await self._load_snapshots(self._get_prev_month(start), end)
 
+        results = []
+        for yyyymm, month_results in zip(months, await self._calc_months(snapshots, months)):
+            print(f"[차이계산] {yyyymm}: {len(month_results)}건")
+            results.extend(month_results)
+
+        # 입력 해시는 기간 전체를 한 번에 기록 (스냅샷 테이블당 1회 스캔)
+        await SnapshotChangeTracker(self.session).record({
+            yyyymm: [self._get_prev_month(yyyymm), yyyymm] for yyyymm in months
+        })
+        await self._save_variances(results)
+        return results
+
+    async def _calc_months(self, snapshots: dict, months: list[str]) -> list[list[dict]]:
+        """
+        월별 차이 계산 (월 목록 순서대로 결과 반환)
+        VARIANCE_WORKERS > 1이면 파티션을 프로세스 풀로 분산 계산한다 (풀은 모듈 단위로 재사용).
+        """
+        if settings.VARIANCE_WORKERS <= 1:
+            return [
+                self._calc_month(snapshots, yyyymm, self._get_prev_month(yyyymm))
+                for yyyymm in months
+            ]
+
+        loop = asyncio.get_running_loop()
+        pool = _get_pool()
+        try:
+            return list(await asyncio.gather(*(
+                self._calc_month_parallel(
+                    loop, pool, snapshots, yyyymm, self._get_prev_month(yyyymm)
+                )
+                for yyyymm in months
+            )))
+        except BrokenProcessPool:
+            # 워커 비정상 종료 시 풀 폐기 — 다음 호출에서 새로 생성
+            shutdown_pool()
+            raise
+
+    async def _calc_month_parallel(
+        self, loop: asyncio.AbstractEventLoop, pool: ProcessPoolExecutor,
+        snapshots: dict, yyyymm: str, prev_month: str,
+    ) -> list[dict]:
+        """한 달 차이 계산 — 파티션별 분해는 워커, 결과 조립은 메인 프로세스"""
+
+        async def run_parts(kind: str, tasks: list[dict]) -> pd.DataFrame:
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(pool, _decompose_partition, kind, frames)
+                for frames in tasks
+            ))
+            return _merge_partitions(list(parts))
+
+        fe, bom, be = await asyncio.gather(
+            run_parts("alloc", self._partition_alloc(snapshots, "fe", yyyymm, prev_month)),
+            run_parts("bom", self._partition_bom(snapshots, yyyymm, prev_month)),
+            run_parts("alloc", self._partition_alloc(snapshots, "be", yyyymm, prev_month)),
+        )
+
+        # 직렬 경로와 동일한 순서: 전공정 → 후공정 재료비 → 후공정 가공비
+        results = []
+        results.extend(self._build_alloc_variances(fe, yyyymm, FE_ALLOC_VAR_TYPES))
+        results.extend(self._build_material_variances(bom, yyyymm))
+        results.extend(self._build_alloc_variances(be, yyyymm, BE_CONV_VAR_TYPES))
+        return results
+
+    def _partition_alloc(
+        self, snapshots: dict, proc_type: str, yyyymm: str, prev_month: str
+    ) -> list[dict]:
+        """배부 분해 파티션 (배부율은 파티션마다 전체 전달)"""
+        rates, alloc = snapshots[f"{proc_type}_rates"], snapshots[f"{proc_type}_alloc"]
+        curr_rates, prev_rates = rates.get(yyyymm), rates.get(prev_month)
+        curr_alloc, prev_alloc = alloc.get(yyyymm), alloc.get(prev_month)
+        if any(df is None for df in (curr_rates, prev_rates, curr_alloc, prev_alloc)):
+            return []
+
+        rate_arrays = {
+            "curr_rates": _to_arrays(curr_rates),
+            "prev_rates": _to_arrays(prev_rates),
+        }
+        return [
+            {"curr": _to_arrays(curr), "prev": _to_arrays(prev), **rate_arrays}
+            for curr, prev in self._partition_pairs(curr_alloc, prev_alloc)
+        ]
+
+    def _partition_bom(self, snapshots: dict, yyyymm: str, prev_month: str) -> list[dict]:
+        """재료비 분해 파티션"""
+        curr_bom = snapshots["bom"].get(yyyymm)
+        prev_bom = snapshots["bom"].get(prev_month)
+        if curr_bom is None or prev_bom is None:
+            return []
+        return [
+            {"curr": _to_arrays(curr), "prev": _to_arrays(prev)}
+            for curr, prev in self._partition_pairs(curr_bom, prev_bom)
+        ]
+
+    def _partition_pairs(
+        self, curr: pd.DataFrame, prev: pd.DataFrame
+    ) -> list[tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        당월/전월 프레임을 같은 파티션 키로 분할
+        - product_grp: 제품군 단위 (제품 단위 집계가 파티션을 넘지 않음)
+        - proc_type: 분할하지 않음 (FE / BE / 재료비 3개 작업으로만 분산)
+        """
+        if settings.VARIANCE_PARTITION_BY == "proc_type":
+            return [(curr, prev)]
+        if settings.VARIANCE_PARTITION_BY != "product_grp":
+            raise ValueError(f"지원하지 않는 VARIANCE_PARTITION_BY: {settings.VARIANCE_PARTITION_BY}")
+
+        group_map = {
+            prod: row["product_grp"] for prod, row in self.master.products.items()
+        }
+        curr_keys = curr["product_cd"].map(group_map).fillna("")
+        prev_keys = prev["product_cd"].map(group_map).fillna("")
+        return [
+            (curr[curr_keys == grp], prev[prev_keys == grp])
+            for grp in curr_keys.unique()
+        ]
+
+    def _calc_month(self, snapshots: dict, yyyymm: str, prev_month: str) -> list[dict]:
+        """적재된 스냅샷에서 한 달(당월 vs 전월) 차이 계산"""
         results = []
 
         # 1) 전공정 배부 분해
-        fe_variances = await self._calc_fe_allocation_variance(yyyymm, prev_month)
-        results.extend(fe_variances)
+        results.extend(self._calc_fe_allocation_variance(snapshots, yyyymm, prev_month))
 
         # 2) 후공정 재료비 분해
-        be_mat_variances = await self._calc_be_material_variance(yyyymm, prev_month)
-        results.extend(be_mat_variances)
+        results.extend(self._calc_be_material_variance(snapshots, yyyymm, prev_month))
 
         # 3) 후공정 가공비 분해 (전공정과 동일 로직)
-        be_conv_variances = await self._calc_be_conversion_variance(yyyymm, prev_month)
-        results.extend(be_conv_variances)
-
-        # 4) 결과 저장
-        await self._save_variances(results)
+        results.extend(self._calc_be_conversion_variance(snapshots, yyyymm, prev_month))
 
         return results
 
-    async def _calc_fe_allocation_variance(
-        self, yyyymm: str, prev_month: str
-    ) -> list[dict]:
+    async def _load_snapshots(self, first_month: str, last_month: str) -> dict:
         """
-        전공정 배부 분해
-        배부율 차이: (R₁ - R₀) × Q₁  ← 비용 자체가 변했다
-        배부량 차이: R₀ × (Q₁ - Q₀)  ← 제품 Mix가 변했다
+        기간 스냅샷 일괄 조회 (테이블당 1회)
+        반환: {"fe_rates" | "fe_alloc" | "be_rates" | "be_alloc" | "bom": {yyyymm: DataFrame}}
         """
-        # 당월/전월 배부율 조회
-        rate_query = text("""
+        params = {"first": first_month, "last": last_month}
+
+        # 배부율 (배부방식 공정만)
+        rate_result = await self.session.execute(text("""
             SELECT r.yyyymm, r.proc_cd, r.ce_cd, r.total_cost, r.total_base,
-                   r.alloc_rate
+                   r.alloc_rate, p.proc_type
             FROM snp_alloc_rate r
             JOIN mst_process p ON r.proc_cd = p.proc_cd
-            WHERE r.yyyymm IN (:curr, :prev)
-              AND p.proc_type = 'FE'
+            WHERE r.yyyymm BETWEEN :first AND :last
               AND p.alloc_type = 'ALLOC'
-        """)
-        rate_result = await self.session.execute(
-            rate_query, {"curr": yyyymm, "prev": prev_month}
-        )
+        """), params)
         rates_df = pd.DataFrame(rate_result.fetchall(), columns=rate_result.keys())
 
-        # 당월/전월 배부결과 조회
-        alloc_query = text("""
+        # 배부결과 (전공정 전체 + 후공정 배부방식)
+        alloc_result = await self.session.execute(text("""
             SELECT a.yyyymm, a.product_cd, a.proc_cd, a.ce_cd,
-                   a.alloc_qty, a.alloc_amt
+                   a.alloc_qty, a.alloc_amt, p.proc_type
             FROM snp_alloc_result a
             JOIN mst_process p ON a.proc_cd = p.proc_cd
-            WHERE a.yyyymm IN (:curr, :prev)
-              AND p.proc_type = 'FE'
-        """)
-        alloc_result = await self.session.execute(
-            alloc_query, {"curr": yyyymm, "prev": prev_month}
-        )
+            WHERE a.yyyymm BETWEEN :first AND :last
+              AND (p.proc_type = 'FE'
+                   OR (p.proc_type = 'BE' AND p.alloc_type = 'ALLOC'))
+        """), params)
         alloc_df = pd.DataFrame(alloc_result.fetchall(), columns=alloc_result.keys())
 
-        if rates_df.empty or alloc_df.empty:
-            return []
+        bom_df = await self._load_bom(first_month, last_month)
 
-        variances = []
+        def by_proc_type(df: pd.DataFrame, proc_type: str) -> dict:
+            if df.empty:
+                return {}
+            return _split_by_month(df[df["proc_type"] == proc_type])
 
-        # 당월/전월 분리
-        curr_rates = rates_df[rates_df["yyyymm"] == yyyymm]
-        prev_rates = rates_df[rates_df["yyyymm"] == prev_month]
-        curr_alloc = alloc_df[alloc_df["yyyymm"] == yyyymm]
-        prev_alloc = alloc_df[alloc_df["yyyymm"] == prev_month]
-
-        # 제품별 차이 계산
-        for _, curr_row in curr_alloc.iterrows():
-            prod = curr_row["product_cd"]
-            proc = curr_row["proc_cd"]
-            ce = curr_row["ce_cd"]
-
-            # 전월 데이터 매칭
-            prev_match = prev_alloc[
-                (prev_alloc["product_cd"] == prod)
-                & (prev_alloc["proc_cd"] == proc)
-                & (prev_alloc["ce_cd"] == ce)
-            ]
-            if prev_match.empty:
-                continue
-
-            Q1 = curr_row["alloc_qty"]  # 당월 배부량
-            Q0 = prev_match.iloc[0]["alloc_qty"]  # 전월 배부량
-
-            # 배부율 가져오기
-            curr_rate_match = curr_rates[
-                (curr_rates["proc_cd"] == proc) & (curr_rates["ce_cd"] == ce)
-            ]
-            prev_rate_match = prev_rates[
-                (prev_rates["proc_cd"] == proc) & (prev_rates["ce_cd"] == ce)
-            ]
-            if curr_rate_match.empty or prev_rate_match.empty:
-                continue
-
-            R1 = curr_rate_match.iloc[0]["alloc_rate"]
-            R0 = prev_rate_match.iloc[0]["alloc_rate"]
-            C1 = curr_rate_match.iloc[0]["total_cost"]
-            C0 = prev_rate_match.iloc[0]["total_cost"]
-            B1 = curr_rate_match.iloc[0]["total_base"]
-            B0 = prev_rate_match.iloc[0]["total_base"]
-
-            prev_amt = prev_match.iloc[0]["alloc_amt"]
-            curr_amt = curr_row["alloc_amt"]
-
-            # 제품군 조회
-            grp = await self._get_product_group(prod)
-
-            # 배부율 차이: (R₁ - R₀) × Q₁ / 10,000 → 억원
-            rate_var = (R1 - R0) * Q1 / 10000
-            # 배부량 차이: R₀ × (Q₁ - Q₀) / 10,000 → 억원
-            qty_var = R0 * (Q1 - Q0) / 10000
+        return {
+            "fe_rates": by_proc_type(rates_df, "FE"),
+            "fe_alloc": by_proc_type(alloc_df, "FE"),
+            "be_rates": by_proc_type(rates_df, "BE"),
+            "be_alloc": by_proc_type(alloc_df, "BE"),
+            "bom": _split_by_month(bom_df),
+        }
 
-            # 배부율 분해
-            # 총비용 변동 효과: (C₁ - C₀) × Q₁ / B₀ → 억원
-            rate_cost_effect = ((C1 - C0) * Q1 / B0) if B0 != 0 else 0
-            # 총배부기준 변동 효과: 나머지
-            rate_base_effect = rate_var - rate_cost_effect
+    def _calc_fe_allocation_variance(
+        self, snapshots: dict, yyyymm: str, prev_month: str
+    ) -> list[dict]:
+        """
+        전공정 배부 분해
+        배부율 차이: (R₁ - R₀) × Q₁  ← 비용 자체가 변했다
+        배부량 차이: R₀ × (Q₁ - Q₀)  ← 제품 Mix가 변했다
+        """
+        rates, alloc = snapshots["fe_rates"], snapshots["fe_alloc"]
 
-            var_id_base = f"V{yyyymm}_{prod}_{proc}_{ce}"
+        # 당월/전월 분리
+        curr_rates, prev_rates = rates.get(yyyymm), rates.get(prev_month)
+        curr_alloc, prev_alloc = alloc.get(yyyymm), alloc.get(prev_month)
+        if any(df is None for df in (curr_rates, prev_rates, curr_alloc, prev_alloc)):
+            return []
 
-            # 배부율 차이
-            variances.append(self._make_variance(
-                f"{var_id_base}_RV", yyyymm, prod, grp, proc, ce,
-                "RATE_VAR", rate_var, prev_amt, curr_amt
-            ))
-            # 배부량 차이
-            variances.append(self._make_variance(
-                f"{var_id_base}_QV", yyyymm, prod, grp, proc, ce,
-                "QTY_VAR", qty_var, prev_amt, curr_amt
-            ))
-            # 총비용 변동 효과
-            variances.append(self._make_variance(
-                f"{var_id_base}_RC", yyyymm, prod, grp, proc, ce,
-                "RATE_COST", rate_cost_effect, prev_amt, curr_amt
-            ))
-            # 총배부기준 변동 효과
-            variances.append(self._make_variance(
-                f"{var_id_base}_RB", yyyymm, prod, grp, proc, ce,
-                "RATE_BASE", rate_base_effect, prev_amt, curr_amt
-            ))
+        # (제품, 공정, 원가요소) 키 병합 → 컬럼 연산으로 일괄 분해
+        decomposed = decompose_allocation(curr_alloc, prev_alloc, curr_rates, prev_rates)
 
-        return variances
+        return self._build_alloc_variances(decomposed, yyyymm, FE_ALLOC_VAR_TYPES)
 
-    async def _calc_be_material_variance(
-        self, yyyymm: str, prev_month: str
+    def _calc_be_material_variance(
+        self, snapshots: dict, yyyymm: str, prev_month: str
     ) -> list[dict]:
         """
         후공정 재료비 분해
         단가 차이: Σ (P₁ - P₀) × Q₁  ← 자재 가격이 변했다
         사용량 차이: Σ P₀ × (Q₁ - Q₀) ← BOM이나 수율이 변했다
         """
-        bom_query = text("""
-            SELECT b.yyyymm, b.product_cd, b.mat_cd,
-                   b.std_qty, b.unit_price, b.mat_amt
-            FROM snp_bom b
-            WHERE b.yyyymm IN (:curr, :prev)
-        """)
-        result = await self.session.execute(
-            bom_query, {"curr": yyyymm, "prev": prev_month}
-        )
-        bom_df = pd.DataFrame(result.fetchall(), columns=result.keys())
-
-        if bom_df.empty:
+        curr_bom = snapshots["bom"].get(yyyymm)
+        prev_bom = snapshots["bom"].get(prev_month)
+        if curr_bom is None or prev_bom is None:
             return []
 
-        variances = []
-        curr_bom = bom_df[bom_df["yyyymm"] == yyyymm]
-        prev_bom = bom_df[bom_df["yyyymm"] == prev_month]
-
-        # 제품별 집계
-        products = curr_bom["product_cd"].unique()
-        for prod in products:
-            curr_items = curr_bom[curr_bom["product_cd"] == prod]
-            prev_items = prev_bom[prev_bom["product_cd"] == prod]
-
-            if prev_items.empty:
-                continue
-
-            total_price_var = 0.0
-            total_usage_var = 0.0
-
-            for _, curr_item in curr_items.iterrows():
-                mat = curr_item["mat_cd"]
-                prev_match = prev_items[prev_items["mat_cd"] == mat]
-                if prev_match.empty:
-                    continue
-
-                P1 = curr_item["unit_price"]
-                P0 = prev_match.iloc[0]["unit_price"]
-                Q1 = curr_item["std_qty"]
-                Q0 = prev_match.iloc[0]["std_qty"]
+        # (제품, 자재) 병합 → 제품별 합계
+        totals, _ = decompose_material(curr_bom, prev_bom)
+        return self._build_material_variances(totals, yyyymm)
 
-                total_price_var += (P1 - P0) * Q1 / 10000  # → 억원
-                total_usage_var += P0 * (Q1 - Q0) / 10000  # → 억원
-
-            prev_total = prev_items["mat_amt"].sum()
-            curr_total = curr_items["mat_amt"].sum()
-            grp = await self._get_product_group(prod)
+    def _build_material_variances(self, totals: pd.DataFrame, yyyymm: str) -> list[dict]:
+        """재료비 제품별 합계 프레임 → 차이 딕셔너리 목록"""
+        if totals.empty:
+            return []
 
+        variances = []
+        columns = ["product_cd", "prev_amt", "curr_amt", "PRICE_VAR", "USAGE_VAR"]
+        for prod, prev_total, curr_total, price_var, usage_var in zip(
+            *(totals[col].tolist() for col in columns)
+        ):
+            grp = self._get_product_group(prod)
             var_id_base = f"V{yyyymm}_{prod}_BE01_MAT"
 
             # 단가 차이
             variances.append(self._make_variance(
                 f"{var_id_base}_PV", yyyymm, prod, grp, "BE_01", "CE_MAT",
-                "PRICE_VAR", total_price_var, prev_total, curr_total
+                "PRICE_VAR", price_var, prev_total, curr_total
             ))
             # 사용량 차이
             variances.append(self._make_variance(
                 f"{var_id_base}_UV", yyyymm, prod, grp, "BE_01", "CE_MAT",
-                "USAGE_VAR", total_usage_var, prev_total, curr_total
+                "USAGE_VAR", usage_var, prev_total, curr_total
             ))
 
         return variances
 
-    async def _calc_be_conversion_variance(
-        self, yyyymm: str, prev_month: str
+    async def calculate_material_detail(
+        self, yyyymm: str, product_cd: str | None = None
     ) -> list[dict]:
-        """후공정 가공비 분해 (전공정과 동일한 배부 분해 로직)"""
-        rate_query = text("""
-            SELECT r.yyyymm, r.proc_cd, r.ce_cd, r.total_cost, r.total_base,
-                   r.alloc_rate
-            FROM snp_alloc_rate r
-            JOIN mst_process p ON r.proc_cd = p.proc_cd
-            WHERE r.yyyymm IN (:curr, :prev)
-              AND p.proc_type = 'BE'
-              AND p.alloc_type = 'ALLOC'
-        """)
-        rate_result = await self.session.execute(
-            rate_query, {"curr": yyyymm, "prev": prev_month}
-        )
-        rates_df = pd.DataFrame(rate_result.fetchall(), columns=rate_result.keys())
+        """
+        후공정 재료비 자재별 드릴다운 (저장하지 않음)
+        제품 합계로 집계되기 전의 자재별 PRICE_VAR / USAGE_VAR 행을 반환한다.
+        """
+        prev_month = self._get_prev_month(yyyymm)
+        await self._load_master()
+        bom_df = await self._load_bom(prev_month, yyyymm, product_cd)
+        if bom_df.empty:
+            return []
 
-        alloc_query = text("""
-            SELECT a.yyyymm, a.product_cd, a.proc_cd, a.ce_cd,
-                   a.alloc_qty, a.alloc_amt
-            FROM snp_alloc_result a
-            JOIN mst_process p ON a.proc_cd = p.proc_cd
-            WHERE a.yyyymm IN (:curr, :prev)
-              AND p.proc_type = 'BE'
-              AND p.alloc_type = 'ALLOC'
+        curr_bom = bom_df[bom_df["yyyymm"] == yyyymm]
+        prev_bom = bom_df[bom_df["yyyymm"] == prev_month]
+        _, detail = decompose_material(curr_bom, prev_bom)
+        if detail.empty:
+            return []
+
+        rows = []
+        columns = [
+            "product_cd", "mat_cd", "unit_price_0", "unit_price_1",
+            "std_qty_0", "std_qty_1", "mat_amt_0", "mat_amt_1",
+            "PRICE_VAR", "USAGE_VAR",
+        ]
+        for (prod, mat, P0, P1, Q0, Q1, prev_amt, curr_amt,
+             price_var, usage_var) in zip(*(detail[col].tolist() for col in columns)):
+            var_id_base = f"V{yyyymm}_{prod}_BE01_MAT_{mat}"
+            for var_type, suffix, var_amt in (
+                ("PRICE_VAR", "PV", price_var),
+                ("USAGE_VAR", "UV", usage_var),
+            ):
+                row = self._make_variance(
+                    f"{var_id_base}_{suffix}", yyyymm, prod, self._get_product_group(prod),
+                    "BE_01", "CE_MAT", var_type, var_amt, prev_amt, curr_amt
+                )
+                row.update({
+                    "mat_cd": mat,
+                    "prev_price": P0, "curr_price": P1,
+                    "prev_qty": Q0, "curr_qty": Q1,
+                })
+                rows.append(row)
+
+        return rows
+
+    async def _load_bom(
+        self, first_month: str, last_month: str, product_cd: str | None = None
+    ) -> pd.DataFrame:
+        """기간 BOM 스냅샷 조회"""
+        bom_query = text("""
+            SELECT b.yyyymm, b.product_cd, b.mat_cd,
+                   b.std_qty, b.unit_price, b.mat_amt
+            FROM snp_bom b
+            WHERE b.yyyymm BETWEEN :first AND :last
+              AND (:prod IS NULL OR b.product_cd = :prod)
         """)
-        alloc_result = await self.session.execute(
-            alloc_query, {"curr": yyyymm, "prev": prev_month}
+        result = await self.session.execute(
+            bom_query, {"first": first_month, "last": last_month, "prod": product_cd}
         )
-        alloc_df = pd.DataFrame(alloc_result.fetchall(), columns=alloc_result.keys())
-
-        if rates_df.empty or alloc_df.empty:
-            return []
+        return pd.DataFrame(result.fetchall(), columns=result.keys())
 
-        # 전공정과 동일 로직 적용 (코드 재사용 가능하나, 명확성을 위해 분리)
-        variances = []
-        curr_rates = rates_df[rates_df["yyyymm"] == yyyymm]
-        prev_rates = rates_df[rates_df["yyyymm"] == prev_month]
-        curr_alloc = alloc_df[alloc_df["yyyymm"] == yyyymm]
-        prev_alloc = alloc_df[alloc_df["yyyymm"] == prev_month]
-
-        for _, curr_row in curr_alloc.iterrows():
-            prod = curr_row["product_cd"]
-            proc = curr_row["proc_cd"]
-            ce = curr_row["ce_cd"]
-
-            prev_match = prev_alloc[
-                (prev_alloc["product_cd"] == prod)
-                & (prev_alloc["proc_cd"] == proc)
-                & (prev_alloc["ce_cd"] == ce)
-            ]
-            if prev_match.empty:
-                continue
+    def _calc_be_conversion_variance(
+        self, snapshots: dict, yyyymm: str, prev_month: str
+    ) -> list[dict]:
+        """후공정 가공비 분해 (전공정과 동일한 배부 분해 로직)"""
+        rates, alloc = snapshots["be_rates"], snapshots["be_alloc"]
 
-            Q1 = curr_row["alloc_qty"]
-            Q0 = prev_match.iloc[0]["alloc_qty"]
+        curr_rates, prev_rates = rates.get(yyyymm), rates.get(prev_month)
+        curr_alloc, prev_alloc = alloc.get(yyyymm), alloc.get(prev_month)
+        if any(df is None for df in (curr_rates, prev_rates, curr_alloc, prev_alloc)):
+            return []
 
-            curr_rate_match = curr_rates[
-                (curr_rates["proc_cd"] == proc) & (curr_rates["ce_cd"] == ce)
-            ]
-            prev_rate_match = prev_rates[
-                (prev_rates["proc_cd"] == proc) & (prev_rates["ce_cd"] == ce)
-            ]
-            if curr_rate_match.empty or prev_rate_match.empty:
-                continue
+        # 전공정과 동일 로직 적용 (배부율 분해 없이 RATE_VAR / QTY_VAR만 생성)
+        decomposed = decompose_allocation(curr_alloc, prev_alloc, curr_rates, prev_rates)
 
-            R1 = curr_rate_match.iloc[0]["alloc_rate"]
-            R0 = prev_rate_match.iloc[0]["alloc_rate"]
+        return self._build_alloc_variances(decomposed, yyyymm, BE_CONV_VAR_TYPES)
 
-            prev_amt = prev_match.iloc[0]["alloc_amt"]
-            curr_amt = curr_row["alloc_amt"]
-            grp = await self._get_product_group(prod)
+    def _build_alloc_variances(
+        self, decomposed: pd.DataFrame, yyyymm: str,
+        var_types: list[tuple[str, str]],
+    ) -> list[dict]:
+        """배부 분해 결과 프레임 → 차이 딕셔너리 목록 (행 순서 유지)"""
+        if decomposed.empty:
+            return []
 
-            rate_var = (R1 - R0) * Q1 / 10000  # → 억원
-            qty_var = R0 * (Q1 - Q0) / 10000  # → 억원
+        # 컬럼 → 파이썬 리스트 (float64 → float, 기존 루프와 동일한 반올림 적용)
+        columns = ["product_cd", "proc_cd", "ce_cd", "prev_amt", "curr_amt"]
+        columns += [var_type for var_type, _ in var_types]
+        values = [decomposed[col].tolist() for col in columns]
 
+        variances = []
+        for prod, proc, ce, prev_amt, curr_amt, *amounts in zip(*values):
+            grp = self._get_product_group(prod)
             var_id_base = f"V{yyyymm}_{prod}_{proc}_{ce}"
-
-            variances.append(self._make_variance(
-                f"{var_id_base}_RV", yyyymm, prod, grp, proc, ce,
-                "RATE_VAR", rate_var, prev_amt, curr_amt
-            ))
-            variances.append(self._make_variance(
-                f"{var_id_base}_QV", yyyymm, prod, grp, proc, ce,
-                "QTY_VAR", qty_var, prev_amt, curr_amt
-            ))
+            for (var_type, suffix), var_amt in zip(var_types, amounts):
+                variances.append(self._make_variance(
+                    f"{var_id_base}_{suffix}", yyyymm, prod, grp, proc, ce,
+                    var_type, var_amt, prev_amt, curr_amt
+                ))
 
         return variances
 
     async def _save_variances(self, variances: list[dict]):
-        """차이 계산 결과를 DB에 저장"""
+        """
+        차이 계산 결과를 DB에 일괄 저장
+        - PostgreSQL(asyncpg): 임시 스테이징 테이블에 COPY → 단일 upsert
+        - 그 외: executemany upsert (청크 단위)
+        """
         if not variances:
             return
 
-        for v in variances:
-            await self.session.execute(
-                text("""
-                    INSERT INTO cal_variance
-                    (var_id, yyyymm, product_cd, product_grp, proc_cd, ce_cd,
-                     var_type, var_amt, var_rate, prev_amt, curr_amt)
-                    VALUES (:var_id, :yyyymm, :product_cd, :product_grp, :proc_cd,
-                            :ce_cd, :var_type, :var_amt, :var_rate, :prev_amt, :curr_amt)
-                    ON CONFLICT (var_id) DO UPDATE SET
-                        var_amt = EXCLUDED.var_amt,
-                        var_rate = EXCLUDED.var_rate,
-                        prev_amt = EXCLUDED.prev_amt,
-                        curr_amt = EXCLUDED.curr_amt
-                """),
-                v,
-            )
+        # 같은 var_id가 중복되면 마지막 값 사용 (행 단위 upsert와 동일)
+        rows = list({v["var_id"]: v for v in variances}.values())
+        chunk_size = settings.VARIANCE_BULK_CHUNK_SIZE
+
+        driver_conn = await self._get_driver_connection()
+        if driver_conn is not None and hasattr(driver_conn, "copy_records_to_table"):
+            await self._copy_upsert(driver_conn, rows, chunk_size)
+            mode = "COPY"
+        else:
+            await self._executemany_upsert(rows, chunk_size)
+            mode = "executemany"
+
         await self.session.commit()
-        print(f"[차이계산] {len(variances)}건 저장 완료")
+        print(f"[차이계산] {len(rows)}건 저장 완료 ({mode})")
+
+    async def _get_driver_connection(self):
+        """세션 트랜잭션에 묶인 드라이버 원본 커넥션 (asyncpg 등)"""
+        conn = await self.session.connection()
+        if conn.dialect.name != "postgresql":
+            return None
+        raw = await conn.get_raw_connection()
+        return raw.driver_connection
+
+    async def _copy_upsert(self, driver_conn, rows: list[dict], chunk_size: int):
+        """스테이징 테이블 COPY → cal_variance 집합 upsert (동일 트랜잭션)"""
+        # 세션 트랜잭션 안에서 생성 → 커밋 시 자동 삭제
+        await self.session.execute(text("DROP TABLE IF EXISTS tmp_cal_variance"))
+        await self.session.execute(text("""
+            CREATE TEMP TABLE tmp_cal_variance
+            (LIKE cal_variance INCLUDING DEFAULTS) ON COMMIT DROP
+        """))
+
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            await driver_conn.copy_records_to_table(
+                "tmp_cal_variance",
+                records=[tuple(v[col] for col in VARIANCE_COLUMNS) for v in chunk],
+                columns=VARIANCE_COLUMNS,
+            )
 
-    async def _get_product_group(self, product_cd: str) -> str:
-        """제품코드로 제품군 조회"""
-        result = await self.session.execute(
-            text("SELECT product_grp FROM mst_product WHERE product_cd = :cd"),
-            {"cd": product_cd},
-        )
-        row = result.fetchone()
-        return row[0] if row else ""
+        await self.session.execute(text(f"""
+            INSERT INTO cal_variance ({", ".join(VARIANCE_COLUMNS)})
+            SELECT {", ".join(VARIANCE_COLUMNS)} FROM tmp_cal_variance
+            ON CONFLICT (var_id) DO UPDATE SET
+                var_amt = EXCLUDED.var_amt,
+                var_rate = EXCLUDED.var_rate,
+                prev_amt = EXCLUDED.prev_amt,
+                curr_amt = EXCLUDED.curr_amt
+        """))
+
+    async def _executemany_upsert(self, rows: list[dict], chunk_size: int):
+        """COPY 미지원 DB용 executemany upsert"""
+        for i in range(0, len(rows), chunk_size):
+            await self.session.execute(_UPSERT_VARIANCE, rows[i:i + chunk_size])
+
+    async def _load_master(self):
+        """마스터 캐시 적재 (실행당 1회, 버전 스탬프 확인)"""
+        self.master = await master_cache.get(self.session, check_version=True)
+
+    def _get_product_group(self, product_cd: str) -> str:
+        """제품코드로 제품군 조회 (마스터 캐시)"""
+        return self.master.product_group(product_cd)
 
     @staticmethod
     def _make_variance(
@@ -392,6 +847,16 @@ class VarianceCalculator:
             "curr_amt": round(curr_amt, 2),
         }
 
+    @classmethod
+    def _iter_months(cls, start: str, end: str) -> list[str]:
+        """start ~ end 월 목록 (양끝 포함)"""
+        months = []
+        yyyymm = end
+        while yyyymm >= start:
+            months.append(yyyymm)
+            yyyymm = cls._get_prev_month(yyyymm)
+        return months[::-1]
+
     @staticmethod
     def _get_prev_month(yyyymm: str) -> str:
         """전월 계산"""